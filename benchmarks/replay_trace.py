@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+# 悅耳進度條 - 提示音記錄檔重播
+# 將插件錄製的提示音記錄檔（.ppbt）以1倍、10倍或不限速的速度重新送入tones.beep，輸出到替代的空設備，
+# 報告被取代（合併）、遺失和延遲的音調數量，以及重播期間的CPU時間
+# 沒有記錄檔時可用--synthetic產生模擬安裝程式的進度條音效突發
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+from run_benchmarks import load_plugin_module, read_addon_version
+
+# 可選的重播速度：名稱 -> 倍數（None表示不限速）
+REPLAY_SPEEDS = {
+    '1': 1.0,
+    '10': 10.0,
+    'max': None,
+}
+
+# NVDA進度條音效的參數：頻率按進度以110Hz起每25%升高一個八度
+PROGRESS_BASE_HZ = 110.0
+PROGRESS_LENGTH_MS = 40
+PROGRESS_CHANNEL_VOLUME = 50
+
+
+def progress_beep(percent):
+    return PROGRESS_BASE_HZ * 2 ** (percent / 25.0), PROGRESS_LENGTH_MS, PROGRESS_CHANNEL_VOLUME, PROGRESS_CHANNEL_VOLUME
+
+
+def synthetic_trace():
+    """模擬安裝程式的進度條音效：快速的解壓突發、停頓，再以較慢的速度完成安裝"""
+    records = []
+    elapsed = 0.0
+    # 解壓：1秒內100次進度更新
+    for percent in range(0, 101):
+        records.append((elapsed,) + progress_beep(percent))
+        elapsed += 0.01
+    elapsed += 0.5
+    # 安裝：每50毫秒一次更新，部分更新的進度不變
+    for step in range(0, 201):
+        records.append((elapsed,) + progress_beep(step // 2))
+        elapsed += 0.05
+    return records
+
+
+def replay(plugin, tones_module, records, speed, late_seconds):
+    """按記錄的時間重播提示音，返回統計結果"""
+    # 延遲追蹤的樣本數需容納所有播放的音調
+    plugin.latency_tracer = plugin.latency_tracer.__class__(window_size=len(records) + 1)
+    skipped_before = plugin.skipped_requests
+    passthrough_before = len(tones_module.calls)
+
+    first_time = records[0][0] if records else 0.0
+    cpu_started = time.process_time()
+    wall_started = time.perf_counter()
+    for timestamp, hz, length, left, right in records:
+        if speed is not None:
+            delay = wall_started + (timestamp - first_time) / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        tones_module.beep(hz, length, left, right)
+    feed_seconds = time.perf_counter() - wall_started
+
+    # 等待守護線程處理最後的請求
+    time.sleep(plugin.thread_sleep_interval * 2 + 0.05)
+    cpu_seconds = time.process_time() - cpu_started
+
+    summary = plugin.latency_tracer.summary()
+    played = summary['total'][0]
+    coalesced = plugin.skipped_requests - skipped_before
+    passthrough = len(tones_module.calls) - passthrough_before
+    intercepted = len(records) - passthrough
+    trace_seconds = (records[-1][0] - first_time) if records else 0.0
+
+    return {
+        'speed': speed,
+        'beeps': len(records),
+        'intercepted': intercepted,
+        'passthrough': passthrough,
+        'played': played,
+        'coalesced': coalesced,
+        'dropped': max(0, intercepted - played - coalesced),
+        'late': plugin.latency_tracer.count_above('total', late_seconds),
+        'late_threshold_ms': round(late_seconds * 1000, 3),
+        'trace_seconds': round(trace_seconds, 3),
+        'feed_seconds': round(feed_seconds, 3),
+        'cpu_seconds': round(cpu_seconds, 3),
+        'latency_ms': {f"p{percent}": (round(value, 3) if value is not None else None)
+                       for percent, value in summary['total'][1].items()},
+    }
+
+
+def print_result(name, result):
+    speed = '不限速' if result['speed'] is None else f"{result['speed']:g}倍"
+    latency = {key: ('-' if value is None else f"{value}ms") for key, value in result['latency_ms'].items()}
+    print(f"{speed}: {result['beeps']} 個提示音（攔截 {result['intercepted']}，交回原始函數 {result['passthrough']}）")
+    print(f"  播放 {result['played']}，合併 {result['coalesced']}，遺失 {result['dropped']}，"
+          f"延遲超過 {result['late_threshold_ms']}ms 的 {result['late']}")
+    print(f"  延遲 p50 {latency['p50']}  p95 {latency['p95']}  p99 {latency['p99']}")
+    print(f"  送入耗時 {result['feed_seconds']}s（記錄 {result['trace_seconds']}s），CPU時間 {result['cpu_seconds']}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="以替代的空設備重播悅耳進度條的提示音記錄檔")
+    parser.add_argument('trace', nargs='?', help="插件錄製的 .ppbt 記錄檔")
+    parser.add_argument('--synthetic', action='store_true', help="使用模擬安裝程式的進度條音效，而非記錄檔")
+    parser.add_argument('--speed', action='append', choices=list(REPLAY_SPEEDS),
+                        help="重播速度，可重複指定（預設依次使用 1、10、max）")
+    parser.add_argument('--late-ms', type=float,
+                        help="延遲超過此毫秒數的音調視為延遲（預設為守護線程的循環間隔）")
+    parser.add_argument('--realtime-sink', action='store_true', help="替代設備按音頻時長阻塞寫入，模擬真實設備")
+    parser.add_argument('--output', help="將結果寫入JSON報告")
+    parser.add_argument('--verbose', action='store_true', help="顯示插件的日誌輸出")
+    args = parser.parse_args(argv)
+    if not args.trace and not args.synthetic:
+        parser.error("請指定記錄檔或使用 --synthetic")
+
+    os.environ.setdefault('PPB_CONFIG_PATH', tempfile.mkdtemp(prefix='ppb_replay_'))
+    plugin_log = sys.stdout if args.verbose else io.StringIO()
+    results = {}
+    with contextlib.redirect_stdout(plugin_log):
+        module = load_plugin_module()
+        recorder = sys.modules['globalPlugins._beep_recorder']
+        if args.synthetic:
+            records = synthetic_trace()
+        else:
+            _, records = recorder.read_trace(args.trace)
+
+        import tones as tones_module
+        import _portaudio
+        import nvwave
+        _portaudio.realtime = nvwave.realtime = args.realtime_sink
+
+        plugin = module.GlobalPlugin()
+        try:
+            if not plugin.wait_until_initialized(30):
+                raise RuntimeError("插件背景初始化逾時")
+            late_seconds = args.late_ms / 1000.0 if args.late_ms is not None else plugin.thread_sleep_interval
+            for name in args.speed or list(REPLAY_SPEEDS):
+                results[name] = replay(plugin, tones_module, records, REPLAY_SPEEDS[name], late_seconds)
+        finally:
+            plugin.terminate()
+
+    for name, result in results.items():
+        print_result(name, result)
+
+    if args.output:
+        report = {
+            'addon_version': read_addon_version(),
+            'trace': 'synthetic' if args.synthetic else os.path.basename(args.trace),
+            'realtime_sink': args.realtime_sink,
+            'results': results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+        print(f"報告已寫入 {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
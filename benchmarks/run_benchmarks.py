@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+# 悅耳進度條 - 基準測試
+# 以stand_ins目錄中的NVDA和PortAudio替代模塊載入插件，在一般的CPython（無需Windows和NVDA）上測量：
+# 各波形和淡入淡出算法的合成速度、緩存命中和未命中的耗時、提示音經由守護線程到寫入輸出流的延遲、重新載入配置的耗時
+# 結果寫入JSON報告，可用--baseline與之前的報告比較
+
+import argparse
+import contextlib
+import datetime
+import importlib.util
+import io
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import types
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+STAND_INS_DIR = os.path.join(BENCHMARK_DIR, 'stand_ins')
+SOURCE_DIR = os.path.join(os.path.dirname(BENCHMARK_DIR), 'source code')
+PLUGIN_DIR = os.path.join(SOURCE_DIR, 'globalPlugins')
+PLUGIN_FILE = os.path.join(PLUGIN_DIR, 'pleasant progress.py')
+MANIFEST_FILE = os.path.join(SOURCE_DIR, 'manifest.ini')
+
+# 報告格式版本：欄位有不相容的變更時遞增
+REPORT_SCHEMA_VERSION = 1
+
+# 各基準測試的次數：(完整, --quick)
+SYNTHESIS_TONES = (200, 20)
+CACHE_CALLS = (500, 100)
+DAEMON_BEEPS = (40, 10)
+RELOAD_RUNS = (20, 4)
+
+# 進度條音效的原始頻率範圍和參數（與NVDA的進度條音效相同）
+PROGRESS_MIN_HZ = 110
+PROGRESS_MAX_HZ = 1760
+PROGRESS_LENGTH_MS = 40
+
+# 與基準報告比較時，時間類指標變慢（或速度類指標變慢）超過此百分比視為退步
+DEFAULT_REGRESSION_THRESHOLD = 20.0
+
+
+def load_plugin_module():
+    """以替代模塊載入插件（模塊名稱含空格，需按檔案路徑載入）"""
+    sys.path.insert(0, STAND_INS_DIR)
+    package = types.ModuleType('globalPlugins')
+    package.__path__ = [PLUGIN_DIR]
+    sys.modules['globalPlugins'] = package
+    spec = importlib.util.spec_from_file_location('globalPlugins.pleasant_progress', PLUGIN_FILE)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def read_addon_version():
+    try:
+        with open(MANIFEST_FILE, encoding='utf-8') as manifest:
+            for line in manifest:
+                key, _, value = line.partition('=')
+                if key.strip() == 'version':
+                    return value.strip()
+    except OSError:
+        pass
+    return None
+
+
+def percentile(sorted_samples, percent):
+    """最近秩法百分位數（樣本須已排序）"""
+    if not sorted_samples:
+        return None
+    rank = int(math.ceil(percent / 100.0 * len(sorted_samples))) - 1
+    return sorted_samples[max(0, min(len(sorted_samples) - 1, rank))]
+
+
+def summarize_us(samples):
+    """耗時樣本（秒）的百分位數，單位微秒"""
+    ordered = sorted(samples)
+    return {
+        'calls': len(ordered),
+        'p50_us': round(percentile(ordered, 50) * 1e6, 2),
+        'p95_us': round(percentile(ordered, 95) * 1e6, 2),
+        'p99_us': round(percentile(ordered, 99) * 1e6, 2),
+        'mean_us': round(sum(ordered) / len(ordered) * 1e6, 2),
+    }
+
+
+def progress_frequencies(count):
+    """在進度條頻率範圍內平均分佈的頻率"""
+    step = (PROGRESS_MAX_HZ - PROGRESS_MIN_HZ) / float(max(1, count - 1))
+    return [PROGRESS_MIN_HZ + step * i for i in range(count)]
+
+
+def bench_synthesis(plugin, values, tones, waveform_types, fade_algorithms):
+    """每種波形和淡入淡出算法的合成速度（不經緩存）"""
+    frequencies = progress_frequencies(tones)
+    results = {}
+    for waveform_type in waveform_types:
+        for fade_algorithm in fade_algorithms:
+            fade_ratio = plugin.get_config_attributes(dict(values, fade_algorithm=fade_algorithm))['fade_ratio']
+            started = time.perf_counter()
+            for frequency in frequencies:
+                plugin.render_tone_data(frequency, plugin.audio_duration, plugin.sample_rate, plugin.sample_format,
+                                        plugin.output_channels, plugin.volume, waveform_type,
+                                        fade_algorithm=fade_algorithm, fade_ratio=fade_ratio)
+            elapsed = time.perf_counter() - started
+            samples = int(plugin.sample_rate * plugin.audio_duration) * tones
+            results[f"{waveform_type}/{fade_algorithm}"] = {
+                'tones': tones,
+                'seconds': round(elapsed, 6),
+                'tones_per_second': round(tones / elapsed, 1),
+                'samples_per_second': round(samples / elapsed, 1),
+                'mean_us': round(elapsed / tones * 1e6, 2),
+            }
+    return results
+
+
+def bench_cache(plugin, partition, calls):
+    """緩存未命中（含合成）和命中的單次調用耗時"""
+    plugin.clear_audio_cache()
+    # 每次未命中使用不同的緩存鍵，分區容量不足時淘汰的條目不影響未命中的測量
+    frequencies = progress_frequencies(calls)
+    miss_samples = []
+    for index, frequency in enumerate(frequencies):
+        started = time.perf_counter()
+        plugin.get_cached_audio_or_generate(frequency, plugin.audio_duration, plugin.sample_rate, plugin.volume,
+                                            cache_key=f"benchmark_miss_{index}", partition=partition)
+        miss_samples.append(time.perf_counter() - started)
+
+    hit_samples = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        plugin.get_cached_audio_or_generate(PROGRESS_MIN_HZ, plugin.audio_duration, plugin.sample_rate,
+                                            plugin.volume, partition=partition)
+        hit_samples.append(time.perf_counter() - started)
+    plugin.clear_audio_cache()
+
+    return {'miss': summarize_us(miss_samples), 'hit': summarize_us(hit_samples)}
+
+
+def bench_request_to_write(plugin, tones_module, beeps):
+    """經由tones.beep攔截、守護線程、緩存和寫入輸出流的延遲（使用插件的延遲追蹤記錄）"""
+    plugin.latency_tracer.clear()
+    # 間隔略大於守護線程的限速間隔，每個提示音都會被播放而不是被較新的請求取代
+    interval = plugin.thread_sleep_interval + 0.01
+    for frequency in progress_frequencies(beeps):
+        tones_module.beep(frequency, PROGRESS_LENGTH_MS)
+        time.sleep(interval)
+    time.sleep(interval)
+
+    summary = plugin.latency_tracer.summary()
+    results = {'requested': beeps, 'played': summary['total'][0]}
+    for stage, (count, values) in summary.items():
+        results[stage] = {'samples': count}
+        for percent, value in values.items():
+            results[stage][f"p{percent}_ms"] = round(value, 3) if value is not None else None
+    return results
+
+
+def summarize_reload_ms(samples):
+    """重新載入耗時樣本（秒）的統計，單位毫秒"""
+    ordered = sorted(samples)
+    return {
+        'runs': len(ordered),
+        'p50_ms': round(percentile(ordered, 50) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3),
+    }
+
+
+def bench_reload(plugin, config, tones_module, runs):
+    """重新載入配置（在背景開啟新的輸出流並重建查找表和緩存）的耗時"""
+    original_volume = config.get_volume()
+    # 每次在兩個音量之間切換，確保配置版本變更而真正重新載入
+    volumes = (0.3, 0.5)
+    samples = []
+    for index in range(runs):
+        config.update_config(volume=volumes[index % 2])
+        started = time.perf_counter()
+        plugin.reload_configuration()
+        samples.append(time.perf_counter() - started)
+    config.update_config(volume=original_volume)
+    plugin.reload_configuration()
+
+    results = summarize_reload_ms(samples)
+    results['stream_config'] = bench_stream_config_reload(plugin, config, tones_module, runs)
+    return results
+
+
+def bench_stream_config_reload(plugin, config, tones_module, runs):
+    """同一設備的流配置變更（切換立體聲輸出）：持續播放提示音時換用新的輸出流，不應寫入已關閉的流或觸發重新初始化"""
+    import _portaudio
+
+    original_stereo = config.get_stereo_output()
+    write_errors_before = _portaudio.write_errors
+    initialize_calls_before = _portaudio.initialize_calls
+    # 寫入按音頻時長阻塞，換用時守護線程很可能正在寫入舊的流
+    _portaudio.realtime = True
+    stop_event = threading.Event()
+
+    def feed_beeps():
+        frequencies = progress_frequencies(20)
+        index = 0
+        while not stop_event.is_set():
+            tones_module.beep(frequencies[index % len(frequencies)], PROGRESS_LENGTH_MS)
+            index += 1
+            time.sleep(PROGRESS_LENGTH_MS / 1000.0)
+
+    feeder = threading.Thread(target=feed_beeps, daemon=True)
+    feeder.start()
+    samples = []
+    try:
+        for index in range(runs):
+            config.update_config(stereo_output=(not original_stereo) if index % 2 == 0 else original_stereo)
+            started = time.perf_counter()
+            plugin.reload_configuration()
+            samples.append(time.perf_counter() - started)
+            time.sleep(plugin.thread_sleep_interval)
+    finally:
+        stop_event.set()
+        feeder.join()
+        _portaudio.realtime = False
+    config.update_config(stereo_output=original_stereo)
+    plugin.reload_configuration()
+
+    results = summarize_reload_ms(samples)
+    results['write_errors'] = _portaudio.write_errors - write_errors_before
+    results['reinitializations'] = _portaudio.initialize_calls - initialize_calls_before
+    return results
+
+
+def flatten_metrics(tree, prefix=''):
+    """將報告的數值指標展開為 {路徑: 值}"""
+    metrics = {}
+    for key, value in tree.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            metrics.update(flatten_metrics(value, path + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[path] = value
+    return metrics
+
+
+def compare_reports(report, baseline, threshold):
+    """與基準報告比較時間和速度指標，返回退步的指標列表"""
+    current = flatten_metrics(report['benchmarks'])
+    previous = flatten_metrics(baseline.get('benchmarks', {}))
+    regressions = []
+    for path in sorted(current):
+        if path not in previous or not previous[path]:
+            continue
+        if path.endswith(('_us', '_ms')):
+            # 時間類指標：越小越好
+            change = (current[path] - previous[path]) / previous[path] * 100
+        elif path.endswith('_per_second'):
+            # 速度類指標：越大越好
+            change = (previous[path] - current[path]) / previous[path] * 100
+        else:
+            continue
+        marker = '  <- 退步' if change > threshold else ''
+        direction = f"慢 {change:.1f}%" if change >= 0 else f"快 {-change:.1f}%"
+        print(f"  {path}: {previous[path]} -> {current[path]}（{direction}）{marker}")
+        if change > threshold:
+            regressions.append(path)
+    return regressions
+
+
+def run(quick=False, verbose=False):
+    index = 1 if quick else 0
+    # 插件的配置和設備探測結果寫入臨時目錄，不影響真實的NVDA配置
+    os.environ.setdefault('PPB_CONFIG_PATH', tempfile.mkdtemp(prefix='ppb_bench_'))
+
+    plugin_log = sys.stdout if verbose else io.StringIO()
+    with contextlib.redirect_stdout(plugin_log):
+        module = load_plugin_module()
+        import tones as tones_module
+        config = sys.modules['globalPlugins._pleasant_progressconfig']
+
+        initialization_started = time.perf_counter()
+        plugin = module.GlobalPlugin()
+        if not plugin.wait_until_initialized(30):
+            raise RuntimeError("插件背景初始化逾時")
+        startup_seconds = time.perf_counter() - initialization_started
+
+        try:
+            benchmarks = {
+                'startup': {
+                    'module_load_ms': round(module.MODULE_LOAD_SECONDS * 1000, 3),
+                    'initialization_ms': round(startup_seconds * 1000, 3),
+                },
+                'synthesis': bench_synthesis(plugin, config.sine_progress_config.get_values(), SYNTHESIS_TONES[index],
+                                             list(config.WAVEFORM_TYPES), list(config.FADE_ALGORITHMS)),
+                'cache': bench_cache(plugin, module.PARTITION_PROGRESS, CACHE_CALLS[index]),
+                'request_to_write': bench_request_to_write(plugin, tones_module, DAEMON_BEEPS[index]),
+                'reload': bench_reload(plugin, config.sine_progress_config, tones_module, RELOAD_RUNS[index]),
+            }
+            settings = {
+                'output_backend': plugin.active_backend,
+                'sample_rate': plugin.sample_rate,
+                'sample_format': plugin.sample_format,
+                'output_channels': plugin.output_channels,
+                'audio_duration': plugin.audio_duration,
+                'thread_sleep_interval': plugin.thread_sleep_interval,
+            }
+        finally:
+            plugin.terminate()
+            config.sine_progress_config.flush()
+
+    return {
+        'schema_version': REPORT_SCHEMA_VERSION,
+        'generated_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'addon_version': read_addon_version(),
+        'quick': quick,
+        'environment': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+        },
+        'settings': settings,
+        'benchmarks': benchmarks,
+    }
+
+
+def print_summary(report):
+    benchmarks = report['benchmarks']
+    print(f"悅耳進度條基準測試（{report['environment']['implementation']} {report['environment']['python']}，"
+          f"{report['settings']['sample_rate']}Hz）")
+    print(f"  啟動: 模塊載入 {benchmarks['startup']['module_load_ms']}ms，"
+          f"背景初始化 {benchmarks['startup']['initialization_ms']}ms")
+    for name, result in benchmarks['synthesis'].items():
+        print(f"  合成 {name}: {result['tones_per_second']} 個/秒（每個 {result['mean_us']}µs）")
+    for name, result in benchmarks['cache'].items():
+        print(f"  緩存{'命中' if name == 'hit' else '未命中'}: p50 {result['p50_us']}µs  p95 {result['p95_us']}µs")
+    for stage in ('queue', 'render', 'write', 'total'):
+        result = benchmarks['request_to_write'][stage]
+        print(f"  請求到寫入 {stage}: p50 {result['p50_ms']}ms  p95 {result['p95_ms']}ms  p99 {result['p99_ms']}ms")
+    reload_result = benchmarks['reload']
+    print(f"  重新載入配置: p50 {reload_result['p50_ms']}ms  最大 {reload_result['max_ms']}ms")
+    stream_config_result = reload_result['stream_config']
+    print(f"  播放中變更流配置: p50 {stream_config_result['p50_ms']}ms  最大 {stream_config_result['max_ms']}ms  "
+          f"寫入失敗 {stream_config_result['write_errors']} 次，重新初始化 {stream_config_result['reinitializations']} 次")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="悅耳進度條基準測試（使用替代的NVDA和PortAudio模塊）")
+    parser.add_argument('--output', default='benchmark_report.json', help="JSON報告的路徑")
+    parser.add_argument('--quick', action='store_true', help="減少各項測試的次數")
+    parser.add_argument('--verbose', action='store_true', help="顯示插件的日誌輸出")
+    parser.add_argument('--baseline', help="與之前的JSON報告比較")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                        help="變慢超過此百分比視為退步（預設 %(default)s）")
+    args = parser.parse_args(argv)
+
+    report = run(quick=args.quick, verbose=args.verbose)
+    with open(args.output, 'w', encoding='utf-8') as output:
+        json.dump(report, output, ensure_ascii=False, indent=2)
+    print_summary(report)
+    print(f"報告已寫入 {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+        print(f"與 {args.baseline} 比較：")
+        regressions = compare_reports(report, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} 個指標退步超過 {args.threshold}%")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
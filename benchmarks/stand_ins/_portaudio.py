@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+# 悅耳進度條基準測試 - PyAudio _portaudio 擴展模塊的替代品
+# 沒有輸出的空設備：write_stream只統計寫入的幀數，realtime為True時按音頻時長阻塞
+# 與真實的PortAudio相同，寫入已關閉或已停止的流會引發錯誤（並計入write_errors）
+
+import time
+
+paFloat32 = 0x00000001
+paInt32 = 0x00000002
+paInt24 = 0x00000004
+paInt16 = 0x00000008
+paInt8 = 0x00000010
+paUInt8 = 0x00000020
+paCustomFormat = 0x00010000
+
+paNoError = 0
+paNotInitialized = -10000
+paBadStreamPtr = -9988
+paStreamIsStopped = -9983
+paInvalidDevice = -9996
+paOutputUnderflowed = -9980
+paCanNotWriteToAnInputOnlyStream = -9974
+paCanNotReadFromAnOutputOnlyStream = -9975
+
+paContinue = 0
+paComplete = 1
+paAbort = 2
+
+paFramesPerBufferUnspecified = 0
+
+_SAMPLE_SIZES = {paFloat32: 4, paInt32: 4, paInt24: 3, paInt16: 2, paInt8: 1, paUInt8: 1}
+
+# 模擬設定：realtime為True時write_stream按音頻時長阻塞
+realtime = False
+frames_written = 0
+bytes_written = 0
+open_count = 0
+# 寫入已關閉或已停止的流的次數
+write_errors = 0
+# PortAudio被初始化的總次數（插件重新初始化音頻系統時增加）
+initialize_calls = 0
+_init_count = 0
+
+
+class _Info:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+HOST_APIS = [
+    _Info(name="MME", deviceCount=2, type=2, defaultOutputDevice=0),
+    _Info(name="Windows WASAPI", deviceCount=2, type=13, defaultOutputDevice=2),
+]
+DEVICES = [
+    _Info(name="Speakers (Realtek High Definiti", hostApi=0, maxInputChannels=0,
+          maxOutputChannels=2, defaultSampleRate=44100.0),
+    _Info(name="Headphones (USB Audio Device)", hostApi=0, maxInputChannels=0,
+          maxOutputChannels=2, defaultSampleRate=44100.0),
+    _Info(name="Speakers (Realtek High Definition Audio)", hostApi=1, maxInputChannels=0,
+          maxOutputChannels=2, defaultSampleRate=48000.0),
+    _Info(name="Headphones (USB Audio Device)", hostApi=1, maxInputChannels=0,
+          maxOutputChannels=2, defaultSampleRate=48000.0),
+]
+DEFAULT_OUTPUT_DEVICE = 2
+
+
+def get_sample_size(format):
+    return _SAMPLE_SIZES[format]
+
+
+def initialize():
+    global _init_count, initialize_calls
+    _init_count += 1
+    initialize_calls += 1
+
+
+def terminate():
+    global _init_count
+    _init_count = max(0, _init_count - 1)
+
+
+def get_version():
+    return 1246720
+
+
+def get_version_text():
+    return "PortAudio stand-in"
+
+
+def get_host_api_count():
+    return len(HOST_APIS)
+
+
+def get_host_api_info(index):
+    return HOST_APIS[index]
+
+
+def get_device_count():
+    return len(DEVICES)
+
+
+def get_device_info(index):
+    return DEVICES[index]
+
+
+def get_default_output_device():
+    return DEFAULT_OUTPUT_DEVICE
+
+
+def is_format_supported(rate, **kwargs):
+    if rate not in (22050, 44100, 48000, 96000):
+        raise ValueError("Invalid sample rate", -9997)
+    return True
+
+
+class _Stream:
+    def __init__(self, rate, channels, format, frames_per_buffer):
+        self.rate = rate
+        self.channels = channels
+        self.format = format
+        self.frames_per_buffer = frames_per_buffer
+        self.inputLatency = 0.0
+        self.outputLatency = max(frames_per_buffer, 64) * 2 / float(rate)
+        self.active = False
+        self.closed = False
+
+
+def open(rate, channels, format, input=False, output=False, input_device_index=None,
+         output_device_index=None, frames_per_buffer=paFramesPerBufferUnspecified, **kwargs):
+    global open_count
+    if output_device_index is not None and not 0 <= output_device_index < len(DEVICES):
+        raise IOError("Invalid device", paInvalidDevice)
+    open_count += 1
+    return _Stream(rate, channels, format, frames_per_buffer)
+
+
+def start_stream(stream):
+    stream.active = True
+
+
+def stop_stream(stream):
+    stream.active = False
+
+
+def close(stream):
+    stream.active = False
+    stream.closed = True
+
+
+def is_stream_active(stream):
+    return stream.active
+
+
+def write_stream(stream, data, num_frames, exception_on_underflow=False):
+    global frames_written, bytes_written, write_errors
+    if stream.closed:
+        write_errors += 1
+        raise IOError("Stream closed", paBadStreamPtr)
+    if not stream.active:
+        write_errors += 1
+        raise IOError("Stream is stopped", paStreamIsStopped)
+    frames_written += num_frames
+    bytes_written += len(data)
+    if realtime:
+        time.sleep(num_frames / float(stream.rate))
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+# 悅耳進度條基準測試 - NVDA config 模塊的替代品
+# 只提供插件讀取的輸出設備設定和配置事件
+
+from extensionPoints import Action
+
+conf = {
+    "audio": {"outputDevice": "default"},
+    "speech": {"outputDevice": "default"},
+}
+post_configProfileSwitch = Action()
+post_configSave = Action()
+post_configReset = Action()
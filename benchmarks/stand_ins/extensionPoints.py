@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+# 悅耳進度條基準測試 - NVDA extensionPoints 模塊的替代品
+
+class Action:
+    def __init__(self):
+        self.handlers = []
+
+    def register(self, handler):
+        self.handlers.append(handler)
+
+    def unregister(self, handler):
+        if handler in self.handlers:
+            self.handlers.remove(handler)
+
+    def notify(self, **kwargs):
+        for handler in list(self.handlers):
+            handler(**kwargs)
@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+# 悅耳進度條基準測試 - NVDA globalPluginHandler 模塊的替代品
+
+runningPlugins = set()
+
+
+class GlobalPlugin:
+    def __init__(self):
+        pass
+
+    def terminate(self):
+        pass
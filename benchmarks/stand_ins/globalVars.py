@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+# 悅耳進度條基準測試 - NVDA globalVars 模塊的替代品
+# 配置目錄取自PPB_CONFIG_PATH環境變數，未設定時使用臨時目錄
+
+import os
+import tempfile
+
+
+class _AppArgs:
+    configPath = os.environ.get("PPB_CONFIG_PATH") or tempfile.mkdtemp(prefix="ppb_config_")
+
+
+appArgs = _AppArgs()
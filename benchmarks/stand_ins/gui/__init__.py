@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+# 悅耳進度條基準測試 - NVDA gui 模塊的替代品
+
+from . import guiHelper, settingsDialogs
+
+messages = []
+
+
+def messageBox(message, caption="", style=0, parent=None):
+    messages.append((message, caption))
+    return 0
@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+# 悅耳進度條基準測試 - NVDA gui.guiHelper 模塊的替代品
+
+class BoxSizerHelper:
+    def __init__(self, parent, sizer=None, orientation=None):
+        self.parent = parent
+
+    def addLabeledControl(self, label, controlClass, **kwargs):
+        return controlClass(self.parent, **kwargs)
+
+    def addItem(self, item, **kwargs):
+        return item
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+# 悅耳進度條基準測試 - NVDA gui.settingsDialogs 模塊的替代品
+
+class SettingsPanel:
+    def __init__(self, parent=None):
+        self.makeSettings(None)
+
+    def makeSettings(self, sizer):
+        pass
+
+    def onPanelActivated(self):
+        pass
+
+    def onPanelDeactivated(self):
+        pass
+
+    def __bool__(self):
+        return True
+
+
+class NVDASettingsDialog:
+    categoryClasses = []
@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+# 悅耳進度條基準測試 - NVDA languageHandler 模塊的替代品
+
+def getLanguage():
+    return "en"
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# 悅耳進度條基準測試 - NVDA nvwave 模塊的替代品
+# WavePlayer只統計送入的字節數
+
+import time
+
+realtime = False
+played_files = []
+
+
+class WavePlayer:
+    instances = []
+
+    def __init__(self, channels, samplesPerSec, bitsPerSample, outputDevice=None,
+                 closeWhenIdle=None, wantDucking=False, buffered=False, **kwargs):
+        self.channels = channels
+        self.samplesPerSec = samplesPerSec
+        self.bitsPerSample = bitsPerSample
+        self.outputDevice = outputDevice
+        self.fed = 0
+        self.closed = False
+        WavePlayer.instances.append(self)
+
+    def feed(self, data, size=None, onDone=None):
+        self.fed += len(data) if size is None else size
+        if realtime:
+            frame = self.channels * self.bitsPerSample // 8
+            time.sleep(len(data) / float(frame * self.samplesPerSec))
+        if onDone:
+            onDone()
+
+    def idle(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def playWaveFile(fileName, asynchronous=True, isSpeechWaveFileCommand=False):
+    played_files.append(fileName)
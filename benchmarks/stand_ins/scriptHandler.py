@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+# 悅耳進度條基準測試 - NVDA scriptHandler 模塊的替代品
+
+def script(**kwargs):
+    def decorator(func):
+        func.__dict__.update(kwargs)
+        return func
+    return decorator
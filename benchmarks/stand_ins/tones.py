@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+# 悅耳進度條基準測試 - NVDA tones 模塊的替代品
+# 記錄交回原始函數播放的提示音
+
+calls = []
+
+
+def beep(hz, length, left=50, right=50, isSpeechBeepCommand=False):
+    calls.append((hz, length, left, right))
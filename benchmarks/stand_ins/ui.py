@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+# 悅耳進度條基準測試 - NVDA ui 模塊的替代品
+# 記錄播報的訊息
+
+messages = []
+
+
+def message(text, *args, **kwargs):
+    messages.append(text)
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+# 悅耳進度條基準測試 - NVDA wx 模塊的替代品
+# CallAfter和CallLater直接在調用線程執行
+
+EVT_CHOICE = "EVT_CHOICE"
+EVT_BUTTON = "EVT_BUTTON"
+EVT_CHECKBOX = "EVT_CHECKBOX"
+OK = 1
+ICON_WARNING = 2
+ICON_ERROR = 4
+ICON_INFORMATION = 8
+
+
+def CallAfter(func, *args, **kwargs):
+    func(*args, **kwargs)
+
+
+def CallLater(millis, func, *args, **kwargs):
+    func(*args, **kwargs)
+
+
+class _Control:
+    def __init__(self, parent=None, label="", choices=None, **kwargs):
+        self.label = label
+        self.choices = list(choices or [])
+        self.selection = 0
+        self.value = False
+        self.handlers = {}
+
+    def Bind(self, event, handler):
+        self.handlers[event] = handler
+
+    def SetSelection(self, index):
+        self.selection = index if index >= 0 else len(self.choices) - 1
+
+    def GetSelection(self):
+        return self.selection
+
+    def SetValue(self, value):
+        self.value = value
+
+    def GetValue(self):
+        return self.value
+
+    def Enable(self, enable=True):
+        pass
+
+    def __bool__(self):
+        return True
+
+
+class Choice(_Control):
+    pass
+
+
+class Button(_Control):
+    pass
+
+
+class CheckBox(_Control):
+    pass
@@ -5,9 +5,6 @@ import wx
 import gui
 from gui import guiHelper
 from gui.settingsDialogs import SettingsPanel
-import os
-import gettext
-import languageHandler
 from ._pleasant_progressconfig import (
     sine_progress_config,
     FADE_ALGORITHMS,
@@ -16,54 +13,15 @@ from ._pleasant_progressconfig import (
     MIN_FREQUENCY_OPTIONS,
     MAX_FREQUENCY_OPTIONS,
     AUDIO_DURATION_OPTIONS,
+    LATENCY_PRESETS,
+    OUTPUT_BACKENDS,
+    LOG_LEVEL_NAMES,
+    PROFILE_FIELDS,
     DEFAULT_CONFIG  # 直接導入預設配置
 )
 
-# =============================================================================
-# 國際化初始化
-# =============================================================================
-def initTranslation():
-    """初始化插件的國際化翻譯"""
-    try:
-        # 獲取插件目錄和locale資料夾路徑
-        addon_dir = os.path.dirname(__file__)  # 獲取當前文件所在目錄（globalPlugins）
-        parent_dir = os.path.dirname(addon_dir)  # 獲取父目錄
-        locale_dir = os.path.join(parent_dir, "locale")  # 父目錄下的locale資料夾
-
-
-
-        # 獲取當前NVDA使用的語言
-        lang = languageHandler.getLanguage()
-
-        # 構建語言回退列表
-        languages = [lang]  # 首先嘗試完整語言代碼
-
-        # 如果語言代碼包含下劃線，也嘗試主要語言代碼
-        if '_' in lang:
-            main_lang = lang.split('_')[0]
-            languages.append(main_lang)
-
-        # 如果不是中文，添加英文作為回退
-        if not lang.startswith('zh'):
-            languages.append('en')
-
-        # 創建翻譯對象
-        translation = gettext.translation(
-            "nvda",                    # domain name
-            localedir=locale_dir,      # locale資料夾路徑
-            languages=languages,       # 語言回退列表
-            fallback=True              # 找不到翻譯時使用原文
-        )
-
-        # 返回gettext函數
-        return translation.gettext
-
-    except Exception:
-        # 如果初始化失敗，返回簡單的fallback函數
-        return lambda x: x
-
-# 初始化並獲取翻譯函數
-addonGettext = initTranslation()
+# 共用的翻譯函數
+from ._i18n import addonGettext
 
 # 翻譯字典和常數
 WAVEFORM_TYPES_TRANSLATED = {
@@ -80,6 +38,23 @@ FADE_ALGORITHMS_TRANSLATED = {
     'gaussian': addonGettext('高斯')
 }
 
+LATENCY_PRESETS_TRANSLATED = {
+    'default': addonGettext('預設（固定緩衝）'),
+    'low_latency': addonGettext('低延遲'),
+    'power_saving': addonGettext('省電')
+}
+
+OUTPUT_BACKENDS_TRANSLATED = {
+    'portaudio': addonGettext('內嵌PortAudio'),
+    'nvwave': addonGettext('NVDA音頻輸出（nvwave）')
+}
+
+LOG_LEVEL_NAMES_TRANSLATED = {
+    'debug': addonGettext('調試（記錄每個提示音）'),
+    'info': addonGettext('一般'),
+    'warning': addonGettext('只記錄警告和錯誤')
+}
+
 class SineProgressSettingsPanel(SettingsPanel):
     """悅耳進度條設定面板"""
     
@@ -94,6 +69,25 @@ class SineProgressSettingsPanel(SettingsPanel):
         """創建設定控件"""
         settingsSizerHelper = guiHelper.BoxSizerHelper(self, sizer=settingsSizer)
         
+        # 音效配置檔：全局設定、已有的應用程式配置檔，以及開啟設定前所在的應用程式（尚無配置檔時新增）
+        self.profile_names = [None] + sorted(sine_progress_config.get_profiles())
+        profile_choices = [addonGettext("全局設定")] + self.profile_names[1:]
+        plugin = self._find_plugin()
+        focused_app = getattr(plugin, 'focused_app', None)
+        if focused_app and focused_app not in self.profile_names:
+            self.profile_names.append(focused_app)
+            profile_choices.append(focused_app + addonGettext("（新增）"))
+        self.profile_choice = settingsSizerHelper.addLabeledControl(
+            addonGettext("音效配置檔(&F)："),
+            wx.Choice,
+            choices=profile_choices
+        )
+        self.profile_choice.SetSelection(0)
+        # 各配置檔尚未保存的聲音選擇，和待移除的配置檔
+        self.profile_edits = {}
+        self.removed_profiles = set()
+        self.current_profile = None
+        
         # 波形類型選擇
         waveform_label = addonGettext("波形類型(&W)：")
         waveform_choices = list(WAVEFORM_TYPES_TRANSLATED.values())  # ['正弦波', '方波', '三角波', ...]
@@ -192,15 +186,103 @@ class SineProgressSettingsPanel(SettingsPanel):
         except ValueError:
             self.max_frequency_choice.SetSelection(-1)  # 預設1720Hz（最後一個）
         
+        # 延遲模式（低延遲和省電模式按設備校準緩衝大小）
+        latency_label = addonGettext("延遲模式(&T)：")
+        latency_choices = list(LATENCY_PRESETS_TRANSLATED.values())
+        self.latency_preset_choice = settingsSizerHelper.addLabeledControl(
+            latency_label,
+            wx.Choice,
+            choices=latency_choices
+        )
+        
+        # 設置當前延遲模式
+        current_preset = sine_progress_config.get_latency_preset()
+        preset_index = list(LATENCY_PRESETS.keys()).index(current_preset)
+        self.latency_preset_choice.SetSelection(preset_index)
+        
+        # 輸出後端（nvwave與NVDA共用輸出路徑和設備選擇）
+        backend_label = addonGettext("輸出方式(&O)：")
+        backend_choices = list(OUTPUT_BACKENDS_TRANSLATED.values())
+        self.output_backend_choice = settingsSizerHelper.addLabeledControl(
+            backend_label,
+            wx.Choice,
+            choices=backend_choices
+        )
+        
+        # 設置當前輸出後端
+        current_backend = sine_progress_config.get_output_backend()
+        backend_index = list(OUTPUT_BACKENDS.keys()).index(current_backend)
+        self.output_backend_choice.SetSelection(backend_index)
+        
+        # 接管所有提示音（其他插件和NVDA自身的提示音也經由同一輸出流和緩存播放）
+        self.route_all_beeps_checkbox = settingsSizerHelper.addItem(
+            wx.CheckBox(self, label=addonGettext("接管所有提示音(&B)"))
+        )
+        self.route_all_beeps_checkbox.SetValue(sine_progress_config.get_route_all_beeps())
+        
+        # 立體聲輸出（按提示音的左右聲道音量定位）
+        self.stereo_output_checkbox = settingsSizerHelper.addItem(
+            wx.CheckBox(self, label=addonGettext("立體聲輸出(&S)"))
+        )
+        self.stereo_output_checkbox.SetValue(sine_progress_config.get_stereo_output())
+        
+        # 緩存NVDA提示音檔案（首次播放時轉換，之後經由插件的輸出流播放）
+        self.cache_earcons_checkbox = settingsSizerHelper.addItem(
+            wx.CheckBox(self, label=addonGettext("緩存NVDA提示音檔案(&E)"))
+        )
+        self.cache_earcons_checkbox.SetValue(sine_progress_config.get_cache_earcons())
+        
+        # 日誌級別（調試級別會記錄每個提示音，只在排查問題時使用）
+        log_level_label = addonGettext("日誌級別(&G)：")
+        log_level_choices = list(LOG_LEVEL_NAMES_TRANSLATED.values())
+        self.log_level_choice = settingsSizerHelper.addLabeledControl(
+            log_level_label,
+            wx.Choice,
+            choices=log_level_choices
+        )
+        
+        # 設置當前日誌級別
+        current_log_level = sine_progress_config.get_log_level()
+        log_level_index = list(LOG_LEVEL_NAMES.keys()).index(current_log_level)
+        self.log_level_choice.SetSelection(log_level_index)
+        
         # 綁定頻率選擇變更事件，用於驗證
         self.min_frequency_choice.Bind(wx.EVT_CHOICE, self.onFrequencyChange)
         self.max_frequency_choice.Bind(wx.EVT_CHOICE, self.onFrequencyChange)
         
+        # 影響預覽聲音的選項：(控件, 配置欄位, 選項值列表)，切換時立即播放預覽
+        self.preview_choices = [
+            (self.waveform_choice, 'waveform_type', list(WAVEFORM_TYPES.keys())),
+            (self.fade_algorithm_choice, 'fade_algorithm', list(FADE_ALGORITHMS.keys())),
+            (self.volume_choice, 'volume', VOLUME_OPTIONS),
+            (self.duration_choice, 'audio_duration', AUDIO_DURATION_OPTIONS),
+            (self.min_frequency_choice, 'min_frequency', MIN_FREQUENCY_OPTIONS),
+            (self.max_frequency_choice, 'max_frequency', MAX_FREQUENCY_OPTIONS),
+        ]
+        for choice, _, _ in self.preview_choices:
+            choice.Bind(wx.EVT_CHOICE, self.onPreviewChoice)
+        self.profile_choice.Bind(wx.EVT_CHOICE, self.onProfileChoice)
+        
+        # 移除目前選擇的應用程式配置檔（保存後生效）
+        remove_profile_button = settingsSizerHelper.addItem(
+            wx.Button(self, label=addonGettext("移除配置檔(&M)"))
+        )
+        remove_profile_button.Bind(wx.EVT_BUTTON, self.onRemoveProfile)
+        
+        # 預覽按鈕（播放0-100%的進度條掃頻，無需保存）
+        preview_button = settingsSizerHelper.addItem(
+            wx.Button(self, label=addonGettext("預覽(&P)"))
+        )
+        preview_button.Bind(wx.EVT_BUTTON, self.onPreview)
+        
         # 恢復到預設值按鈕
         restore_defaults_button = settingsSizerHelper.addItem(
             wx.Button(self, label=addonGettext("恢復到預設值(&R)"))
         )
         restore_defaults_button.Bind(wx.EVT_BUTTON, self.onRestoreDefaults)
+        
+        # 面板開啟後在背景預先渲染當前選擇和相鄰選項的預覽
+        wx.CallAfter(self._prerender_previews)
     
     def onRestoreDefaults(self, event):
         """恢復到預設值按鈕點擊事件處理 - 簡化版本"""
@@ -236,6 +318,30 @@ class SineProgressSettingsPanel(SettingsPanel):
             duration_index = AUDIO_DURATION_OPTIONS.index(default_duration)
             self.duration_choice.SetSelection(duration_index)
 
+            # 延遲模式
+            default_preset = DEFAULT_CONFIG['latency_preset']
+            preset_index = list(LATENCY_PRESETS.keys()).index(default_preset)
+            self.latency_preset_choice.SetSelection(preset_index)
+
+            # 輸出後端
+            default_backend = DEFAULT_CONFIG['output_backend']
+            backend_index = list(OUTPUT_BACKENDS.keys()).index(default_backend)
+            self.output_backend_choice.SetSelection(backend_index)
+
+            # 接管所有提示音
+            self.route_all_beeps_checkbox.SetValue(DEFAULT_CONFIG['route_all_beeps'])
+
+            # 立體聲輸出
+            self.stereo_output_checkbox.SetValue(DEFAULT_CONFIG['stereo_output'])
+
+            # 緩存提示音檔案
+            self.cache_earcons_checkbox.SetValue(DEFAULT_CONFIG['cache_earcons'])
+
+            # 日誌級別
+            default_log_level = DEFAULT_CONFIG['log_level']
+            log_level_index = list(LOG_LEVEL_NAMES.keys()).index(default_log_level)
+            self.log_level_choice.SetSelection(log_level_index)
+
             print("悅耳進度條：UI已重置為預設值，用戶可選擇是否保存")
             
         except Exception as e:
@@ -290,8 +396,8 @@ class SineProgressSettingsPanel(SettingsPanel):
         
         return True
     
-    def onSave(self):
-        """保存設定"""
+    def _get_selected_values(self):
+        """讀取面板中目前選擇的配置值"""
         # 獲取選中的波形類型
         waveform_index = self.waveform_choice.GetSelection()
         selected_waveform = list(WAVEFORM_TYPES.keys())[waveform_index]
@@ -314,27 +420,130 @@ class SineProgressSettingsPanel(SettingsPanel):
         duration_index = self.duration_choice.GetSelection()
         selected_duration = AUDIO_DURATION_OPTIONS[duration_index]
 
-        # 檢查配置是否有變更
-        config_changed = (
-            selected_waveform != sine_progress_config.get_waveform_type() or
-            selected_algorithm != sine_progress_config.get_fade_algorithm() or
-            selected_volume != sine_progress_config.get_volume() or
-            selected_min_freq != sine_progress_config.get_min_frequency() or
-            selected_max_freq != sine_progress_config.get_max_frequency() or
-            selected_duration != sine_progress_config.get_audio_duration()  # 新增
-        )
+        # 獲取選中的延遲模式
+        preset_index = self.latency_preset_choice.GetSelection()
+        selected_preset = list(LATENCY_PRESETS.keys())[preset_index]
+
+        # 獲取選中的輸出後端
+        backend_index = self.output_backend_choice.GetSelection()
+        selected_backend = list(OUTPUT_BACKENDS.keys())[backend_index]
+
+        # 獲取是否接管所有提示音
+        selected_route_all_beeps = self.route_all_beeps_checkbox.GetValue()
+
+        # 獲取是否使用立體聲輸出
+        selected_stereo_output = self.stereo_output_checkbox.GetValue()
+
+        # 獲取是否緩存提示音檔案
+        selected_cache_earcons = self.cache_earcons_checkbox.GetValue()
+
+        # 獲取選中的日誌級別
+        log_level_index = self.log_level_choice.GetSelection()
+        selected_log_level = list(LOG_LEVEL_NAMES.keys())[log_level_index]
+
+        return {
+            'waveform_type': selected_waveform,
+            'fade_algorithm': selected_algorithm,
+            'volume': selected_volume,
+            'min_frequency': selected_min_freq,
+            'max_frequency': selected_max_freq,
+            'audio_duration': selected_duration,
+            'latency_preset': selected_preset,
+            'output_backend': selected_backend,
+            'route_all_beeps': selected_route_all_beeps,
+            'stereo_output': selected_stereo_output,
+            'cache_earcons': selected_cache_earcons,
+            'log_level': selected_log_level,
+        }
+    
+    def _get_sound_selections(self):
+        """目前聲音選項的選擇（屬於目前選擇的配置檔）"""
+        return {field: options[choice.GetSelection()] for choice, field, options in self.preview_choices}
+    
+    def _select_sound_values(self, values):
+        """按配置值設定聲音選項的選擇"""
+        for choice, field, options in self.preview_choices:
+            if values[field] in options:
+                choice.SetSelection(options.index(values[field]))
+    
+    def _get_profile_values(self, profile_name):
+        """配置檔目前的聲音配置值（尚未保存的選擇優先）"""
+        if profile_name in self.profile_edits:
+            return self.profile_edits[profile_name]
+        if profile_name is None:
+            return sine_progress_config.get_values()
+        return sine_progress_config.get_profile_values(profile_name)
+    
+    def onProfileChoice(self, event):
+        """切換配置檔：保留上一個配置檔的選擇，並顯示新配置檔的聲音設定"""
+        self.profile_edits[self.current_profile] = self._get_sound_selections()
+        self.current_profile = self.profile_names[self.profile_choice.GetSelection()]
+        self._select_sound_values(self._get_profile_values(self.current_profile))
+        self._prerender_previews()
+        event.Skip()
+    
+    def onRemoveProfile(self, event):
+        """移除目前選擇的應用程式配置檔，全局設定無法移除"""
+        if self.current_profile is None:
+            return
+        self.removed_profiles.add(self.current_profile)
+        self.profile_edits.pop(self.current_profile, None)
+        index = self.profile_choice.GetSelection()
+        self.profile_choice.Delete(index)
+        del self.profile_names[index]
+        
+        self.current_profile = None
+        self.profile_choice.SetSelection(0)
+        self._select_sound_values(self._get_profile_values(None))
+        print("悅耳進度條：配置檔將在保存後移除")
+    
+    def _save_profiles(self):
+        """保存應用程式配置檔的變更，返回(是否有變更, 是否成功)"""
+        existing_profiles = sine_progress_config.get_profiles()
+        global_values = self._get_profile_values(None)
+        global_sound_values = {field: global_values[field] for field in PROFILE_FIELDS}
+        changed = False
+        success = True
+        
+        for profile_name in self.removed_profiles:
+            changed = sine_progress_config.remove_profile(profile_name) or changed
+        
+        for profile_name, sound_values in self.profile_edits.items():
+            if profile_name is None:
+                continue
+            if profile_name in existing_profiles:
+                if sound_values == {field: sine_progress_config.get_profile_values(profile_name)[field]
+                                    for field in PROFILE_FIELDS}:
+                    continue
+            elif sound_values == global_sound_values:
+                # 新的配置檔與全局設定相同時不建立
+                continue
+            changed = True
+            success = sine_progress_config.set_profile(profile_name, sound_values) and success
+        
+        return changed, success
+    
+    def onSave(self):
+        """保存設定"""
+        # 聲音選項屬於目前選擇的配置檔，全局設定使用全局的聲音選擇
+        self.profile_edits[self.current_profile] = self._get_sound_selections()
+        selected_values = self._get_selected_values()
+        global_values = self._get_profile_values(None)
+        selected_values.update({field: global_values[field] for field in PROFILE_FIELDS})
+        
+        # 檢查配置是否有變更（與已解析的配置值比較，無需重新讀取）
+        current_values = sine_progress_config.values
+        config_changed = any(current_values[key] != value for key, value in selected_values.items())
         
+        success = True
         if config_changed:
             # 更新配置
-            success = sine_progress_config.update_config(
-                waveform_type=selected_waveform,
-                fade_algorithm=selected_algorithm,
-                volume=selected_volume,
-                min_frequency=selected_min_freq,
-                max_frequency=selected_max_freq,
-                audio_duration=selected_duration  # 新增
-            )
-            
+            success = sine_progress_config.update_config(**selected_values)
+        
+        profiles_changed, profiles_saved = self._save_profiles()
+        success = success and profiles_saved
+        
+        if config_changed or profiles_changed:
             if success:
                 print("悅耳進度條：設定已保存，準備重新初始化")
                 # 通知主插件重新初始化
@@ -348,24 +557,91 @@ class SineProgressSettingsPanel(SettingsPanel):
         else:
             print("悅耳進度條：設定無變更")
     
+    @staticmethod
+    def _find_plugin():
+        """查找正在運行的悅耳進度條插件實例"""
+        import globalPluginHandler
+        for plugin in globalPluginHandler.runningPlugins:
+            if hasattr(plugin, 'reload_configuration_async'):
+                return plugin
+        return None
+    
     def _notify_plugin_reload(self):
         """通知主插件重新載入配置"""
         try:
-            # 導入主插件並觸發重新初始化
-            import globalPluginHandler
-            
-            # 查找悅耳進度條插件實例
-            for plugin in globalPluginHandler.runningPlugins:
-                if hasattr(plugin, 'reload_configuration'):
-                    plugin.reload_configuration()
-                    print("悅耳進度條：已通知主插件重新載入配置")
-                    break
+            # 配置在背景線程套用，不阻塞設定對話框
+            plugin = self._find_plugin()
+            if plugin is not None:
+                plugin.reload_configuration_async(on_complete=self._on_plugin_reload_complete)
+                print("悅耳進度條：已通知主插件重新載入配置")
             else:
                 print("悅耳進度條：未找到主插件實例")
                 
         except Exception as e:
             print(f"悅耳進度條：通知主插件重新載入時發生錯誤: {e}")
     
+    def _get_preview_values(self):
+        """目前選擇的配置值，頻率範圍無效時返回None"""
+        values = self._get_selected_values()
+        if values['min_frequency'] >= values['max_frequency']:
+            return None
+        return values
+    
+    def _get_neighbour_preview_values(self, values):
+        """每個預覽選項前後各一個選擇的配置值（其他選項不變）"""
+        neighbours = []
+        for choice, field, options in self.preview_choices:
+            index = choice.GetSelection()
+            for neighbour_index in (index - 1, index + 1):
+                if 0 <= neighbour_index < len(options):
+                    neighbour = dict(values)
+                    neighbour[field] = options[neighbour_index]
+                    if neighbour['min_frequency'] < neighbour['max_frequency']:
+                        neighbours.append(neighbour)
+        return neighbours
+    
+    def _prerender_previews(self):
+        """在背景預先渲染當前選擇和相鄰選項的預覽掃頻"""
+        try:
+            plugin = self._find_plugin()
+            values = self._get_preview_values()
+            if plugin is not None and values is not None:
+                plugin.prerender_previews([values] + self._get_neighbour_preview_values(values))
+        except Exception as e:
+            print(f"悅耳進度條：預先渲染預覽時發生錯誤: {e}")
+    
+    def _play_preview(self):
+        """經由主插件的輸出流播放目前選擇的預覽掃頻"""
+        try:
+            plugin = self._find_plugin()
+            values = self._get_preview_values()
+            if plugin is not None and values is not None:
+                plugin.preview_settings(values)
+        except Exception as e:
+            print(f"悅耳進度條：播放預覽時發生錯誤: {e}")
+    
+    def onPreview(self, event):
+        """預覽按鈕點擊事件處理"""
+        self._play_preview()
+    
+    def onPreviewChoice(self, event):
+        """預覽選項變更時立即播放，並預先渲染新的相鄰選項"""
+        self._play_preview()
+        self._prerender_previews()
+        event.Skip()
+    
+    @staticmethod
+    def _on_plugin_reload_complete(success):
+        """主插件套用配置完成（在GUI線程調用，面板此時可能已關閉）"""
+        if success:
+            print("悅耳進度條：主插件已套用新配置")
+        else:
+            gui.messageBox(
+                "套用設定時發生錯誤，音頻系統可能無法正常播放。",
+                "套用錯誤",
+                wx.OK | wx.ICON_ERROR
+            )
+    
     def onDiscard(self):
         """放棄變更時的處理"""
         print("悅耳進度條：用戶放棄了設定變更")
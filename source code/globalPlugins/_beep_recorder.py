@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+# 悅耳進度條 - 提示音錄製模塊
+# 將攔截的tones.beep調用錄製為緊湊的二進制記錄檔，用於重播真實安裝程式的進度條音效突發（見benchmarks/replay_trace.py）
+
+import os
+import struct
+import threading
+import time
+import globalVars
+
+# 記錄檔格式：檔頭（標識, 版本, 每筆記錄大小, 錄製開始的時鐘時間, 記錄數量）+ 記錄
+TRACE_MAGIC = b'PPBT'
+TRACE_VERSION = 1
+TRACE_HEADER = struct.Struct('<4sHHdI')
+# 每筆記錄：(距離錄製開始的秒數, 頻率, 時長, 左聲道, 右聲道)，16字節
+TRACE_RECORD = struct.Struct('<dfHBB')
+
+# 記憶體中最多保留的記錄數量（約1MB），超出時覆蓋最舊的記錄
+DEFAULT_MAX_RECORDS = 65536
+
+TRACE_FILE_PREFIX = "pleasantProgress-trace-"
+TRACE_FILE_EXTENSION = ".ppbt"
+
+
+def get_trace_path(started_at):
+    """記錄檔路徑（NVDA配置目錄）"""
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(started_at))
+    return os.path.join(globalVars.appArgs.configPath, TRACE_FILE_PREFIX + stamp + TRACE_FILE_EXTENSION)
+
+
+def write_trace(path, started_at, records):
+    """寫入記錄檔，records為已按時間排序的打包記錄"""
+    count = len(records) // TRACE_RECORD.size
+    with open(path, 'wb') as trace_file:
+        trace_file.write(TRACE_HEADER.pack(TRACE_MAGIC, TRACE_VERSION, TRACE_RECORD.size, started_at, count))
+        trace_file.write(records)
+    return count
+
+
+def read_trace(path):
+    """讀取記錄檔，返回(錄製開始的時鐘時間, [(秒數, 頻率, 時長, 左聲道, 右聲道)])"""
+    with open(path, 'rb') as trace_file:
+        data = trace_file.read()
+    if len(data) < TRACE_HEADER.size:
+        raise ValueError("記錄檔不完整")
+    magic, version, record_size, started_at, count = TRACE_HEADER.unpack_from(data)
+    if magic != TRACE_MAGIC or version != TRACE_VERSION or record_size != TRACE_RECORD.size:
+        raise ValueError("不支援的記錄檔格式")
+    body = data[TRACE_HEADER.size:TRACE_HEADER.size + count * record_size]
+    return started_at, list(TRACE_RECORD.iter_unpack(body))
+
+
+class BeepRecorder:
+    """環形緩衝的提示音錄製器：記錄預先打包在固定大小的bytearray中，錄製期間不產生新物件"""
+
+    def __init__(self, max_records=DEFAULT_MAX_RECORDS):
+        self.max_records = max(1, max_records)
+        # 熱路徑只檢查此布林值
+        self.active = False
+        self.lock = threading.Lock()
+        self.buffer = None
+        self.next_index = 0
+        self.count = 0
+        self.started_at = 0.0
+        self.started_clock = 0.0
+
+    def start(self):
+        """開始錄製，已在錄製中返回False"""
+        with self.lock:
+            if self.active:
+                return False
+            self.buffer = bytearray(self.max_records * TRACE_RECORD.size)
+            self.next_index = 0
+            self.count = 0
+            self.started_at = time.time()
+            self.started_clock = time.perf_counter()
+            self.active = True
+        return True
+
+    def record(self, hz, length, left, right):
+        elapsed = time.perf_counter() - self.started_clock
+        with self.lock:
+            if not self.active:
+                return
+            TRACE_RECORD.pack_into(
+                self.buffer, self.next_index * TRACE_RECORD.size, elapsed, hz,
+                max(0, min(0xFFFF, int(length))), max(0, min(0xFF, int(left))), max(0, min(0xFF, int(right)))
+            )
+            self.next_index = (self.next_index + 1) % self.max_records
+            self.count = min(self.count + 1, self.max_records)
+
+    def stop(self):
+        """停止錄製，返回(錄製開始的時鐘時間, 按時間排序的打包記錄)"""
+        with self.lock:
+            self.active = False
+            buffer, count, next_index = self.buffer, self.count, self.next_index
+            self.buffer = None
+        if buffer is None:
+            return self.started_at, b''
+        split = next_index * TRACE_RECORD.size
+        if count < self.max_records:
+            return self.started_at, bytes(buffer[:split])
+        # 緩衝已滿：最舊的記錄從下一個寫入位置開始
+        return self.started_at, bytes(buffer[split:] + buffer[:split])
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+# 悅耳進度條 - 日誌模塊
+# 分級日誌：停用的級別在格式化參數前就返回，熱路徑的調試日誌不產生任何字串；另以環形緩衝保留最近的提示音記錄，按需寫入日誌
+
+import threading
+import time
+from collections import deque
+
+# 日誌級別
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+# 配置中的日誌級別名稱 -> 級別
+LOG_LEVELS = {
+    'debug': DEBUG,
+    'info': INFO,
+    'warning': WARNING,
+}
+
+DEFAULT_LOG_LEVEL = INFO
+
+# 提示音記錄的環形緩衝大小
+DEFAULT_TRACE_CAPACITY = 256
+
+# 提示音記錄的處理方式
+TRACE_PROGRESS = 'progress'        # 進度條音效，交由守護線程播放
+TRACE_GENERIC = 'generic'          # 接管的其他提示音
+TRACE_PASSTHROUGH = 'passthrough'  # 交回NVDA原始函數播放
+
+TRACE_OUTCOME_NAMES = {
+    TRACE_PROGRESS: '進度條音效',
+    TRACE_GENERIC: '接管提示音',
+    TRACE_PASSTHROUGH: '原始音效',
+}
+
+
+class LeveledLogger:
+    """分級日誌：訊息以%格式化，只在級別啟用時才格式化參數並輸出"""
+
+    def __init__(self, prefix, level=DEFAULT_LOG_LEVEL):
+        self.prefix = prefix
+        self.level = level
+        # 熱路徑直接讀取的布林值，無需每次比較級別
+        self.debug_enabled = level <= DEBUG
+
+    def set_level(self, level):
+        self.level = level
+        self.debug_enabled = level <= DEBUG
+
+    def is_enabled(self, level):
+        return level >= self.level
+
+    def _emit(self, message, args):
+        if args:
+            message = message % args
+        print(self.prefix + message)
+
+    def debug(self, message, *args):
+        if self.debug_enabled:
+            self._emit(message, args)
+
+    def info(self, message, *args):
+        if self.level <= INFO:
+            self._emit(message, args)
+
+    def warning(self, message, *args):
+        if self.level <= WARNING:
+            self._emit("警告：" + message, args)
+
+    def error(self, message, *args):
+        # 錯誤總是輸出
+        self._emit(message, args)
+
+
+class BeepTrace:
+    """最近提示音的環形緩衝：只保存原始數值，寫入日誌時才格式化"""
+
+    def __init__(self, capacity=DEFAULT_TRACE_CAPACITY):
+        # 條目：(時間戳, 頻率, 時長, 左聲道, 右聲道, 處理方式)
+        self.entries = deque(maxlen=max(1, capacity))
+        self.lock = threading.Lock()
+
+    def record(self, hz, length, left, right, outcome):
+        # deque達到上限時自動移除最舊的條目
+        entry = (time.perf_counter(), hz, length, left, right, outcome)
+        with self.lock:
+            self.entries.append(entry)
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.entries)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def format_lines(self, entries=None):
+        """將記錄格式化為日誌行，時間以最後一個條目為基準（負數表示多少秒前）"""
+        if entries is None:
+            entries = self.snapshot()
+        if not entries:
+            return []
+        last_time = entries[-1][0]
+        lines = []
+        for timestamp, hz, length, left, right, outcome in entries:
+            lines.append(f"  {timestamp - last_time:+9.3f}s  {hz:7.1f}Hz  {length:4}ms  L{left:>3} R{right:>3}  "
+                         f"{TRACE_OUTCOME_NAMES.get(outcome, outcome)}")
+        return lines
+
+    def dump(self, logger):
+        """將最近的提示音記錄寫入日誌（不受日誌級別限制），返回條目數"""
+        entries = self.snapshot()
+        print(f"{logger.prefix}最近 {len(entries)} 個提示音記錄（最多 {self.entries.maxlen} 個）：")
+        for line in self.format_lines(entries):
+            print(line)
+        return len(entries)
+
+
+# 插件共用的日誌實例
+log = LeveledLogger("悅耳進度條：")
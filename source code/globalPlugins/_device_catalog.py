@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+# 悅耳進度條 - 輸出設備目錄模塊
+# 按全局索引、標準化名稱、Host API和GUID片段索引PyAudio輸出設備，以詞元倒排索引匹配任意廠商的NVDA設備ID
+
+import math
+import re
+
+# 名稱詞元：連續的字母數字（含中文等Unicode文字）
+_TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+# 設備ID中的GUID片段，例如 {0.0.0.00000000}.{3487e654-...}
+_GUID_PATTERN = re.compile(r'\{([^}]+)\}')
+
+# MME會把設備名稱截斷為31個字符，最後一個詞元可能不完整，允許以前綴匹配的最短長度
+MIN_PREFIX_TOKEN_LENGTH = 3
+
+# 名稱匹配的門檻：匹配詞元的權重須佔查詢名稱總權重的比例，且匹配權重至少相當於只出現在一半設備中的詞元
+# 未達門檻時不匹配，由調用者改用默認設備，避免未知的設備只因共有"speakers"、"audio"等通用詞元而播放到其他硬件上
+MIN_MATCH_COVERAGE = 0.6
+MIN_MATCH_WEIGHT = math.log(2.0)
+
+
+def normalize_device_name(name):
+    """標準化設備名稱：小寫、合併空白"""
+    return ' '.join(str(name or '').lower().split())
+
+
+def tokenize(text):
+    """將設備名稱或設備ID拆分為詞元"""
+    return _TOKEN_PATTERN.findall(str(text or '').lower())
+
+
+def extract_guid_parts(device_id):
+    """提取設備ID中的所有GUID片段（小寫，不含大括號）"""
+    return [guid.lower() for guid in _GUID_PATTERN.findall(str(device_id or ''))]
+
+
+def get_nvda_endpoint_names():
+    """讀取NVDA列出的輸出設備 {設備ID: 名稱}，新版NVDA的設備ID為WASAPI端點ID，舊版為設備名稱"""
+    # NVDA 2025+
+    try:
+        from utils.mmdevice import _getOutputDevices
+        return {device_id: name for device_id, name in _getOutputDevices()}
+    except Exception:
+        pass
+
+    try:
+        import nvwave
+    except ImportError:
+        return {}
+
+    # NVDA 2023.2 - 2024.x
+    get_output_devices = getattr(nvwave, '_getOutputDevices', None)
+    if get_output_devices is not None:
+        try:
+            return {device_id: name for device_id, name in get_output_devices()}
+        except Exception:
+            pass
+
+    # 更舊的版本只有設備名稱
+    get_output_device_names = getattr(nvwave, 'getOutputDeviceNames', None)
+    if get_output_device_names is not None:
+        try:
+            return {name: name for name in get_output_device_names()}
+        except Exception:
+            pass
+
+    return {}
+
+
+class DeviceCatalog:
+    """輸出設備目錄：建立一次索引，之後每次匹配只查看查詢詞元的倒排列表"""
+
+    def __init__(self, device_list=(), endpoint_names=None):
+        # 全局索引 -> 設備信息
+        self.by_index = {}
+        # 標準化名稱 -> [全局索引]
+        self.by_name = {}
+        # Host API名稱（小寫） -> [全局索引]
+        self.by_host_api = {}
+        # 詞元 -> {全局索引}
+        self.token_index = {}
+        # 全局索引 -> 名稱的詞元數
+        self.name_token_counts = {}
+        # 詞元 -> 逆文檔頻率權重
+        self.token_weights = {}
+        # 詞元首字母 -> [詞元]，用於截斷名稱的前綴匹配
+        self.tokens_by_initial = {}
+        # NVDA設備ID的GUID片段 -> NVDA設備名稱
+        self.endpoint_names = {}
+        self.guid_index = {}
+
+        self.build(device_list, endpoint_names)
+
+    def build(self, device_list, endpoint_names=None):
+        """重新建立所有索引"""
+        self.by_index.clear()
+        self.by_name.clear()
+        self.by_host_api.clear()
+        self.token_index.clear()
+        self.name_token_counts.clear()
+        self.token_weights.clear()
+        self.tokens_by_initial.clear()
+
+        for device_info in device_list:
+            device_index = device_info.get('index')
+            if device_index is None:
+                continue
+            self.by_index[device_index] = device_info
+            self.by_name.setdefault(normalize_device_name(device_info.get('name')), []).append(device_index)
+            host_api = str(device_info.get('host_api_name', '')).lower()
+            self.by_host_api.setdefault(host_api, []).append(device_index)
+            name_tokens = set(tokenize(device_info.get('name')))
+            self.name_token_counts[device_index] = len(name_tokens)
+            for token in name_tokens:
+                self.token_index.setdefault(token, set()).add(device_index)
+
+        # 出現在所有設備名稱中的詞元（例如"audio"）權重為0，廠商和型號等少見詞元權重較高
+        device_count = len(self.by_index)
+        for token, postings in self.token_index.items():
+            self.token_weights[token] = math.log(float(device_count) / len(postings))
+            self.tokens_by_initial.setdefault(token[0], []).append(token)
+
+        self.set_endpoint_names(endpoint_names or {})
+
+    def set_endpoint_names(self, endpoint_names):
+        """更新NVDA設備ID到名稱的對照表，並按GUID片段建立索引"""
+        self.endpoint_names = dict(endpoint_names)
+        self.guid_index = {}
+        shared_parts = set()
+        for device_id, name in self.endpoint_names.items():
+            for guid_part in extract_guid_parts(device_id):
+                if guid_part in self.guid_index:
+                    shared_parts.add(guid_part)
+                self.guid_index[guid_part] = name
+        # 多個端點共有的片段（例如端點類型前綴 {0.0.0.00000000}）無法區分設備
+        for guid_part in shared_parts:
+            del self.guid_index[guid_part]
+
+    def __len__(self):
+        return len(self.by_index)
+
+    def get(self, device_index):
+        return self.by_index.get(device_index)
+
+    def devices_for_host_api(self, host_api_name):
+        """某個Host API下的所有設備信息"""
+        return [self.by_index[i] for i in self.by_host_api.get(str(host_api_name).lower(), [])]
+
+    def get_endpoint_name(self, nvda_device_id):
+        """查找NVDA設備ID對應的設備名稱（先整個ID，再按GUID片段）"""
+        name = self.endpoint_names.get(nvda_device_id)
+        if name:
+            return name
+        for guid_part in extract_guid_parts(nvda_device_id):
+            name = self.guid_index.get(guid_part)
+            if name:
+                return name
+        return None
+
+    def _best_by_priority(self, device_indexes):
+        """同分時選擇Host API優先級最高的設備"""
+        return max(device_indexes, key=lambda i: self.by_index[i].get('host_api_priority', 0))
+
+    def _expand_token(self, token):
+        """查找詞元的倒排列表：完全匹配，或作為截斷名稱的前綴匹配"""
+        if token in self.token_index:
+            return [token]
+        if len(token) < MIN_PREFIX_TOKEN_LENGTH:
+            return []
+        return [
+            candidate for candidate in self.tokens_by_initial.get(token[0], ())
+            if len(candidate) >= MIN_PREFIX_TOKEN_LENGTH
+            and (candidate.startswith(token) or token.startswith(candidate))
+        ]
+
+    def _query_token_weight(self, expanded_tokens):
+        """查詢詞元的權重：取匹配詞元的最高權重，目錄中沒有的詞元（例如未知的型號）視為只屬於一個設備"""
+        if not expanded_tokens:
+            return math.log(float(len(self.by_index)))
+        return max(self.token_weights[token] for token in expanded_tokens)
+
+    def match_name(self, name):
+        """按名稱匹配設備，返回(全局索引, 分數)，沒有足夠可信的匹配返回(None, 0)"""
+        normalized = normalize_device_name(name)
+        if not normalized or not self.by_index:
+            return None, 0.0
+
+        exact = self.by_name.get(normalized)
+        if exact:
+            return self._best_by_priority(exact), float('inf')
+
+        query_tokens = set(tokenize(normalized))
+        query_weight = 0.0
+        scores = {}
+        for query_token in query_tokens:
+            expanded_tokens = self._expand_token(query_token)
+            query_weight += self._query_token_weight(expanded_tokens)
+            for token in expanded_tokens:
+                weight = self.token_weights[token]
+                if weight <= 0:
+                    continue
+                for device_index in self.token_index[token]:
+                    scores[device_index] = scores.get(device_index, 0.0) + weight
+
+        if not scores:
+            return None, 0.0
+
+        # 分數相同時Host API優先級高（WASAPI優先於MME）的設備優先，再按詞元覆蓋率（名稱多餘詞元少）
+        def rank(device_index):
+            return (
+                round(scores[device_index], 9),
+                self.by_index[device_index].get('host_api_priority', 0),
+                -abs(self.name_token_counts[device_index] - len(query_tokens)),
+            )
+
+        best_index = max(scores, key=rank)
+        best_score = scores[best_index]
+        if best_score < MIN_MATCH_WEIGHT or best_score < MIN_MATCH_COVERAGE * query_weight:
+            return None, 0.0
+        return best_index, best_score
@@ -5,19 +5,56 @@ import threading
 import time
 import wx
 import ui
+from ._tone_synth import normalize_sample_rate, choose_native_format
+from ._device_catalog import DeviceCatalog, extract_guid_parts, get_nvda_endpoint_names
+from ._debug_log import log
+
+# 無法訂閱NVDA配置通知時，後備輪詢的檢查間隔（秒）
+FALLBACK_POLL_INTERVAL = 2.0
+# 檢測到設備變更後的快速檢查間隔（秒）和次數
+FALLBACK_RAPID_INTERVAL = 0.5
+FALLBACK_RAPID_CHECKS = 3
+
+# 等待首次設備枚舉的最長時間（秒），逾時則先使用默認設備
+# 只限制等待的時間：枚舉無法中途取消，較晚完成的結果仍會發佈並經由設備列表回調切換設備
+ENUMERATION_TIMEOUT = 5.0
+
+
+def get_device_key(device_info):
+    """設備在兩次枚舉之間的比較鍵"""
+    return (device_info.get('index'), device_info.get('name'), device_info.get('host_api_name'))
+
+
+def diff_device_lists(old_list, new_list):
+    """比較兩次枚舉結果，返回(新增的設備, 移除的設備)"""
+    old_keys = {get_device_key(device_info) for device_info in old_list}
+    new_keys = {get_device_key(device_info) for device_info in new_list}
+    added = [device_info for device_info in new_list if get_device_key(device_info) not in old_keys]
+    removed = [device_info for device_info in old_list if get_device_key(device_info) not in new_keys]
+    return added, removed
 
 class NVDADeviceMonitor:
     """NVDA音頻設備監聽器"""
     
-    def __init__(self, on_device_change_callback=None, debug_mode=False, pyaudio_instance_getter=None):
+    def __init__(self, on_device_change_callback=None, pyaudio_instance_getter=None,
+                 on_device_list_change_callback=None, rescan_runner=None):
         self.on_device_change_callback = on_device_change_callback
-        self.debug_mode = debug_mode
+        # 設備列表變更回調：(新增的設備列表, 移除的設備列表)
+        self.on_device_list_change_callback = on_device_list_change_callback
         self.pyaudio_instance_getter = pyaudio_instance_getter  # 獲取PyAudio實例的回調函數
+        # 重新掃描回調：rescan_runner(refresh)在釋放調用者持有的PortAudio後調用refresh並返回其結果
+        # PortAudio只在所有實例終止後重新初始化時才重新掃描設備
+        self.rescan_runner = rescan_runner
         
         # 監聽狀態
         self.monitoring_enabled = True
         self.monitoring_thread = None
         self.thread_running = False
+        self.stop_event = threading.Event()
+        self.check_lock = threading.Lock()
+        
+        # 已訂閱的NVDA通知（extensionPoints.Action列表）
+        self.registered_notifications = []
         
         # 配置引用
         self.audio_config_section = None
@@ -26,13 +63,40 @@ class NVDADeviceMonitor:
         # 設備緩存
         self.device_cache = {}
         self.pyaudio_device_list = []
+        self.device_catalog = DeviceCatalog()
+        
+        # 設備ID解析結果緩存：(NVDA設備ID, 設備列表指紋) -> PyAudio索引 / 友好名稱
+        # 只在設備枚舉結果變更時清理
+        self.device_list_fingerprint = None
+        self.resolved_index_cache = {}
+        self.friendly_name_cache = {}
+        
+        # 後台設備枚舉
+        self.enumeration_lock = threading.Lock()
+        self.enumeration_thread = None
+        self.enumeration_pending = False
+        self.rescan_requested = False
+        # 首次枚舉完成後保持設置，之後的重新掃描不會使等待設備列表的調用者再次等待
+        self.enumeration_done = threading.Event()
+        # 上次枚舉時NVDA列出的輸出端點，端點變更（設備插拔）時才重新掃描PortAudio
+        self.endpoint_names = None
         
         # 初始化
         self.setup_config_monitoring()
-        self.refresh_device_list()
+        self.refresh_device_list_async()
         
     def setup_config_monitoring(self):
         """設置NVDA音頻配置監聽"""
+        if self.resolve_audio_config_section():
+            self.last_audio_device = self.audio_config_section.get("outputDevice", "default")
+            
+            if log.debug_enabled:
+                print(f"NVDADeviceMonitor: 當前設備 = '{self.last_audio_device}'")
+        else:
+            self.last_audio_device = None
+
+    def resolve_audio_config_section(self):
+        """獲取輸出設備所在的配置段（切換配置檔案後需要重新獲取）"""
         try:
             import config
             import versionInfo
@@ -44,16 +108,73 @@ class NVDADeviceMonitor:
                 self.audio_config_section = config.conf["speech"]
                 config_path = "config.conf['speech']['outputDevice']"
             
-            self.last_audio_device = self.audio_config_section.get("outputDevice", "default")
-            
-            if self.debug_mode:
+            if log.debug_enabled:
                 print(f"NVDADeviceMonitor: 配置路徑 = {config_path}")
-                print(f"NVDADeviceMonitor: 當前設備 = '{self.last_audio_device}'")
+            return True
             
         except Exception as e:
             print(f"NVDADeviceMonitor: 設置監聽失敗 - {e}")
             self.audio_config_section = None
-            self.last_audio_device = None
+            return False
+
+    def get_config_notifications(self):
+        """收集可訂閱的NVDA通知：配置檔案切換、保存、重置，以及語音合成器重新載入（更改輸出設備時發生）"""
+        notifications = []
+        try:
+            import config
+            for name in ('post_configProfileSwitch', 'post_configSave', 'post_configReset'):
+                action = getattr(config, name, None)
+                if action is not None:
+                    notifications.append(action)
+        except ImportError:
+            pass
+        
+        try:
+            import synthDriverHandler
+            action = getattr(synthDriverHandler, 'synthChanged', None)
+            if action is not None:
+                notifications.append(action)
+        except ImportError:
+            pass
+        
+        return notifications
+
+    def register_config_notifications(self):
+        """訂閱NVDA通知，成功訂閱至少一個通知時返回True"""
+        for action in self.get_config_notifications():
+            try:
+                action.register(self._on_config_notification)
+                self.registered_notifications.append(action)
+            except Exception as e:
+                if log.debug_enabled:
+                    print(f"NVDADeviceMonitor: 訂閱通知失敗 - {e}")
+        
+        return bool(self.registered_notifications)
+
+    def unregister_config_notifications(self):
+        """取消訂閱NVDA通知"""
+        for action in self.registered_notifications:
+            try:
+                action.unregister(self._on_config_notification)
+            except Exception as e:
+                if log.debug_enabled:
+                    print(f"NVDADeviceMonitor: 取消訂閱通知失敗 - {e}")
+        self.registered_notifications = []
+
+    def _on_config_notification(self, *args, **kwargs):
+        """NVDA配置變更通知：立即檢查輸出設備"""
+        if not self.monitoring_enabled:
+            return
+        
+        try:
+            # 切換或重置配置檔案後，原來的配置段對象可能已被替換
+            self.resolve_audio_config_section()
+            self._check_device_change()
+            # 設備插拔時NVDA會重新載入語音合成器，檢查端點是否變更
+            self.refresh_device_list_async()
+        except Exception as e:
+            if log.debug_enabled:
+                print(f"NVDADeviceMonitor: 處理配置通知錯誤 - {e}")
 
     def old_refresh_device_list(self):
         """刷新PyAudio設備列表並建立緩存"""
@@ -88,18 +209,18 @@ class NVDADeviceMonitor:
                         device_name = device_info.get('name', f'Device {i}')
                         self.device_cache[device_name] = i
                         
-                        if self.debug_mode:
+                        if log.debug_enabled:
                             print(f"NVDADeviceMonitor: 發現輸出設備 {i}: {device_name}")
                 
                 except Exception as e:
-                    if self.debug_mode:
+                    if log.debug_enabled:
                         print(f"NVDADeviceMonitor: 獲取設備 {i} 信息失敗: {e}")
             
             # 清理臨時實例
             if hasattr(temp_pyaudio, 'terminate'):
                 temp_pyaudio.terminate()
             
-            if self.debug_mode:
+            if log.debug_enabled:
                 print(f"NVDADeviceMonitor: 設備列表刷新完成，找到 {len(self.pyaudio_device_list)} 個輸出設備")
             
             return True
@@ -108,40 +229,169 @@ class NVDADeviceMonitor:
             print(f"NVDADeviceMonitor: 刷新設備列表失敗: {e}")
             return False
 
-    def refresh_device_list(self):
-        """刷新PyAudio設備列表並建立緩存 - 參考ooo.py改進"""
+    def enumerate_output_devices(self):
+        """枚舉所有輸出設備並返回新列表（不修改當前列表），失敗返回None"""
         try:
             if not self.pyaudio_instance_getter:
-                return False
+                return None
             
             # 獲取PyAudio實例（臨時）
             temp_pyaudio = self.pyaudio_instance_getter()
             if not temp_pyaudio:
-                return False
-            
-            self.pyaudio_device_list = []
-            self.device_cache.clear()
-            
-            # 檢查是否有Host API信息
-            if hasattr(temp_pyaudio, 'host_apis') and hasattr(temp_pyaudio, 'preferred_host_api'):
-                # 使用Host API優先級掃描
-                self.scan_devices_by_host_api_priority(temp_pyaudio)
-            else:
-                # 降級到簡單掃描
-                self.scan_devices_simple(temp_pyaudio)
+                return None
             
-            temp_pyaudio.terminate()
+            device_list = []
+            try:
+                # 檢查是否有Host API信息
+                if hasattr(temp_pyaudio, 'host_apis') and hasattr(temp_pyaudio, 'preferred_host_api'):
+                    # 使用Host API優先級掃描
+                    self.scan_devices_by_host_api_priority(temp_pyaudio, device_list)
+                else:
+                    # 降級到簡單掃描
+                    self.scan_devices_simple(temp_pyaudio, device_list)
+            finally:
+                temp_pyaudio.terminate()
             
-            if self.debug_mode:
-                print(f"NVDADeviceMonitor: 設備列表刷新完成，找到 {len(self.pyaudio_device_list)} 個輸出設備")
+            return device_list
             
+        except Exception as e:
+            print(f"NVDADeviceMonitor: 枚舉設備失敗: {e}")
+            return None
+
+    def publish_device_list(self, device_list, endpoint_names=None):
+        """以新的枚舉結果替換設備列表，只通知新增和移除的設備，返回列表是否變更"""
+        old_list = self.pyaudio_device_list
+        added, removed = diff_device_lists(old_list, device_list)
+        
+        # 新列表整個替換，讀取中的線程仍看到完整的舊列表
+        self.pyaudio_device_list = device_list
+        self.device_cache = {device_info['name']: device_info['index'] for device_info in device_list}
+        if not self.update_device_list_fingerprint(endpoint_names):
+            return False
+        
+        if log.debug_enabled:
+            for device_info in added:
+                print(f"NVDADeviceMonitor: + 設備 {device_info.get('index')}: {device_info.get('name')} ({device_info.get('host_api_name', 'Unknown')})")
+            for device_info in removed:
+                print(f"NVDADeviceMonitor: - 設備 {device_info.get('index')}: {device_info.get('name')} ({device_info.get('host_api_name', 'Unknown')})")
+        
+        if (added or removed) and self.on_device_list_change_callback:
+            try:
+                self.on_device_list_change_callback(added, removed)
+            except Exception as e:
+                print(f"NVDADeviceMonitor: 設備列表回調函數錯誤 - {e}")
+        
+        return True
+
+    def refresh_device_list(self, endpoint_names=None):
+        """在當前線程刷新PyAudio設備列表並建立緩存"""
+        device_list = self.enumerate_output_devices()
+        if device_list is None:
+            return False
+        
+        self.publish_device_list(device_list, endpoint_names)
+        
+        if log.debug_enabled:
+            print(f"NVDADeviceMonitor: 設備列表刷新完成，找到 {len(self.pyaudio_device_list)} 個輸出設備")
+        
+        return True
+
+    def rescan_device_list(self, force_rescan=False):
+        """首次直接枚舉；之後只在NVDA列出的端點變更或force_rescan時，經由rescan_runner重新掃描設備"""
+        endpoint_names = get_nvda_endpoint_names()
+        if self.endpoint_names is None:
+            succeeded = self.refresh_device_list(endpoint_names)
+        elif force_rescan or endpoint_names != self.endpoint_names:
+            if log.debug_enabled:
+                print("NVDADeviceMonitor: 輸出端點已變更，重新掃描設備")
+            refresh = lambda: self.refresh_device_list(endpoint_names)
+            succeeded = self.rescan_runner(refresh) if self.rescan_runner else refresh()
+        else:
             return True
+        
+        if succeeded:
+            self.endpoint_names = endpoint_names
+        return succeeded
+
+    def refresh_device_list_async(self, force_rescan=False):
+        """在後台線程刷新設備列表並立即返回，正在枚舉時排隊再刷新一次"""
+        if not self.pyaudio_instance_getter:
+            self.enumeration_done.set()
+            return False
+        
+        with self.enumeration_lock:
+            self.rescan_requested = self.rescan_requested or force_rescan
+            if self.enumeration_thread is not None:
+                self.enumeration_pending = True
+                return False
             
-        except Exception as e:
-            print(f"NVDADeviceMonitor: 刷新設備列表失敗: {e}")
+            self.enumeration_thread = threading.Thread(
+                target=self._enumeration_worker,
+                daemon=True
+            )
+            self.enumeration_thread.start()
+        return True
+
+    def wait_for_device_list(self, timeout=ENUMERATION_TIMEOUT):
+        """等待首次枚舉完成，逾時返回False（枚舉仍在後台繼續）"""
+        return self.enumeration_done.wait(timeout)
+
+    def _enumeration_worker(self):
+        """後台設備枚舉線程"""
+        while True:
+            with self.enumeration_lock:
+                force_rescan = self.rescan_requested
+                self.rescan_requested = False
+            
+            started = time.time()
+            try:
+                self.rescan_device_list(force_rescan)
+            except Exception as e:
+                print(f"NVDADeviceMonitor: 重新掃描設備失敗: {e}")
+            elapsed = time.time() - started
+            
+            if elapsed > ENUMERATION_TIMEOUT:
+                print(f"NVDADeviceMonitor: 設備枚舉耗時 {elapsed:.1f} 秒，超過 {ENUMERATION_TIMEOUT} 秒")
+            
+            with self.enumeration_lock:
+                if not self.enumeration_pending:
+                    self.enumeration_thread = None
+                    self.enumeration_done.set()
+                    return
+                self.enumeration_pending = False
+
+    def get_device_list_fingerprint(self, endpoint_names=None):
+        """生成設備列表指紋：索引、名稱、Host API、優先級或NVDA端點任一變更都視為枚舉結果變更"""
+        devices = tuple(
+            (
+                device_info.get('index'),
+                device_info.get('name'),
+                device_info.get('host_api_name'),
+                device_info.get('host_api_priority', 0),
+                device_info.get('maxOutputChannels', 0),
+            )
+            for device_info in self.pyaudio_device_list
+        )
+        return devices, tuple(sorted((endpoint_names or {}).items()))
+
+    def update_device_list_fingerprint(self, endpoint_names=None):
+        """更新設備列表指紋，枚舉結果變更時清理設備ID解析緩存，返回是否變更"""
+        if endpoint_names is None:
+            endpoint_names = get_nvda_endpoint_names()
+        fingerprint = self.get_device_list_fingerprint(endpoint_names)
+        if fingerprint == self.device_list_fingerprint:
             return False
+        
+        self.device_list_fingerprint = fingerprint
+        self.device_catalog.build(self.pyaudio_device_list, endpoint_names)
+        self.resolved_index_cache.clear()
+        self.friendly_name_cache.clear()
+        
+        if log.debug_enabled:
+            print("NVDADeviceMonitor: 設備列表已變更，清理設備ID解析緩存")
+        return True
 
-    def scan_devices_by_host_api_priority(self, temp_pyaudio):
+    def scan_devices_by_host_api_priority(self, temp_pyaudio, device_list):
         """按Host API優先級掃描設備 - 參考ooo.py"""
         try:
             # 構建Host API優先級列表
@@ -162,16 +412,12 @@ class NVDADeviceMonitor:
                     else:
                         host_api_priority.append(api_index)
             
-            if self.debug_mode:
+            if log.debug_enabled:
                 api_names = [temp_pyaudio.host_apis[i]['name'] for i in host_api_priority]
                 print(f"NVDADeviceMonitor: 設備掃描順序: {api_names}")
             
             # 按優先級掃描設備
             for api_index in host_api_priority:
-                api_name = temp_pyaudio.host_apis[api_index]['name']
-                if self.debug_mode:
-                    print(f"NVDADeviceMonitor: 掃描 {api_name} (Host API {api_index})")
-                
                 devices = temp_pyaudio.get_devices_by_host_api(api_index)
                 
                 for device in devices:
@@ -184,17 +430,14 @@ class NVDADeviceMonitor:
                             # 添加優先級信息
                             device_info['host_api_priority'] = len(host_api_priority) - host_api_priority.index(api_index)
                             
-                            self.pyaudio_device_list.append(device_info)
-                            self.device_cache[device_info['name']] = global_index
-                            
-                            if self.debug_mode:
-                                print(f"NVDADeviceMonitor: ✓ 設備 {global_index}: {device_info['name']} ({api_name})")
+                            device_list.append(device_info)
                         
         except Exception as e:
             print(f"NVDADeviceMonitor: Host API優先級掃描失敗: {e}")
-            self.scan_devices_simple(temp_pyaudio)
+            del device_list[:]
+            self.scan_devices_simple(temp_pyaudio, device_list)
 
-    def scan_devices_simple(self, temp_pyaudio):
+    def scan_devices_simple(self, temp_pyaudio, device_list):
         """簡單設備掃描 - 降級方案"""
         try:
             import _portaudio as pa
@@ -203,57 +446,35 @@ class NVDADeviceMonitor:
             for i in range(device_count):
                 device_info = temp_pyaudio.get_device_info_by_index(i)
                 if device_info and device_info.get('maxOutputChannels', 0) > 0:
-                    self.pyaudio_device_list.append(device_info)
-                    self.device_cache[device_info['name']] = i
-                    
-                    if self.debug_mode:
-                        print(f"NVDADeviceMonitor: 設備 {i}: {device_info['name']}")
+                    device_list.append(device_info)
                         
         except Exception as e:
             print(f"NVDADeviceMonitor: 簡單掃描失敗: {e}")
         
     def get_device_friendly_name(self, device_id):
-        """根據設備ID獲取友好名稱 - 動態查找"""
+        """根據設備ID獲取友好名稱（同一設備列表下只解析一次）"""
+        if not device_id or device_id == "default":
+            return "預設設備"
+        
+        cache_key = (device_id, self.device_list_fingerprint)
+        friendly_name = self.friendly_name_cache.get(cache_key)
+        if friendly_name is None:
+            friendly_name = self.resolve_device_friendly_name(device_id)
+            self.friendly_name_cache[cache_key] = friendly_name
+        return friendly_name
+
+    def resolve_device_friendly_name(self, device_id):
+        """根據設備ID獲取友好名稱：映射到的PyAudio設備名稱，其次是NVDA列出的設備名稱"""
         try:
-            if not device_id or device_id == "default":
-                return "預設設備"
-            
-            # 嘗試通過動態映射找到對應的PyAudio設備
             mapped_index = self.convert_nvda_device_to_pyaudio_index(device_id)
-            
             if mapped_index is not None:
-                # 找到了映射索引，查找對應的設備名稱
-                for device_info in self.pyaudio_device_list:
-                    if device_info.get('index') == mapped_index:
-                        return device_info.get('name', f'設備 {mapped_index}')
-            
-            # 如果沒找到映射，嘗試從設備ID推斷類型
-            device_id_lower = device_id.lower()
-            
-            # 根據GUID特徵推斷設備類型
-            if 'realtek' in device_id_lower or '3487e654' in device_id_lower:
-                # 查找任何Realtek設備作為候選
-                for device_info in self.pyaudio_device_list:
-                    device_name = device_info.get('name', '').lower()
-                    if 'realtek' in device_name and ('digital' in device_name or 'spdif' in device_name):
-                        return device_info.get('name', 'Realtek Digital Output')
-                return "Realtek Digital Output (推斷)"
-                
-            elif 'universal' in device_id_lower or 'ad6ebfcf' in device_id_lower:
-                # 查找任何Universal Audio設備作為候選
-                for device_info in self.pyaudio_device_list:
-                    device_name = device_info.get('name', '').lower()
-                    if 'universal audio' in device_name:
-                        return device_info.get('name', 'Universal Audio設備')
-                return "喇叭 (Universal Audio Thunderbolt WDM)"
-                
-            elif 'nvidia' in device_id_lower:
-                # 查找任何NVIDIA設備作為候選
-                for device_info in self.pyaudio_device_list:
-                    device_name = device_info.get('name', '').lower()
-                    if 'nvidia' in device_name:
-                        return device_info.get('name', 'NVIDIA音頻設備')
-                return "NVIDIA音頻設備 (推斷)"
+                device_info = self.device_catalog.get(mapped_index)
+                if device_info:
+                    return device_info.get('name', f'設備 {mapped_index}')
+            
+            endpoint_name = self.device_catalog.get_endpoint_name(device_id)
+            if endpoint_name:
+                return endpoint_name
             
             # 降級方案：直接顯示設備ID的最後幾位
             if len(device_id) > 16:
@@ -262,7 +483,7 @@ class NVDADeviceMonitor:
                 return f"音頻設備 ({device_id})"
             
         except Exception as e:
-            if self.debug_mode:
+            if log.debug_enabled:
                 print(f"NVDADeviceMonitor: 獲取友好名稱失敗: {e}")
             return "未知設備"
 
@@ -297,13 +518,13 @@ class NVDADeviceMonitor:
             # 簡化方案：返回默認設備索引，讓PyAudio自動處理
             # 在實際情況下可能需要更複雜的設備ID解析
             
-            if self.debug_mode:
+            if log.debug_enabled:
                 print(f"NVDADeviceMonitor: 設備ID轉換 - NVDA: {nvda_device_id} -> PyAudio: 使用默認")
             
             return None  # None表示使用PyAudio的默認設備
             
         except Exception as e:
-            if self.debug_mode:
+            if log.debug_enabled:
                 print(f"NVDADeviceMonitor: 設備ID轉換失敗: {e}")
             return None
 
@@ -346,16 +567,16 @@ class NVDADeviceMonitor:
                                     # 找到匹配的設備，返回對應的PyAudio索引
                                     # 這裡需要將Windows設備索引映射到PyAudio索引
                                     # 簡化實現：假設索引順序一致
-                                    if self.debug_mode:
+                                    if log.debug_enabled:
                                         print(f"NVDADeviceMonitor: 找到匹配設備，Windows索引: {i} -> PyAudio索引: {i}")
                                     return i
                         
                         except Exception as com_error:
-                            if self.debug_mode:
+                            if log.debug_enabled:
                                 print(f"NVDADeviceMonitor: COM接口查找設備失敗: {com_error}")
             
             except ImportError:
-                if self.debug_mode:
+                if log.debug_enabled:
                     print("NVDADeviceMonitor: comtypes不可用，無法使用Windows COM API")
             
             # 降級方案：嘗試通過設備名稱匹配（如果PyAudio提供了真實設備名稱）
@@ -371,26 +592,36 @@ class NVDADeviceMonitor:
                     
                     temp_pyaudio.terminate()
                 except Exception as e:
-                    if self.debug_mode:
+                    if log.debug_enabled:
                         print(f"NVDADeviceMonitor: 降級匹配失敗: {e}")
                     if hasattr(temp_pyaudio, 'terminate'):
                         temp_pyaudio.terminate()
             
-            if self.debug_mode:
+            if log.debug_enabled:
                 print(f"NVDADeviceMonitor: 無法轉換設備ID，使用默認設備 - NVDA: {nvda_device_id}")
             
             return None  # 無法匹配，使用默認設備
             
         except Exception as e:
-            if self.debug_mode:
+            if log.debug_enabled:
                 print(f"NVDADeviceMonitor: 設備ID轉換錯誤: {e}")
             return None
 
     def convert_nvda_device_to_pyaudio_index(self, nvda_device_id):
-        """智能映射NVDA設備到PyAudio索引 - 參考ooo.py改進"""
+        """映射NVDA設備到PyAudio索引（同一設備列表下只解析一次）"""
         if not nvda_device_id or nvda_device_id == "default":
             return None  # 使用默認設備
         
+        cache_key = (nvda_device_id, self.device_list_fingerprint)
+        if cache_key in self.resolved_index_cache:
+            return self.resolved_index_cache[cache_key]
+        
+        mapped_index = self.resolve_nvda_device_index(nvda_device_id)
+        self.resolved_index_cache[cache_key] = mapped_index
+        return mapped_index
+
+    def resolve_nvda_device_index(self, nvda_device_id):
+        """智能映射NVDA設備到PyAudio索引 - 參考ooo.py改進"""
         try:
             # 第一步：嘗試GUID特徵匹配
             mapped_index = self.try_guid_mapping(nvda_device_id)
@@ -402,183 +633,75 @@ class NVDADeviceMonitor:
             if mapped_index is not None:
                 return mapped_index
             
-            if self.debug_mode:
+            if log.debug_enabled:
                 print(f"NVDADeviceMonitor: 無法映射設備 {nvda_device_id}，使用默認")
             
             return None  # 找不到就用默認
             
         except Exception as e:
-            if self.debug_mode:
+            if log.debug_enabled:
                 print(f"NVDADeviceMonitor: 設備映射錯誤: {e}")
             return None
 
     def try_guid_mapping(self, nvda_device_id):
-        """嘗試通過GUID映射 - 動態映射系統"""
+        """通過GUID映射：按NVDA端點ID的GUID片段查找設備名稱，再在設備目錄中匹配"""
         try:
-            if not nvda_device_id or nvda_device_id == "default":
+            endpoint_name = self.device_catalog.get_endpoint_name(nvda_device_id)
+            if not endpoint_name:
+                if log.debug_enabled:
+                    print(f"NVDADeviceMonitor: 未找到GUID {extract_guid_parts(nvda_device_id)} 對應的設備名稱")
                 return None
             
-            # 提取GUID部分進行匹配
-            guid_parts = []
-            if '{' in nvda_device_id and '}' in nvda_device_id:
-                # 提取所有GUID
-                import re
-                guids = re.findall(r'\{[^}]+\}', nvda_device_id)
-                for guid in guids:
-                    guid_clean = guid.replace('{', '').replace('}', '')
-                    guid_parts.append(guid_clean.lower())
-            
-            if self.debug_mode:
-                print(f"NVDADeviceMonitor: 提取到的GUID部分: {guid_parts}")
-            
-            # 動態查找設備映射
-            best_match = None
-            best_priority = -1
-            
-            for device in self.pyaudio_device_list:
-                device_name = device['name'].lower()
-                device_index = device['index']
-                host_api_priority = device.get('host_api_priority', 0)
-                
-                # 檢查設備名稱是否與某些GUID相關聯
-                # 我們不硬編碼GUID，而是通過設備名稱特徵匹配
-                matched = False
-                
-                # Realtek設備檢測
-                if 'realtek' in device_name and ('digital' in device_name or 'spdif' in device_name):
-                    matched = True
-                    if self.debug_mode:
-                        print(f"NVDADeviceMonitor: 找到Realtek設備候選: {device['name']}")
-                
-                # Universal Audio設備檢測
-                elif 'universal audio' in device_name and 'thunderbolt' in device_name:
-                    matched = True
-                    if self.debug_mode:
-                        print(f"NVDADeviceMonitor: 找到Universal Audio設備候選: {device['name']}")
-                
-                # NVIDIA設備檢測
-                elif 'nvidia' in device_name and 'high definition' in device_name:
-                    matched = True
-                    if self.debug_mode:
-                        print(f"NVDADeviceMonitor: 找到NVIDIA設備候選: {device['name']}")
-                
-                # 通用音頻設備檢測
-                elif any(keyword in device_name for keyword in ['speakers', 'headphones', 'audio', 'sound']):
-                    matched = True
-                    if self.debug_mode:
-                        print(f"NVDADeviceMonitor: 找到通用音頻設備候選: {device['name']}")
-                
-                # 如果匹配且優先級更高，更新最佳匹配
-                if matched and host_api_priority > best_priority:
-                    best_match = device
-                    best_priority = host_api_priority
-            
-            if best_match:
-                if self.debug_mode:
-                    host_api = best_match.get('host_api_name', 'Unknown')
-                    print(f"NVDADeviceMonitor: *** 動態GUID映射成功: {best_match['name']} (索引:{best_match['index']}, API:{host_api}) ***")
-                return best_match['index']
-            
-            if self.debug_mode:
-                print("NVDADeviceMonitor: 動態GUID映射未找到匹配設備")
+            device_index, score = self.device_catalog.match_name(endpoint_name)
+            if device_index is not None:
+                if log.debug_enabled:
+                    device_info = self.device_catalog.get(device_index)
+                    print(f"NVDADeviceMonitor: *** GUID映射成功: {endpoint_name} -> {device_info['name']} (索引:{device_index}, 分數:{score:.2f}, API:{device_info.get('host_api_name', 'Unknown')}) ***")
+                return device_index
             
+            if log.debug_enabled:
+                print(f"NVDADeviceMonitor: GUID映射未找到匹配設備: {endpoint_name}")
             return None
             
         except Exception as e:
-            if self.debug_mode:
-                print(f"NVDADeviceMonitor: 動態GUID映射失敗: {e}")
+            if log.debug_enabled:
+                print(f"NVDADeviceMonitor: GUID映射失敗: {e}")
             return None
 
     def try_name_pattern_mapping(self, nvda_device_id):
-        """嘗試通過名稱模式映射 - 動態映射系統"""
+        """通過名稱映射：舊版NVDA的設備ID就是設備名稱，按詞元在設備目錄中匹配"""
         try:
-            if not nvda_device_id or nvda_device_id == "default":
+            # 無法得知名稱的端點ID不按名稱匹配，避免GUID中的十六進位片段誤中設備名稱
+            if extract_guid_parts(nvda_device_id):
                 return None
             
-            # 從NVDA設備ID中嘗試推斷設備類型
-            device_type_hints = []
-            nvda_id_lower = nvda_device_id.lower()
-            
-            # 分析GUID來推斷設備類型
-            if 'realtek' in nvda_id_lower or '3487e654' in nvda_id_lower:
-                device_type_hints.append('realtek')
-            if 'universal' in nvda_id_lower or 'ad6ebfcf' in nvda_id_lower:
-                device_type_hints.append('universal_audio')
-            if 'nvidia' in nvda_id_lower:
-                device_type_hints.append('nvidia')
-            
-            if self.debug_mode:
-                print(f"NVDADeviceMonitor: 設備類型推斷: {device_type_hints}")
-            
-            # 根據推斷的設備類型尋找最佳匹配
-            best_match = None
-            best_score = 0
-            
-            for device in sorted(self.pyaudio_device_list, 
-                               key=lambda d: d.get('host_api_priority', 0), reverse=True):
-                device_name = device['name'].lower()
-                host_api = device.get('host_api_name', '').lower()
-                match_score = 0
-                
-                # 計算匹配分數
-                if 'realtek' in device_type_hints:
-                    if 'realtek' in device_name:
-                        match_score += 10
-                        if 'digital' in device_name or 'spdif' in device_name:
-                            match_score += 5
-                
-                if 'universal_audio' in device_type_hints:
-                    if 'universal audio' in device_name:
-                        match_score += 10
-                        if 'thunderbolt' in device_name:
-                            match_score += 5
-                
-                if 'nvidia' in device_type_hints:
-                    if 'nvidia' in device_name:
-                        match_score += 10
-                        if 'high definition' in device_name:
-                            match_score += 5
-                
-                # Host API優先級獎勵
-                if 'wasapi' in host_api:
-                    match_score += 3
-                elif 'directsound' in host_api:
-                    match_score += 2
-                elif 'mme' in host_api:
-                    match_score += 1
-                
-                # 如果沒有特定類型提示，給通用音頻設備一些分數
-                if not device_type_hints:
-                    if any(keyword in device_name for keyword in ['speakers', 'headphones', 'audio', 'sound']):
-                        match_score += 3
-                
-                if match_score > best_score:
-                    best_match = device
-                    best_score = match_score
-            
-            if best_match and best_score > 0:
-                if self.debug_mode:
-                    host_api = best_match.get('host_api_name', 'Unknown')
-                    print(f"NVDADeviceMonitor: *** 動態名稱映射成功: {best_match['name']} (分數:{best_score}, API:{host_api}) ***")
-                return best_match['index']
-            
-            if self.debug_mode:
-                print("NVDADeviceMonitor: 動態名稱映射未找到匹配設備")
+            device_index, score = self.device_catalog.match_name(nvda_device_id)
+            if device_index is not None:
+                if log.debug_enabled:
+                    device_info = self.device_catalog.get(device_index)
+                    print(f"NVDADeviceMonitor: *** 名稱映射成功: {device_info['name']} (分數:{score:.2f}, API:{device_info.get('host_api_name', 'Unknown')}) ***")
+                return device_index
             
+            if log.debug_enabled:
+                print("NVDADeviceMonitor: 名稱映射未找到匹配設備")
             return None
             
         except Exception as e:
-            if self.debug_mode:
-                print(f"NVDADeviceMonitor: 動態名稱映射失敗: {e}")
-            return None        
-        
+            if log.debug_enabled:
+                print(f"NVDADeviceMonitor: 名稱映射失敗: {e}")
+            return None
+
     def get_current_nvda_output_device_index(self):
         """獲取NVDA當前輸出設備對應的PyAudio設備索引"""
         try:
             current_device = self.get_current_device()
+            if current_device and current_device != "default" and not self.enumeration_done.is_set():
+                # 首次枚舉尚未完成，逾時則先使用默認設備
+                if not self.wait_for_device_list() and log.debug_enabled:
+                    print("NVDADeviceMonitor: 等待設備枚舉逾時，使用默認設備")
             return self.convert_nvda_device_to_pyaudio_index(current_device)
         except Exception as e:
-            if self.debug_mode:
+            if log.debug_enabled:
                 print(f"NVDADeviceMonitor: 獲取當前設備索引失敗: {e}")
             return None
 
@@ -611,7 +734,7 @@ class NVDADeviceMonitor:
                     optimal_rate = int(device_info.get('defaultSampleRate', 48000))
                     device_name = device_info.get('name', 'Unknown Device')
                     
-                    if self.debug_mode:
+                    if log.debug_enabled:
                         print(f"NVDADeviceMonitor: 當前設備最佳參數 - 設備: {device_name}, 採樣率: {optimal_rate}Hz")
                     
                     # 測試支持的格式（簡化版本）
@@ -631,26 +754,32 @@ class NVDADeviceMonitor:
                     temp_pyaudio.terminate()
             
         except Exception as e:
-            if self.debug_mode:
+            if log.debug_enabled:
                 print(f"NVDADeviceMonitor: 獲取設備最佳參數失敗: {e}")
         
         # 返回默認參數
         return {'sample_rate': 48000, 'format': None, 'device_index': device_index if 'device_index' in locals() else None}
 
     def start_monitoring(self):
-        """啟動監聽"""
-        if self.thread_running:
+        """啟動監聽：優先訂閱NVDA通知，無法訂閱時才使用後備輪詢線程"""
+        if self.thread_running or self.registered_notifications:
+            return
+        
+        if self.register_config_notifications():
+            if log.debug_enabled:
+                print(f"NVDADeviceMonitor: 已訂閱 {len(self.registered_notifications)} 個NVDA通知")
             return
             
         self.thread_running = True
+        self.stop_event.clear()
         self.monitoring_thread = threading.Thread(
             target=self._monitoring_worker,
             daemon=True
         )
         self.monitoring_thread.start()
         
-        if self.debug_mode:
-            print("NVDADeviceMonitor: 監聽線程已啟動")
+        if log.debug_enabled:
+            print("NVDADeviceMonitor: 無法訂閱NVDA通知，已啟動後備輪詢線程")
 
     def get_optimal_params_for_current_device(self):
         """為當前NVDA設備獲取最佳音頻參數"""
@@ -672,20 +801,21 @@ class NVDADeviceMonitor:
                     device_info = temp_pyaudio.get_default_output_device_info()
                 
                 if device_info:
-                    optimal_rate = int(device_info.get('defaultSampleRate', 48000))
+                    optimal_rate = normalize_sample_rate(device_info.get('defaultSampleRate', 48000))
                     device_name = device_info.get('name', 'Unknown Device')
                     
-                    if self.debug_mode:
-                        print(f"NVDADeviceMonitor: 當前設備最佳參數 - 設備: {device_name}, 採樣率: {optimal_rate}Hz")
-                    
-                    # 測試支持的格式（簡化版本）
+                    # 按設備的Host API選擇原生樣本格式
                     import _portaudio as pa
-                    preferred_formats = [pa.paInt16, pa.paInt24, pa.paFloat32]
-                    optimal_format = preferred_formats[0]  # 默認使用16位
+                    sample_format = choose_native_format(device_info)
+                    format_constants = {'int16': pa.paInt16, 'int24': pa.paInt24, 'float32': pa.paFloat32}
+                    
+                    if log.debug_enabled:
+                        print(f"NVDADeviceMonitor: 當前設備最佳參數 - 設備: {device_name}, 採樣率: {optimal_rate}Hz, 格式: {sample_format}")
                     
                     return {
                         'sample_rate': optimal_rate,
-                        'format': optimal_format,
+                        'format': format_constants[sample_format],
+                        'sample_format': sample_format,
                         'device_index': device_index,
                         'device_name': device_name
                     }
@@ -695,7 +825,7 @@ class NVDADeviceMonitor:
                     temp_pyaudio.terminate()
             
         except Exception as e:
-            if self.debug_mode:
+            if log.debug_enabled:
                 print(f"NVDADeviceMonitor: 獲取設備最佳參數失敗: {e}")
         
         # 返回默認參數
@@ -703,52 +833,66 @@ class NVDADeviceMonitor:
     
     def stop_monitoring(self):
         """停止監聽"""
+        self.unregister_config_notifications()
+        
         if self.monitoring_thread and self.thread_running:
             self.thread_running = False
+            self.stop_event.set()
             self.monitoring_thread.join(timeout=2.0)
             
-            if self.debug_mode:
+            if log.debug_enabled:
                 print("NVDADeviceMonitor: 監聽線程已停止")
+        
+        # 等待進行中的重新掃描結束，之後調用者才能安全地釋放音頻資源
+        with self.enumeration_lock:
+            self.enumeration_pending = False
+            enumeration_thread = self.enumeration_thread
+        if enumeration_thread is not None:
+            enumeration_thread.join(timeout=ENUMERATION_TIMEOUT)
     
     def _monitoring_worker(self):
-        """監聽工作線程"""
-        last_check = 0
-        check_interval = 1.0
+        """後備輪詢線程：檢查間隔之間阻塞等待，停止時立即喚醒"""
+        check_interval = FALLBACK_POLL_INTERVAL
         rapid_check_count = 0
         
         while self.thread_running:
+            if self.stop_event.wait(check_interval):
+                break
+            
             try:
-                current_time = time.time()
+                if not self.monitoring_enabled:
+                    continue
                 
-                if current_time - last_check > check_interval and self.monitoring_enabled:
-                    if self._check_device_change():
-                        rapid_check_count = 3  # 觸發快速檢查
-                        check_interval = 0.3
-                    elif rapid_check_count > 0:
-                        rapid_check_count -= 1
-                        check_interval = 0.3
-                    else:
-                        check_interval = 1.0
-                        
-                    last_check = current_time
+                if self._check_device_change():
+                    rapid_check_count = FALLBACK_RAPID_CHECKS  # 觸發快速檢查
+                elif rapid_check_count > 0:
+                    rapid_check_count -= 1
+                # 沒有NVDA通知時也需發現設備插拔
+                self.refresh_device_list_async()
                 
-                time.sleep(0.1)
+                check_interval = FALLBACK_RAPID_INTERVAL if rapid_check_count > 0 else FALLBACK_POLL_INTERVAL
                 
             except Exception as e:
-                if self.debug_mode:
+                if log.debug_enabled:
                     print(f"NVDADeviceMonitor: 監聽錯誤 - {e}")
-                time.sleep(1.0)
+                check_interval = FALLBACK_POLL_INTERVAL
     
     def _check_device_change(self):
         """檢查設備變更"""
         if self.audio_config_section is None:
             return False
             
+        # 通知和後備輪詢可能同時檢查，避免重複調用回調函數
+        with self.check_lock:
+            return self._check_device_change_locked()
+    
+    def _check_device_change_locked(self):
+        """比較配置中的輸出設備與上次記錄的設備"""
         try:
             current_device = self.audio_config_section.get("outputDevice", "default")
             
             if current_device != self.last_audio_device:
-                if self.debug_mode:
+                if log.debug_enabled:
                     print(f"NVDADeviceMonitor: 檢測到設備變更")
                     print(f"  之前: '{self.last_audio_device}'")
                     print(f"  當前: '{current_device}'")
@@ -761,12 +905,14 @@ class NVDADeviceMonitor:
                         print(f"NVDADeviceMonitor: 回調函數錯誤 - {e}")
                 
                 self.last_audio_device = current_device
+                # 新選擇的設備可能在上次枚舉後才接入，舊版NVDA無法列出端點時也能發現
+                self.refresh_device_list_async(force_rescan=True)
                 return True
                 
             return False
             
         except Exception as e:
-            if self.debug_mode:
+            if log.debug_enabled:
                 print(f"NVDADeviceMonitor: 檢查設備變更錯誤 - {e}")
             return False
     
@@ -779,6 +925,9 @@ class NVDADeviceMonitor:
     def enable_monitoring(self):
         """啟用監聽"""
         self.monitoring_enabled = True
+        # 停用期間可能錯過了變更通知
+        if self.registered_notifications:
+            self._on_config_notification()
     
     def disable_monitoring(self):
         """停用監聽"""
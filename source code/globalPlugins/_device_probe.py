@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+# 悅耳進度條 - 設備能力探測模塊
+# 每個設備指紋（名稱、Host API、預設採樣率）只在背景實際測試一次，結果保存到NVDA配置目錄
+
+import hashlib
+import os
+import threading
+import globalVars
+from configobj import ConfigObj
+from ._tone_synth import SAMPLE_FORMAT_WIDTHS, normalize_sample_rate, choose_native_format
+from ._debug_log import log
+from ._pleasant_progressconfig import write_config_atomically
+
+# 探測結果文件路徑
+PROBE_FILE_NAME = "pleasantProgressProbe.ini"
+PROBE_FILE_PATH = os.path.join(globalVars.appArgs.configPath, PROBE_FILE_NAME)
+
+# 探測的採樣率（設備預設採樣率總是最先測試）
+CANDIDATE_SAMPLE_RATES = [48000, 44100, 96000, 22050, 16000]
+
+# 探測的樣本格式（原生格式總是最先測試）
+CANDIDATE_SAMPLE_FORMATS = ['int16', 'float32', 'int24']
+
+# 測試流的緩衝大小
+PROBE_FRAMES_PER_BUFFER = 1024
+
+
+def get_device_fingerprint(device_info):
+    """生成設備指紋：名稱、Host API、預設採樣率"""
+    return (
+        str(device_info.get('name', '')),
+        str(device_info.get('host_api_name', '')),
+        normalize_sample_rate(device_info.get('defaultSampleRate')),
+    )
+
+
+def get_fingerprint_key(fingerprint):
+    """將設備指紋轉換為可作為配置段名稱的短鍵"""
+    text = "|".join(str(part) for part in fingerprint)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+class DeviceCapabilityProbe:
+    """設備能力探測器：背景測試支持的採樣率/格式組合並持久化結果"""
+
+    def __init__(self, pyaudio_factory, format_constants):
+        self.pyaudio_factory = pyaudio_factory      # 創建臨時PyAudio實例的工廠
+        self.format_constants = format_constants    # 樣本格式名稱 -> PortAudio格式常量
+
+        # 探測結果緩存：指紋鍵 -> 結果字典
+        self.results = {}
+        # 延遲校準結果緩存：校準鍵（指紋鍵_採樣率_格式） -> 推薦緩衝大小
+        self.calibrations = {}
+        self.pending_keys = set()
+        self.lock = threading.Lock()
+        # 探測線程和校準線程都會保存結果，寫入文件期間持有此鎖
+        self.write_lock = threading.Lock()
+
+        self.load_results()
+
+    def load_results(self):
+        """從配置目錄載入已保存的探測結果"""
+        try:
+            if not os.path.exists(PROBE_FILE_PATH):
+                return
+
+            probe_config = ConfigObj(PROBE_FILE_PATH, encoding='utf-8')
+            for key, section in probe_config.items():
+                if 'low_latency' in section:
+                    try:
+                        self.calibrations[key] = {
+                            'low_latency': int(section['low_latency']),
+                            'power_saving': int(section['power_saving']),
+                        }
+                    except (KeyError, ValueError, TypeError):
+                        pass
+                    continue
+
+                try:
+                    supported = section.get('supported', [])
+                    if isinstance(supported, str):
+                        supported = [supported]
+
+                    result = {
+                        'name': section.get('name', ''),
+                        'host_api_name': section.get('host_api_name', ''),
+                        'default_rate': int(section.get('default_rate', 0)),
+                        'best_rate': int(section['best_rate']),
+                        'best_format': section['best_format'],
+                        'supported': list(supported),
+                    }
+                    # 忽略不再支援的格式
+                    if result['best_format'] in SAMPLE_FORMAT_WIDTHS:
+                        self.results[key] = result
+                except (KeyError, ValueError, TypeError, AttributeError):
+                    continue
+
+            if log.debug_enabled:
+                print(f"悅耳進度條：已載入 {len(self.results)} 個設備的探測結果")
+
+        except Exception as e:
+            print(f"悅耳進度條：載入設備探測結果錯誤: {e}")
+
+    def save_results(self):
+        """保存探測結果到配置目錄（原子地替換文件，多個線程保存時按順序寫入）"""
+        with self.write_lock:
+            try:
+                self._write_results()
+            except Exception as e:
+                print(f"悅耳進度條：保存設備探測結果錯誤: {e}")
+
+    def _write_results(self):
+        # 持有寫入鎖時才取快照，較新的結果總是最後寫入
+        with self.lock:
+            results = dict(self.results)
+            calibrations = dict(self.calibrations)
+
+        snapshot = {}
+        for key, result in results.items():
+            snapshot[key] = {
+                'name': result['name'],
+                'host_api_name': result['host_api_name'],
+                'default_rate': result['default_rate'],
+                'best_rate': result['best_rate'],
+                'best_format': result['best_format'],
+                'supported': result['supported'],
+            }
+
+        for key, calibration in calibrations.items():
+            snapshot[key] = {
+                'low_latency': calibration['low_latency'],
+                'power_saving': calibration['power_saving'],
+            }
+
+        write_config_atomically(PROBE_FILE_PATH, snapshot)
+
+    def get_cached_params(self, device_info):
+        """獲取設備已緩存的最佳參數，未探測過返回None"""
+        if not device_info:
+            return None
+
+        key = get_fingerprint_key(get_device_fingerprint(device_info))
+        with self.lock:
+            result = self.results.get(key)
+
+        if result is None:
+            return None
+
+        return {'sample_rate': result['best_rate'], 'sample_format': result['best_format']}
+
+    def get_calibration_key(self, device_info, sample_rate, sample_format):
+        """生成延遲校準鍵：校準結果與設備、採樣率和格式相關"""
+        key = get_fingerprint_key(get_device_fingerprint(device_info))
+        return f"{key}_{sample_rate}_{sample_format}"
+
+    def get_cached_calibration(self, device_info, sample_rate, sample_format):
+        """獲取設備已保存的延遲校準結果，未校準過返回None"""
+        if not device_info:
+            return None
+
+        with self.lock:
+            return self.calibrations.get(self.get_calibration_key(device_info, sample_rate, sample_format))
+
+    def store_calibration(self, device_info, sample_rate, sample_format, calibration):
+        """保存延遲校準結果"""
+        with self.lock:
+            self.calibrations[self.get_calibration_key(device_info, sample_rate, sample_format)] = {
+                'low_latency': int(calibration['low_latency']),
+                'power_saving': int(calibration['power_saving']),
+            }
+        self.save_results()
+
+    def probe_in_background(self, device_info, on_complete=None):
+        """在背景線程中探測設備（同一指紋只探測一次）"""
+        if not device_info:
+            return False
+
+        fingerprint = get_device_fingerprint(device_info)
+        key = get_fingerprint_key(fingerprint)
+
+        with self.lock:
+            if key in self.results or key in self.pending_keys:
+                return False
+            self.pending_keys.add(key)
+
+        probe_thread = threading.Thread(
+            target=self._probe_worker,
+            args=(dict(device_info), fingerprint, key, on_complete),
+            daemon=True
+        )
+        probe_thread.start()
+        return True
+
+    def _probe_worker(self, device_info, fingerprint, key, on_complete):
+        """探測線程"""
+        try:
+            result = self.probe_device(device_info, fingerprint)
+            if result is None:
+                return
+
+            with self.lock:
+                self.results[key] = result
+            self.save_results()
+
+            print(f"悅耳進度條：設備探測完成: {fingerprint[0]} ({fingerprint[1]}) → "
+                  f"{result['best_rate']}Hz, {result['best_format']}，支持 {len(result['supported'])} 種組合")
+
+            if on_complete:
+                on_complete(device_info, result)
+
+        except Exception as e:
+            print(f"悅耳進度條：設備探測錯誤: {e}")
+        finally:
+            with self.lock:
+                self.pending_keys.discard(key)
+
+    def probe_device(self, device_info, fingerprint=None):
+        """實際開關測試流，找出設備支持的採樣率/格式組合"""
+        if fingerprint is None:
+            fingerprint = get_device_fingerprint(device_info)
+
+        default_rate = fingerprint[2]
+        native_format = choose_native_format(device_info)
+
+        # 設備預設採樣率和原生格式最先測試
+        rates = [default_rate] + [rate for rate in CANDIDATE_SAMPLE_RATES if rate != default_rate]
+        formats = [native_format] + [fmt for fmt in CANDIDATE_SAMPLE_FORMATS if fmt != native_format]
+
+        temp_pyaudio = self.pyaudio_factory()
+        supported = []
+        try:
+            for rate in rates:
+                for sample_format in formats:
+                    try:
+                        test_stream = temp_pyaudio.open(
+                            format=self.format_constants[sample_format],
+                            channels=1,
+                            rate=rate,
+                            output=True,
+                            output_device_index=device_info.get('index'),
+                            frames_per_buffer=PROBE_FRAMES_PER_BUFFER,
+                            start=False
+                        )
+                        test_stream.close()
+                        supported.append(f"{rate}:{sample_format}")
+                    except Exception:
+                        continue
+        finally:
+            temp_pyaudio.terminate()
+
+        if not supported:
+            print(f"悅耳進度條：設備探測未找到可用組合: {fingerprint[0]}")
+            return None
+
+        # 第一個成功的組合即最佳組合（按優先級排列）
+        best_rate, best_format = supported[0].split(':')
+        return {
+            'name': fingerprint[0],
+            'host_api_name': fingerprint[1],
+            'default_rate': default_rate,
+            'best_rate': int(best_rate),
+            'best_format': best_format,
+            'supported': supported,
+        }
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+# 悅耳進度條 - 提示音檔案（earcon）模塊
+# 只讀取和解碼一次NVDA的WAV提示音（在背景線程），轉換為輸出流的採樣率、樣本格式和聲道後保存在記憶體中
+
+import array
+import os
+import sys
+import wave
+from ._tone_synth import SAMPLE_FORMAT_WIDTHS, encode_samples, pan_to_stereo
+
+# 可緩存的提示音最長時長（秒），較長的檔案仍由NVDA原本的方式播放
+MAX_EARCON_SECONDS = 3.0
+
+
+def get_earcon_cache_key(file_path, sample_rate, sample_format, channels):
+    """生成提示音緩存鍵：檔案修改後會重新載入"""
+    try:
+        modified_time = os.path.getmtime(file_path)
+    except OSError:
+        return None
+    return f"earcon_{os.path.normcase(os.path.abspath(file_path))}_{modified_time}_{sample_rate}Hz_{sample_format}_{channels}ch"
+
+
+def _decode_pcm(frames, sample_width):
+    """將PCM位元組解碼為-1.0到1.0之間的浮點樣本（各聲道交錯）"""
+    if sample_width == 1:
+        # 8位WAV為無符號整數
+        return [(value - 128) / 128.0 for value in frames]
+
+    if sample_width == 2:
+        samples = array.array('h', frames)
+        scale = 1.0 / 32768.0
+    elif sample_width == 3:
+        offset = 1 if sys.byteorder == 'big' else 0
+        padded = bytearray(len(frames) // 3 * 4)
+        padded[offset + 1::4] = frames[0::3]
+        padded[offset + 2::4] = frames[1::3]
+        padded[offset + 3::4] = frames[2::3]
+        samples = array.array('i', bytes(padded))
+        scale = 1.0 / 2147483648.0
+    elif sample_width == 4:
+        samples = array.array('i', frames)
+        scale = 1.0 / 2147483648.0
+    else:
+        raise ValueError(f"不支援的WAV樣本寬度: {sample_width}")
+
+    if sys.byteorder == 'big' and sample_width != 3:
+        samples.byteswap()
+    return list(map(scale.__mul__, samples))
+
+
+def _mix_to_mono(samples, channels):
+    """將多聲道樣本平均混合為單聲道"""
+    if channels == 1:
+        return samples
+    mixed = [0.0] * (len(samples) // channels)
+    for channel in range(channels):
+        mixed = list(map(float.__add__, mixed, samples[channel::channels]))
+    return list(map((1.0 / channels).__mul__, mixed))
+
+
+def _resample(samples, source_rate, target_rate):
+    """線性插值重新取樣"""
+    if source_rate == target_rate or not samples:
+        return samples
+    target_count = max(1, int(len(samples) * target_rate / float(source_rate)))
+    step = source_rate / float(target_rate)
+    last_index = len(samples) - 1
+    result = []
+    for i in range(target_count):
+        position = i * step
+        index = int(position)
+        if index >= last_index:
+            result.append(samples[last_index])
+            continue
+        fraction = position - index
+        result.append(samples[index] + (samples[index + 1] - samples[index]) * fraction)
+    return result
+
+
+def load_earcon(file_path, sample_rate, sample_format, channels=1):
+    """讀取WAV提示音並轉換為輸出流的原生格式，無法轉換時返回None"""
+    with wave.open(file_path, 'rb') as wave_file:
+        source_channels = wave_file.getnchannels()
+        sample_width = wave_file.getsampwidth()
+        source_rate = wave_file.getframerate()
+        frame_count = wave_file.getnframes()
+        if frame_count > MAX_EARCON_SECONDS * source_rate:
+            return None
+        frames = wave_file.readframes(frame_count)
+
+    samples = _decode_pcm(frames, sample_width)
+    if channels == 2 and source_channels == 2:
+        # 立體聲輸出時保留提示音的左右聲道
+        left = _resample(samples[0::2], source_rate, sample_rate)
+        right = _resample(samples[1::2], source_rate, sample_rate)
+        interleaved = [0.0] * (len(left) * 2)
+        interleaved[0::2] = left
+        interleaved[1::2] = right
+        audio_data = encode_samples(interleaved, sample_format)
+    else:
+        samples = _mix_to_mono(samples, source_channels)
+        samples = _resample(samples, source_rate, sample_rate)
+        audio_data = encode_samples(samples, sample_format)
+        if channels == 2:
+            audio_data = pan_to_stereo(audio_data, sample_format)
+
+    # 補齊為4位元組的倍數（整幀靜音），與合成的音調一致
+    frame_width = SAMPLE_FORMAT_WIDTHS[sample_format] * channels
+    while len(audio_data) % 4:
+        audio_data += bytes(frame_width)
+    return audio_data
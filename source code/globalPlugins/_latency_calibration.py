@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+# 悅耳進度條 - 延遲校準模塊
+# 在目標設備上逐一測試候選緩衝大小，按回報的輸出延遲和實測寫入時間選出不會欠載的最小緩衝
+
+import threading
+import time
+from ._debug_log import log
+
+# 候選緩衝大小（frames），由小到大測試
+CANDIDATE_BUFFER_SIZES = [64, 128, 256, 512, 1024, 2048]
+
+# 未校準或「預設」模式使用的固定緩衝大小
+DEFAULT_FRAMES_PER_BUFFER = 128
+
+# 每個候選大小寫入的靜音緩衝次數（前幾次用於填滿輸出緩衝，不計入統計）
+CALIBRATION_WRITES = 24
+CALIBRATION_WARMUP_WRITES = 4
+
+# 寫入時間允許超出一個緩衝時長的餘量（秒）
+WRITE_TIME_MARGIN = 0.005
+
+# 省電模式的最小緩衝時長（毫秒），較大的緩衝可減少音頻線程喚醒次數
+POWER_SAVING_MIN_BUFFER_MS = 20.0
+
+
+def select_buffer_size(calibration, preset):
+    """按延遲模式從校準結果中選出緩衝大小，無可用結果返回None"""
+    if not calibration:
+        return None
+    if preset == 'low_latency':
+        return calibration.get('low_latency')
+    if preset == 'power_saving':
+        return calibration.get('power_saving')
+    return None
+
+
+class LatencyCalibrator:
+    """延遲校準器：在背景測試候選緩衝大小"""
+
+    def __init__(self, pyaudio_factory):
+        self.pyaudio_factory = pyaudio_factory  # 創建臨時PyAudio實例的工廠
+        self.pending_keys = set()
+        self.lock = threading.Lock()
+
+    def calibrate_in_background(self, key, device_index, sample_rate, pa_format, sample_width,
+                                on_complete=None):
+        """在背景線程中校準設備（同一鍵同時只校準一次）"""
+        with self.lock:
+            if key in self.pending_keys:
+                return False
+            self.pending_keys.add(key)
+
+        calibration_thread = threading.Thread(
+            target=self._calibration_worker,
+            args=(key, device_index, sample_rate, pa_format, sample_width, on_complete),
+            daemon=True
+        )
+        calibration_thread.start()
+        return True
+
+    def _calibration_worker(self, key, device_index, sample_rate, pa_format, sample_width, on_complete):
+        """校準線程"""
+        try:
+            result = self.calibrate(device_index, sample_rate, pa_format, sample_width)
+            if result and on_complete:
+                on_complete(result)
+        except Exception as e:
+            print(f"悅耳進度條：延遲校準錯誤: {e}")
+        finally:
+            with self.lock:
+                self.pending_keys.discard(key)
+
+    def calibrate(self, device_index, sample_rate, pa_format, sample_width):
+        """逐一測試候選緩衝大小，返回各大小的測量結果和兩種模式的推薦值"""
+        temp_pyaudio = self.pyaudio_factory()
+        measurements = {}
+        try:
+            for frames_per_buffer in CANDIDATE_BUFFER_SIZES:
+                measurement = self.measure_buffer_size(
+                    temp_pyaudio, device_index, sample_rate, pa_format, sample_width, frames_per_buffer
+                )
+                if measurement is not None:
+                    measurements[frames_per_buffer] = measurement
+                    if log.debug_enabled:
+                        print(f"悅耳進度條：校準 {frames_per_buffer} frames: 延遲 {measurement['output_latency_ms']:.1f}ms, "
+                              f"最長寫入 {measurement['max_write_ms']:.1f}ms, {'穩定' if measurement['stable'] else '欠載'}")
+        finally:
+            temp_pyaudio.terminate()
+
+        stable_sizes = [size for size in CANDIDATE_BUFFER_SIZES
+                        if size in measurements and measurements[size]['stable']]
+        if not stable_sizes:
+            print("悅耳進度條：延遲校準未找到穩定的緩衝大小")
+            return None
+
+        # 低延遲：不欠載的最小緩衝
+        low_latency = stable_sizes[0]
+
+        # 省電：達到最小緩衝時長的最小穩定緩衝，否則取最大的穩定緩衝
+        power_saving = stable_sizes[-1]
+        for size in stable_sizes:
+            if size * 1000.0 / sample_rate >= POWER_SAVING_MIN_BUFFER_MS:
+                power_saving = size
+                break
+
+        print(f"悅耳進度條：延遲校準完成: 低延遲 {low_latency} frames, 省電 {power_saving} frames")
+        return {
+            'low_latency': low_latency,
+            'power_saving': power_saving,
+            'measurements': measurements,
+        }
+
+    def measure_buffer_size(self, temp_pyaudio, device_index, sample_rate, pa_format, sample_width,
+                            frames_per_buffer):
+        """以指定緩衝大小開啟測試流，寫入靜音並測量寫入時間與欠載"""
+        try:
+            test_stream = temp_pyaudio.open(
+                format=pa_format,
+                channels=1,
+                rate=sample_rate,
+                output=True,
+                output_device_index=device_index,
+                frames_per_buffer=frames_per_buffer
+            )
+        except Exception:
+            return None
+
+        silence = bytes(frames_per_buffer * sample_width)
+        buffer_seconds = frames_per_buffer / float(sample_rate)
+        write_times = []
+        underflow = False
+
+        try:
+            for write_index in range(CALIBRATION_WRITES):
+                start = time.perf_counter()
+                try:
+                    # 開啟欠載異常，以偵測緩衝不足
+                    test_stream.write(silence, frames_per_buffer, exception_on_underflow=True)
+                except IOError:
+                    if write_index >= CALIBRATION_WARMUP_WRITES:
+                        underflow = True
+                        break
+                if write_index >= CALIBRATION_WARMUP_WRITES:
+                    write_times.append(time.perf_counter() - start)
+        finally:
+            try:
+                test_stream.stop_stream()
+                test_stream.close()
+            except Exception:
+                pass
+
+        output_latency = getattr(test_stream, '_output_latency', 0.0) or 0.0
+        max_write = max(write_times) if write_times else 0.0
+
+        # 寫入阻塞時間明顯超過緩衝時長（或設備回報的輸出延遲），表示設備跟不上該緩衝大小
+        stable = not underflow and max_write <= max(buffer_seconds * 2, output_latency) + WRITE_TIME_MARGIN
+
+        return {
+            'output_latency_ms': output_latency * 1000.0,
+            'max_write_ms': max_write * 1000.0,
+            'stable': stable,
+        }
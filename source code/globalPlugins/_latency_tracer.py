@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# 悅耳進度條 - 延遲追蹤模塊
+# 以單調時鐘記錄提示音從tones.beep被調用到寫入輸出流完成的各階段耗時，保留最近的樣本以計算百分位數
+
+import math
+import threading
+from collections import deque
+
+# 每個階段保留的最近樣本數量
+DEFAULT_WINDOW_SIZE = 512
+
+# 報告的百分位數
+REPORT_PERCENTILES = (50, 95, 99)
+
+# 追蹤的階段（按報告順序）
+STAGE_QUEUE = 'queue'      # tones.beep被調用 -> 守護線程取得請求（含進度條音效的限速等待）
+STAGE_RENDER = 'render'    # 緩存查找或合成
+STAGE_WRITE = 'write'      # 寫入輸出流開始 -> 結束
+STAGE_TOTAL = 'total'      # tones.beep被調用 -> 寫入輸出流結束
+
+STAGES = (STAGE_QUEUE, STAGE_RENDER, STAGE_WRITE, STAGE_TOTAL)
+
+STAGE_NAMES = {
+    STAGE_QUEUE: '排隊',
+    STAGE_RENDER: '緩存/合成',
+    STAGE_WRITE: '寫入輸出流',
+    STAGE_TOTAL: '總計',
+}
+
+
+def percentile(sorted_samples, percent):
+    """最近秩法百分位數（樣本須已排序）"""
+    if not sorted_samples:
+        return None
+    rank = int(math.ceil(percent / 100.0 * len(sorted_samples))) - 1
+    return sorted_samples[max(0, min(len(sorted_samples) - 1, rank))]
+
+
+class LatencyTracer:
+    """按階段保留最近的耗時樣本（秒），報告時才排序計算百分位數"""
+
+    def __init__(self, window_size=DEFAULT_WINDOW_SIZE):
+        self.window_size = max(1, window_size)
+        self.samples = {stage: deque(maxlen=self.window_size) for stage in STAGES}
+        self.lock = threading.Lock()
+
+    def record(self, requested_at, picked_up_at, render_started, render_ended, write_started, write_ended):
+        """記錄一個提示音各階段的時間戳（time.perf_counter），沒有請求時間戳時只記錄守護線程內的階段"""
+        with self.lock:
+            if requested_at is not None:
+                self.samples[STAGE_QUEUE].append(picked_up_at - requested_at)
+                self.samples[STAGE_TOTAL].append(write_ended - requested_at)
+            self.samples[STAGE_RENDER].append(render_ended - render_started)
+            self.samples[STAGE_WRITE].append(write_ended - write_started)
+
+    def clear(self):
+        with self.lock:
+            for samples in self.samples.values():
+                samples.clear()
+
+    def count_above(self, stage, seconds):
+        """階段耗時超過指定秒數的樣本數量"""
+        with self.lock:
+            return sum(1 for sample in self.samples[stage] if sample > seconds)
+
+    def summary(self, percentiles=REPORT_PERCENTILES):
+        """各階段的樣本數和百分位數（毫秒）：{階段: (樣本數, {百分位: 毫秒})}"""
+        with self.lock:
+            snapshots = {stage: sorted(samples) for stage, samples in self.samples.items()}
+        result = {}
+        for stage in STAGES:
+            ordered = snapshots[stage]
+            result[stage] = (
+                len(ordered),
+                {p: (percentile(ordered, p) * 1000 if ordered else None) for p in percentiles},
+            )
+        return result
+
+    def format_lines(self, percentiles=REPORT_PERCENTILES):
+        """將百分位數格式化為日誌行"""
+        lines = []
+        for stage, (count, values) in self.summary(percentiles).items():
+            if not count:
+                lines.append(f"  {STAGE_NAMES[stage]}: 沒有樣本")
+                continue
+            details = '  '.join(f"p{p} {values[p]:.2f}ms" for p in percentiles)
+            lines.append(f"  {STAGE_NAMES[stage]}: {details}（{count} 個樣本）")
+        return lines
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+# 悅耳進度條 - 輸出後端模塊
+# 以NVDA自身的nvwave.WavePlayer提供與內嵌PyAudio相同介面的輸出流，與NVDA共用已開啟的輸出路徑和設備選擇
+
+# nvwave後端支援的樣本格式：格式名稱 -> 每個樣本的位元數
+NVWAVE_SAMPLE_FORMATS = {
+    'int16': 16,
+}
+
+# nvwave後端使用的採樣率（與NVDA tones模塊相同）
+NVWAVE_SAMPLE_RATE = 44100
+
+# nvwave後端的設備信息Host API名稱
+NVWAVE_HOST_API_NAME = 'nvwave'
+
+
+def get_nvda_output_device():
+    """讀取NVDA設定的輸出設備（新版NVDA在audio段，舊版在speech段）"""
+    try:
+        import config
+    except ImportError:
+        return None
+
+    for section in ('audio', 'speech'):
+        try:
+            output_device = config.conf[section]['outputDevice']
+        except (KeyError, TypeError):
+            continue
+        if output_device:
+            return output_device
+    return None
+
+
+class NVWaveOutputStream:
+    """nvwave輸出流：提供與PyAudio.Stream相同的write/start_stream/stop_stream/close介面"""
+
+    def __init__(self, nvwave_module, channels, rate, bits_per_sample, output_device=None):
+        player_kwargs = {'wantDucking': False}
+        if output_device:
+            player_kwargs['outputDevice'] = output_device
+        # 新版NVDA按用途區分音頻（例如語音和音效的音量分開調整）
+        audio_purpose = getattr(nvwave_module, 'AudioPurpose', None)
+        if audio_purpose is not None and hasattr(audio_purpose, 'SOUNDS'):
+            player_kwargs['purpose'] = audio_purpose.SOUNDS
+
+        self._player = nvwave_module.WavePlayer(
+            channels=channels,
+            samplesPerSec=rate,
+            bitsPerSample=bits_per_sample,
+            **player_kwargs
+        )
+        self._is_running = True
+
+    def start_stream(self):
+        self._is_running = True
+
+    def stop_stream(self):
+        if not self._is_running:
+            return
+        self._player.stop()
+        self._is_running = False
+
+    def is_active(self):
+        return self._is_running
+
+    def is_stopped(self):
+        return not self._is_running
+
+    def write(self, frames, num_frames=None, exception_on_underflow=False):
+        """寫入音頻數據（由WavePlayer負責緩衝和播放）"""
+        if not self._is_running:
+            raise IOError("nvwave輸出流已停止")
+        self._player.feed(frames)
+
+    def close(self):
+        self._is_running = False
+        self._player.close()
+
+
+class NVWaveAudio:
+    """nvwave音頻後端：提供與PyAudio相同的open/terminate/設備信息介面，以便共用輸出流池"""
+
+    def __init__(self, nvwave_module=None):
+        if nvwave_module is None:
+            import nvwave as nvwave_module
+        self.nvwave = nvwave_module
+
+    def open(self, rate, channels, format, output=True, output_device_index=None,
+             frames_per_buffer=None, start=True, **kwargs):
+        """開啟輸出流：設備由NVDA的輸出設備設定決定，format為每個樣本的位元數"""
+        stream = NVWaveOutputStream(self.nvwave, channels, rate, format, get_nvda_output_device())
+        if not start:
+            stream.stop_stream()
+        return stream
+
+    def terminate(self):
+        pass
+
+    def get_default_output_device_info(self):
+        """獲取NVDA輸出設備的信息"""
+        return {
+            'index': None,
+            'name': get_nvda_output_device() or 'NVDA輸出設備',
+            'host_api_name': NVWAVE_HOST_API_NAME,
+            'defaultSampleRate': float(NVWAVE_SAMPLE_RATE),
+            'maxOutputChannels': 2,
+        }
+
+    def get_device_info_by_index(self, device_index):
+        """nvwave只使用NVDA選擇的輸出設備，任何索引都返回該設備的信息"""
+        return self.get_default_output_device_info()
@@ -1,61 +1,24 @@
 # -*- coding: utf-8 -*-
 # 悅耳進度條 - 配置管理模塊
 
+import atexit
 import os
+import threading
 import globalVars
 from configobj import ConfigObj
-import gettext
-import languageHandler
-
-# =============================================================================
-# 國際化初始化
-# =============================================================================
-def initTranslation():
-    """初始化插件的國際化翻譯"""
-    try:
-        # 獲取插件目錄和locale資料夾路徑
-        addon_dir = os.path.dirname(__file__)  # 獲取當前文件所在目錄（globalPlugins）
-        parent_dir = os.path.dirname(addon_dir)  # 獲取父目錄
-        locale_dir = os.path.join(parent_dir, "locale")  # 父目錄下的locale資料夾
-
-
-        # 獲取當前NVDA使用的語言
-        lang = languageHandler.getLanguage()
-
-        # 構建語言回退列表
-        languages = [lang]  # 首先嘗試完整語言代碼
-
-        # 如果語言代碼包含下劃線，也嘗試主要語言代碼
-        if '_' in lang:
-            main_lang = lang.split('_')[0]
-            languages.append(main_lang)
-
-        # 如果不是中文，添加英文作為回退
-        if not lang.startswith('zh'):
-            languages.append('en')
-
-        # 創建翻譯對象
-        translation = gettext.translation(
-            "nvda",                    # domain name
-            localedir=locale_dir,      # locale資料夾路徑
-            languages=languages,       # 語言回退列表
-            fallback=True              # 找不到翻譯時使用原文
-        )
 
-        # 返回gettext函數
-        return translation.gettext
-
-    except Exception:
-        # 如果初始化失敗，返回簡單的fallback函數
-        return lambda x: x
-
-# 初始化並獲取翻譯函數
-addonGettext = initTranslation()
+# 共用的翻譯函數
+from ._i18n import addonGettext
 
 # 配置文件路徑
 CONFIG_FILE_NAME = "sineProgress.ini"
 CONFIG_FILE_PATH = os.path.join(globalVars.appArgs.configPath, CONFIG_FILE_NAME)
 
+# 延遲寫入的等待時間（秒）：此時間內的多次變更合併為一次寫入
+SAVE_DEBOUNCE_SECONDS = 0.5
+# 寫入失敗後重試的等待時間（秒）
+SAVE_RETRY_SECONDS = 5.0
+
 # 預設配置值
 DEFAULT_CONFIG = {
     'fade_algorithm': 'cosine',    # 余弦
@@ -64,8 +27,38 @@ DEFAULT_CONFIG = {
     'min_frequency': 110,         # 起點頻率（低頻）
     'max_frequency': 1720,        # 終點頻率（高頻）
     'audio_duration': 0.08,       # 波形長度（秒）
+    'latency_preset': 'default',  # 延遲模式
+    'output_backend': 'portaudio',  # 輸出後端
+    'route_all_beeps': False,     # 接管所有提示音
+    'stereo_output': False,       # 立體聲輸出
+    'cache_earcons': False,       # 緩存NVDA提示音檔案
+    'log_level': 'info',          # 日誌級別
 }
 
+def _parse_bool(value):
+    """ConfigObj以字串保存布林值"""
+    return str(value) == 'True'
+
+# 配置項的解析函數：載入時將ConfigObj的字串值一次轉換為對應類型
+CONFIG_FIELD_PARSERS = {
+    'fade_algorithm': str,
+    'waveform_type': str,
+    'volume': float,
+    'min_frequency': int,
+    'max_frequency': int,
+    'audio_duration': float,
+    'latency_preset': str,
+    'output_backend': str,
+    'route_all_beeps': _parse_bool,
+    'stereo_output': _parse_bool,
+    'cache_earcons': _parse_bool,
+    'log_level': str,
+}
+
+# 應用程式配置檔可覆蓋的聲音配置項（按NVDA appModule名稱保存在[profiles]區段）
+PROFILES_SECTION = 'profiles'
+PROFILE_FIELDS = ('waveform_type', 'fade_algorithm', 'volume', 'min_frequency', 'max_frequency', 'audio_duration')
+
 # 可用選項定義 - 使用翻譯函數
 FADE_ALGORITHMS = {
     'cosine': addonGettext('余弦'),
@@ -82,6 +75,26 @@ WAVEFORM_TYPES = {
     'white_noise': addonGettext('白噪音')
 }
 
+# 延遲模式選項 - 使用翻譯函數
+LATENCY_PRESETS = {
+    'default': addonGettext('預設（固定緩衝）'),
+    'low_latency': addonGettext('低延遲'),
+    'power_saving': addonGettext('省電')
+}
+
+# 輸出後端選項 - 使用翻譯函數
+OUTPUT_BACKENDS = {
+    'portaudio': addonGettext('內嵌PortAudio'),
+    'nvwave': addonGettext('NVDA音頻輸出（nvwave）')
+}
+
+# 日誌級別選項 - 使用翻譯函數
+LOG_LEVEL_NAMES = {
+    'debug': addonGettext('調試（記錄每個提示音）'),
+    'info': addonGettext('一般'),
+    'warning': addonGettext('只記錄警告和錯誤')
+}
+
 # 生成音量選項（0.1到1.0，步進0.1）
 VOLUME_OPTIONS = [round(i * 0.1, 1) for i in range(1, 11)]
 
@@ -92,15 +105,131 @@ MAX_FREQUENCY_OPTIONS = list(range(1200, 1801, 10))  # 1200到1750，每10Hz
 # 新增：生成波形長度選項（40到100毫秒，步進5毫秒）
 AUDIO_DURATION_OPTIONS = [round(i * 0.005, 3) for i in range(8, 21)]  # 0.040到0.100，步進0.005
 
+# 配置檔各聲音配置項的有效值
+PROFILE_FIELD_OPTIONS = {
+    'waveform_type': WAVEFORM_TYPES,
+    'fade_algorithm': FADE_ALGORITHMS,
+    'volume': VOLUME_OPTIONS,
+    'min_frequency': MIN_FREQUENCY_OPTIONS,
+    'max_frequency': MAX_FREQUENCY_OPTIONS,
+    'audio_duration': AUDIO_DURATION_OPTIONS,
+}
+
+def parse_profile_overrides(section):
+    """解析一個應用程式配置檔的覆蓋值，忽略無效的配置項"""
+    overrides = {}
+    for key in PROFILE_FIELDS:
+        if key not in section:
+            continue
+        try:
+            value = CONFIG_FIELD_PARSERS[key](section[key])
+        except (ValueError, TypeError):
+            continue
+        if value in PROFILE_FIELD_OPTIONS[key]:
+            overrides[key] = value
+    return overrides
+
+def write_config_atomically(file_path, snapshot):
+    """將配置快照寫入臨時檔案並同步到磁碟，再替換原檔案，寫入中途失敗不會損壞原檔案"""
+    config = ConfigObj(snapshot, encoding='utf-8')
+    temp_path = file_path + '.tmp'
+    try:
+        with open(temp_path, 'wb') as temp_file:
+            config.write(temp_file)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        os.replace(temp_path, file_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class ConfigFileWriter:
+    """延遲寫入配置文件：合併短時間內的多次變更，在背景線程先寫入臨時檔案再原子地替換"""
+    
+    def __init__(self, file_path, delay=SAVE_DEBOUNCE_SECONDS):
+        self.file_path = file_path
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.timer = None
+        self.pending_snapshot = None
+    
+    @property
+    def pending(self):
+        return self.pending_snapshot is not None
+    
+    def schedule(self, snapshot):
+        """記錄要寫入的配置快照，等待時間內沒有新的變更才寫入"""
+        with self.lock:
+            self.pending_snapshot = snapshot
+            self._start_timer(self.delay)
+    
+    def _start_timer(self, delay):
+        # 調用者須持有self.lock
+        if self.timer is not None:
+            self.timer.cancel()
+        self.timer = threading.Timer(delay, self.flush)
+        self.timer.daemon = True
+        self.timer.start()
+    
+    def flush(self):
+        """立即寫入尚未寫入的配置快照，返回是否成功（無待寫入內容時返回True）"""
+        # 持有寫入鎖再取出快照：計時器線程和調用線程同時寫入時，較新的快照總是最後寫入
+        with self.write_lock:
+            with self.lock:
+                if self.timer is not None:
+                    self.timer.cancel()
+                    self.timer = None
+                snapshot = self.pending_snapshot
+            
+            if snapshot is None:
+                return True
+            
+            try:
+                self._write_atomically(snapshot)
+            except Exception as e:
+                print(f"悅耳進度條：保存配置錯誤: {e}")
+                with self.lock:
+                    # 保留快照稍後重試；期間已有新的變更時由其計時器寫入
+                    if self.pending_snapshot is snapshot and self.timer is None:
+                        self._start_timer(SAVE_RETRY_SECONDS)
+                return False
+            
+            with self.lock:
+                # 文件替換完成後才清除快照，寫入期間記錄的新快照仍待寫入
+                if self.pending_snapshot is snapshot:
+                    self.pending_snapshot = None
+            print("悅耳進度條：配置已保存")
+            return True
+    
+    def _write_atomically(self, snapshot):
+        write_config_atomically(self.file_path, snapshot)
+
+
 class SineProgressConfig:
     """悅耳進度條配置管理類"""
     
     def __init__(self):
         self.config = None
+        # 已解析和驗證的配置值（按類型保存），getter直接返回，無需每次重新解析
+        self.values = dict(DEFAULT_CONFIG)
+        # 應用程式配置檔：appModule名稱 -> 覆蓋的聲音配置值
+        self.profiles = {}
+        # 配置版本：任何配置值變更時遞增，使用者只需比較版本即可判斷是否需要重新讀取
+        self.version = 0
+        # 配置文件在背景延遲寫入，程式退出前寫入尚未保存的變更
+        self.writer = ConfigFileWriter(CONFIG_FILE_PATH)
+        atexit.register(self.writer.flush)
         self.load_config()
     
     def load_config(self):
         """載入配置文件"""
+        if self.config is not None and self.writer.pending:
+            # 記憶體中的配置比文件新，尚未寫入前不重新讀取
+            return
+        
         try:
             if os.path.exists(CONFIG_FILE_PATH):
                 self.config = ConfigObj(CONFIG_FILE_PATH, encoding='utf-8')
@@ -116,6 +245,85 @@ class SineProgressConfig:
             print(f"悅耳進度條：載入配置文件錯誤: {e}")
             self.config = ConfigObj(encoding='utf-8')
             self._apply_default_config()
+        
+        self._parse_config()
+    
+    def _parse_config(self):
+        """將ConfigObj的值一次解析為類型化的配置值，值有變更時遞增版本"""
+        values = {}
+        for key, parser in CONFIG_FIELD_PARSERS.items():
+            try:
+                values[key] = parser(self.config.get(key, DEFAULT_CONFIG[key]))
+            except (ValueError, TypeError):
+                values[key] = DEFAULT_CONFIG[key]
+        
+        profiles = {}
+        profiles_section = self.config.get(PROFILES_SECTION)
+        if isinstance(profiles_section, dict):
+            for app_name, section in profiles_section.items():
+                if isinstance(section, dict):
+                    profiles[app_name] = parse_profile_overrides(section)
+        
+        if values != self.values or profiles != self.profiles:
+            self.values = values
+            self.profiles = profiles
+            self.version += 1
+    
+    def _store(self, key, value):
+        """保存配置值到ConfigObj和已解析的配置值，值有變更時遞增版本"""
+        self.config[key] = value
+        value = CONFIG_FIELD_PARSERS[key](value)
+        if self.values.get(key) != value:
+            self.values[key] = value
+            self.version += 1
+    
+    def get_values(self):
+        """獲取所有已解析配置值的副本"""
+        return dict(self.values)
+    
+    def get_profiles(self):
+        """獲取所有應用程式配置檔覆蓋值的副本"""
+        return {app_name: dict(overrides) for app_name, overrides in self.profiles.items()}
+    
+    def get_profile_values(self, app_name):
+        """獲取應用程式配置檔的完整配置值（全局配置加上配置檔的覆蓋值）"""
+        values = dict(self.values)
+        values.update(self.profiles.get(app_name, {}))
+        # 覆蓋後頻率範圍無效時使用全局的頻率範圍
+        if values['min_frequency'] >= values['max_frequency']:
+            values['min_frequency'] = self.values['min_frequency']
+            values['max_frequency'] = self.values['max_frequency']
+        return values
+    
+    def set_profile(self, app_name, values):
+        """保存應用程式配置檔的聲音配置值，返回是否成功"""
+        overrides = parse_profile_overrides({key: values[key] for key in PROFILE_FIELDS if key in values})
+        merged = dict(self.values)
+        merged.update(overrides)
+        if not app_name or merged['min_frequency'] >= merged['max_frequency']:
+            print("悅耳進度條：警告：無效的應用程式配置檔")
+            return False
+        
+        if PROFILES_SECTION not in self.config:
+            self.config[PROFILES_SECTION] = {}
+        self.config[PROFILES_SECTION][app_name] = overrides
+        if self.profiles.get(app_name) != overrides:
+            self.profiles[app_name] = overrides
+            self.version += 1
+        self.save_config()
+        print(f"悅耳進度條：已保存應用程式配置檔 {app_name}")
+        return True
+    
+    def remove_profile(self, app_name):
+        """移除應用程式配置檔"""
+        if app_name not in self.profiles:
+            return False
+        del self.config[PROFILES_SECTION][app_name]
+        del self.profiles[app_name]
+        self.version += 1
+        self.save_config()
+        print(f"悅耳進度條：已移除應用程式配置檔 {app_name}")
+        return True
     
     def _ensure_config_completeness(self):
         """確保配置完整性，補充缺少的配置項"""
@@ -148,6 +356,32 @@ class SineProgressConfig:
                 print("悅耳進度條：無效的波形類型配置")
                 return False
             
+            # 驗證延遲模式
+            if self.config.get('latency_preset') not in LATENCY_PRESETS:
+                print("悅耳進度條：無效的延遲模式配置")
+                return False
+            
+            # 驗證輸出後端
+            if self.config.get('output_backend') not in OUTPUT_BACKENDS:
+                print("悅耳進度條：無效的輸出後端配置")
+                return False
+            
+            # 驗證日誌級別
+            if self.config.get('log_level') not in LOG_LEVEL_NAMES:
+                print("悅耳進度條：無效的日誌級別配置")
+                return False
+            
+            # 驗證開關選項
+            if str(self.config.get('route_all_beeps')) not in ('True', 'False'):
+                print("悅耳進度條：無效的提示音接管配置")
+                return False
+            if str(self.config.get('stereo_output')) not in ('True', 'False'):
+                print("悅耳進度條：無效的立體聲輸出配置")
+                return False
+            if str(self.config.get('cache_earcons')) not in ('True', 'False'):
+                print("悅耳進度條：無效的提示音檔案緩存配置")
+                return False
+            
             # 驗證音量
             volume = float(self.config.get('volume', 0.5))
             if volume not in VOLUME_OPTIONS:
@@ -173,84 +407,142 @@ class SineProgressConfig:
     def _apply_default_config(self):
         """應用預設配置"""
         for key, value in DEFAULT_CONFIG.items():
-            self.config[key] = value
+            self._store(key, value)
         print("悅耳進度條：已應用預設配置")
     
     def save_config(self):
-        """保存配置到文件"""
-        try:
-            self.config.filename = CONFIG_FILE_PATH
-            self.config.write()
-            print("悅耳進度條：配置已保存")
-        except Exception as e:
-            print(f"悅耳進度條：保存配置錯誤: {e}")
+        """保存配置到文件（在背景延遲寫入，不阻塞調用線程）"""
+        self.writer.schedule(self.config.dict())
+    
+    def flush(self):
+        """立即寫入尚未保存的配置（例如插件停用時）"""
+        return self.writer.flush()
 
     def get_audio_duration(self):
         """獲取波形長度"""
-        return float(self.config.get('audio_duration', DEFAULT_CONFIG['audio_duration']))
+        return self.values['audio_duration']
 
     def set_audio_duration(self, duration):
         """設置波形長度"""
         if duration in AUDIO_DURATION_OPTIONS:
-            self.config['audio_duration'] = duration
+            self._store('audio_duration', duration)
             print(f"悅耳進度條：波形長度設為 {duration*1000:.0f}ms")
 
     def get_fade_algorithm(self):
         """獲取淡入淡出算法"""
-        return self.config.get('fade_algorithm', DEFAULT_CONFIG['fade_algorithm'])
+        return self.values['fade_algorithm']
     
     def set_fade_algorithm(self, algorithm):
         """設置淡入淡出算法"""
         if algorithm in FADE_ALGORITHMS:
-            self.config['fade_algorithm'] = algorithm
+            self._store('fade_algorithm', algorithm)
             print(f"悅耳進度條：淡入淡出算法設為 {FADE_ALGORITHMS[algorithm]}")
     
     def get_waveform_type(self):
         """獲取波形類型"""
-        return self.config.get('waveform_type', DEFAULT_CONFIG['waveform_type'])
+        return self.values['waveform_type']
     
     def set_waveform_type(self, waveform):
         """設置波形類型"""
         if waveform in WAVEFORM_TYPES:
-            self.config['waveform_type'] = waveform
+            self._store('waveform_type', waveform)
             print(f"悅耳進度條：波形類型設為 {WAVEFORM_TYPES[waveform]}")
     
+    def get_latency_preset(self):
+        """獲取延遲模式"""
+        return self.values['latency_preset']
+    
+    def set_latency_preset(self, preset):
+        """設置延遲模式"""
+        if preset in LATENCY_PRESETS:
+            self._store('latency_preset', preset)
+            print(f"悅耳進度條：延遲模式設為 {LATENCY_PRESETS[preset]}")
+    
+    def get_output_backend(self):
+        """獲取輸出後端"""
+        return self.values['output_backend']
+    
+    def set_output_backend(self, backend):
+        """設置輸出後端"""
+        if backend in OUTPUT_BACKENDS:
+            self._store('output_backend', backend)
+            print(f"悅耳進度條：輸出後端設為 {OUTPUT_BACKENDS[backend]}")
+    
+    def get_log_level(self):
+        """獲取日誌級別"""
+        return self.values['log_level']
+    
+    def set_log_level(self, level):
+        """設置日誌級別"""
+        if level in LOG_LEVEL_NAMES:
+            self._store('log_level', level)
+            print(f"悅耳進度條：日誌級別設為 {LOG_LEVEL_NAMES[level]}")
+    
+    def get_route_all_beeps(self):
+        """獲取是否接管所有提示音"""
+        return self.values['route_all_beeps']
+    
+    def set_route_all_beeps(self, enabled):
+        """設置是否接管所有提示音"""
+        self._store('route_all_beeps', bool(enabled))
+        print(f"悅耳進度條：接管所有提示音設為 {'開啟' if enabled else '關閉'}")
+    
+    def get_stereo_output(self):
+        """獲取是否使用立體聲輸出"""
+        return self.values['stereo_output']
+    
+    def set_stereo_output(self, enabled):
+        """設置是否使用立體聲輸出"""
+        self._store('stereo_output', bool(enabled))
+        print(f"悅耳進度條：立體聲輸出設為 {'開啟' if enabled else '關閉'}")
+    
+    def get_cache_earcons(self):
+        """獲取是否緩存NVDA提示音檔案"""
+        return self.values['cache_earcons']
+    
+    def set_cache_earcons(self, enabled):
+        """設置是否緩存NVDA提示音檔案"""
+        self._store('cache_earcons', bool(enabled))
+        print(f"悅耳進度條：緩存提示音檔案設為 {'開啟' if enabled else '關閉'}")
+    
     def get_volume(self):
         """獲取音量"""
-        return float(self.config.get('volume', DEFAULT_CONFIG['volume']))
+        return self.values['volume']
     
     def set_volume(self, volume):
         """設置音量"""
         if volume in VOLUME_OPTIONS:
-            self.config['volume'] = volume
+            self._store('volume', volume)
             print(f"悅耳進度條：音量設為 {volume}")
     
     def get_min_frequency(self):
         """獲取起點頻率（低頻）"""
-        return int(self.config.get('min_frequency', DEFAULT_CONFIG['min_frequency']))
+        return self.values['min_frequency']
     
     def set_min_frequency(self, frequency):
         """設置起點頻率（低頻）"""
         if frequency in MIN_FREQUENCY_OPTIONS:
-            self.config['min_frequency'] = frequency
+            self._store('min_frequency', frequency)
             print(f"悅耳進度條：起點頻率設為 {frequency}Hz")
     
     def get_max_frequency(self):
         """獲取終點頻率（高頻）"""
-        return int(self.config.get('max_frequency', DEFAULT_CONFIG['max_frequency']))
+        return self.values['max_frequency']
     
     def set_max_frequency(self, frequency):
         """設置終點頻率（高頻）"""
         if frequency in MAX_FREQUENCY_OPTIONS:
-            self.config['max_frequency'] = frequency
+            self._store('max_frequency', frequency)
             print(f"悅耳進度條：終點頻率設為 {frequency}Hz")
     
     def get_frequency_range(self):
         """獲取頻率範圍"""
-        return self.get_min_frequency(), self.get_max_frequency()
+        return self.values['min_frequency'], self.values['max_frequency']
     
     def update_config(self, fade_algorithm=None, waveform_type=None, volume=None, 
-                     min_frequency=None, max_frequency=None, audio_duration=None
+                     min_frequency=None, max_frequency=None, audio_duration=None,
+                     latency_preset=None, output_backend=None, route_all_beeps=None,
+                     stereo_output=None, cache_earcons=None, log_level=None
                      ):
         """批量更新配置"""
         config_changed = False
@@ -279,6 +571,36 @@ class SineProgressConfig:
         if audio_duration is not None:
             self.set_audio_duration(audio_duration)
             config_changed = True
+
+        # 延遲模式參數
+        if latency_preset is not None:
+            self.set_latency_preset(latency_preset)
+            config_changed = True
+
+        # 輸出後端參數
+        if output_backend is not None:
+            self.set_output_backend(output_backend)
+            config_changed = True
+
+        # 接管所有提示音參數
+        if route_all_beeps is not None:
+            self.set_route_all_beeps(route_all_beeps)
+            config_changed = True
+
+        # 立體聲輸出參數
+        if stereo_output is not None:
+            self.set_stereo_output(stereo_output)
+            config_changed = True
+
+        # 緩存提示音檔案參數
+        if cache_earcons is not None:
+            self.set_cache_earcons(cache_earcons)
+            config_changed = True
+
+        # 日誌級別參數
+        if log_level is not None:
+            self.set_log_level(log_level)
+            config_changed = True
     
         if config_changed:
             # 驗證頻率範圍
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+# 悅耳進度條 - 設定預覽模塊
+# 按設定面板的選擇渲染0-100%的進度條掃頻，並在背景預先渲染相鄰選項的掃頻，切換選項時可即時播放
+
+import threading
+from collections import OrderedDict
+from ._tone_table import ORIGINAL_MIN_FREQ, ORIGINAL_MAX_FREQ, map_progress_frequency
+from ._debug_log import log
+
+# 掃頻的音調數量：0%, 10%, ..., 100%
+PREVIEW_STEPS = 11
+
+# 影響預覽聲音的配置欄位
+PREVIEW_FIELDS = ('waveform_type', 'fade_algorithm', 'volume', 'min_frequency', 'max_frequency', 'audio_duration')
+
+# 最多保留的已渲染掃頻數量（面板中每個選項的前後兩個選擇約12個）
+DEFAULT_PREVIEW_CAPACITY = 32
+
+
+def get_preview_key(values, sample_rate, sample_format, output_channels):
+    """生成掃頻緩存鍵：預覽相關的配置值和輸出格式都相同時才能重用"""
+    return tuple(values[field] for field in PREVIEW_FIELDS) + (sample_rate, sample_format, output_channels)
+
+
+def preview_sweep_frequencies(min_frequency, max_frequency, steps=PREVIEW_STEPS):
+    """掃頻中每個音調的映射頻率（按原始進度條頻率平均分佈）"""
+    last_step = max(1, steps - 1)
+    frequencies = []
+    for step in range(steps):
+        original_hz = ORIGINAL_MIN_FREQ + (ORIGINAL_MAX_FREQ - ORIGINAL_MIN_FREQ) * step / float(last_step)
+        frequencies.append(round(map_progress_frequency(original_hz, min_frequency, max_frequency), 1))
+    return frequencies
+
+
+class SweepPreviewer:
+    """已渲染掃頻的LRU緩存和背景預先渲染線程"""
+
+    def __init__(self, render_sweep, capacity=DEFAULT_PREVIEW_CAPACITY):
+        # render_sweep(values) -> (緩存鍵, 各音調的音頻數據列表)
+        self.render_sweep = render_sweep
+        self.capacity = max(1, capacity)
+
+        self.sweeps = OrderedDict()
+        self.lock = threading.Lock()
+
+        # 等待預先渲染的配置值列表（新的請求取代尚未處理的舊請求）
+        self.pending = []
+        self.pending_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.worker_thread = None
+
+    def lookup(self, key):
+        with self.lock:
+            chunks = self.sweeps.get(key)
+            if chunks is not None:
+                self.sweeps.move_to_end(key)
+            return chunks
+
+    def store(self, key, chunks):
+        with self.lock:
+            self.sweeps[key] = chunks
+            self.sweeps.move_to_end(key)
+            while len(self.sweeps) > self.capacity:
+                self.sweeps.popitem(last=False)
+
+    def get_sweep(self, key, values):
+        """取得掃頻：已預先渲染則直接返回，否則立即渲染"""
+        chunks = self.lookup(key)
+        if chunks is None:
+            key, chunks = self.render_sweep(values)
+            self.store(key, chunks)
+        elif log.debug_enabled:
+            print("悅耳進度條：使用預先渲染的預覽掃頻")
+        return chunks
+
+    def prerender(self, values_list):
+        """在背景預先渲染多個配置的掃頻"""
+        with self.lock:
+            self.pending = list(values_list)
+        if self.worker_thread is None or not self.worker_thread.is_alive():
+            self.stop_event.clear()
+            self.worker_thread = threading.Thread(target=self._prerender_worker, daemon=True)
+            self.worker_thread.start()
+        self.pending_event.set()
+
+    def _prerender_worker(self):
+        while not self.stop_event.is_set():
+            with self.lock:
+                values = self.pending.pop(0) if self.pending else None
+            if values is None:
+                self.pending_event.wait()
+                self.pending_event.clear()
+                continue
+
+            try:
+                key, chunks = self.render_sweep(values)
+                self.store(key, chunks)
+            except Exception as e:
+                print(f"悅耳進度條：預先渲染預覽掃頻錯誤: {e}")
+
+    def clear(self):
+        with self.lock:
+            self.sweeps.clear()
+            self.pending = []
+
+    def stop(self):
+        """停止背景預先渲染線程"""
+        self.stop_event.set()
+        self.pending_event.set()
+        if self.worker_thread is not None:
+            self.worker_thread.join(timeout=1.0)
+            self.worker_thread = None
+        self.clear()
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+# 悅耳進度條 - 效能分析模塊
+# 按需以cProfile分析守護線程和tones.beep攔截函數，達到時間或提示音數量上限後將統計寫入NVDA配置目錄，無需特別版本即可收集使用者的分析結果
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import globalVars
+
+# 預設的分析時長（秒）和提示音數量上限，先達到者結束分析
+DEFAULT_PROFILE_SECONDS = 10.0
+DEFAULT_PROFILE_BEEPS = 200
+
+# 文字摘要列出的函數數量
+SUMMARY_FUNCTION_COUNT = 40
+
+PROFILE_FILE_PREFIX = "pleasantProgress-profile-"
+
+# Python 3.12起cProfile改用sys.monitoring，一個分析器即涵蓋所有線程，且同一時間只能啟用一個
+PER_THREAD_PROFILING = sys.version_info < (3, 12)
+
+
+def get_profile_paths(started_at):
+    """分析結果的檔案路徑：(pstats二進制檔, 文字摘要)"""
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(started_at))
+    base = os.path.join(globalVars.appArgs.configPath, PROFILE_FILE_PREFIX + stamp)
+    return base + ".prof", base + ".txt"
+
+
+class DaemonProfiler:
+    """守護線程和攔截函數各自使用一個cProfile（Python 3.12之前cProfile只分析啟用它的線程）"""
+
+    def __init__(self):
+        # 熱路徑只檢查此布林值，未分析時沒有額外開銷
+        self.active = False
+        self.lock = threading.Lock()
+        # 攔截函數可能在多個線程被調用，同一時間只分析一個調用
+        self.hook_lock = threading.Lock()
+        self.daemon_profile = None
+        self.hook_profile = None
+        self.daemon_enabled = False
+        self.started_at = 0.0
+        self.deadline = 0.0
+        self.beep_limit = 0
+        self.beep_count = 0
+        self.stop_requested = False
+        # 分析結束後的回調：on_complete(pstats檔路徑或None, 提示音數量)
+        self.on_complete = None
+
+    def start(self, seconds=DEFAULT_PROFILE_SECONDS, beeps=DEFAULT_PROFILE_BEEPS, on_complete=None):
+        """開始分析，已在分析中返回False"""
+        with self.lock:
+            if self.active:
+                return False
+            self.daemon_profile = cProfile.Profile()
+            self.hook_profile = cProfile.Profile() if PER_THREAD_PROFILING else None
+            self.daemon_enabled = False
+            self.started_at = time.time()
+            self.deadline = time.monotonic() + seconds
+            self.beep_limit = beeps
+            self.beep_count = 0
+            self.stop_requested = False
+            self.on_complete = on_complete
+            self.active = True
+        return True
+
+    def stop(self):
+        """提前結束分析（由守護線程在下一次循環寫入結果）"""
+        self.stop_requested = True
+
+    def run_hook(self, func, *args):
+        """在分析中調用攔截函數：分析已結束或其他線程正在分析攔截函數時直接調用"""
+        if not self.hook_lock.acquire(blocking=False):
+            return func(*args)
+        try:
+            if not self.active:
+                return func(*args)
+            self.beep_count += 1
+            if self.hook_profile is None:
+                # 守護線程的分析器已涵蓋所有線程
+                return func(*args)
+            return self.hook_profile.runcall(func, *args)
+        finally:
+            self.hook_lock.release()
+
+    def daemon_tick(self):
+        """在守護線程每次循環開始時調用：啟用守護線程的分析，達到上限時停止並寫入結果"""
+        if not self.daemon_enabled:
+            try:
+                self.daemon_profile.enable()
+                self.daemon_enabled = True
+            except ValueError as e:
+                # 其他分析工具已在使用（例如Python 3.12+的sys.monitoring只允許一個分析工具）
+                print(f"悅耳進度條：無法啟用守護線程效能分析: {e}")
+                self.daemon_profile = None
+                self.daemon_enabled = True
+
+        if (self.stop_requested or self.beep_count >= self.beep_limit or
+                time.monotonic() >= self.deadline):
+            self.finish()
+
+    def finish(self):
+        """在守護線程停止分析，並在背景寫入結果"""
+        if self.daemon_profile is not None:
+            self.daemon_profile.disable()
+        with self.hook_lock:
+            profiles = [profile for profile in (self.daemon_profile, self.hook_profile) if profile is not None]
+            beep_count = self.beep_count
+            with self.lock:
+                self.active = False
+        threading.Thread(target=self._write_results, args=(profiles, beep_count, self.started_at, self.on_complete),
+                         daemon=True).start()
+
+    def _write_results(self, profiles, beep_count, started_at, on_complete):
+        stats_path = None
+        try:
+            stats = None
+            for profile in profiles:
+                profile.create_stats()
+                if not profile.stats:
+                    continue
+                if stats is None:
+                    stats = pstats.Stats(profile)
+                else:
+                    stats.add(profile)
+
+            if stats is not None:
+                stats_path, summary_path = get_profile_paths(started_at)
+                stats.dump_stats(stats_path)
+                summary = io.StringIO()
+                stats.stream = summary
+                stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(SUMMARY_FUNCTION_COUNT)
+                with open(summary_path, 'w', encoding='utf-8') as summary_file:
+                    summary_file.write(f"提示音數量: {beep_count}\n")
+                    summary_file.write(summary.getvalue())
+                print(f"悅耳進度條：效能分析結果已寫入 {stats_path}（{beep_count} 個提示音）")
+            else:
+                print("悅耳進度條：效能分析沒有收集到任何數據")
+        except Exception as e:
+            print(f"悅耳進度條：寫入效能分析結果錯誤: {e}")
+            stats_path = None
+
+        if on_complete is not None:
+            on_complete(stats_path, beep_count)
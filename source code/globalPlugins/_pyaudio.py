@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+# 悅耳進度條 - 內嵌PyAudio模塊
+# 包裝內嵌的_portaudio擴展模塊，只在背景初始化音頻系統時才載入（載入失敗時拋出ImportError）
+
+import os
+import sys
+
+plugin_dir = os.path.dirname(__file__)
+if plugin_dir not in sys.path:
+    sys.path.insert(0, plugin_dir)
+
+import _portaudio as pa
+
+# PyAudio常量定義
+paFloat32 = pa.paFloat32
+paInt32 = pa.paInt32
+paInt24 = pa.paInt24
+paInt16 = pa.paInt16
+paInt8 = pa.paInt8
+paUInt8 = pa.paUInt8
+paCustomFormat = pa.paCustomFormat
+
+paNoError = pa.paNoError
+paNotInitialized = pa.paNotInitialized
+paInvalidDevice = pa.paInvalidDevice
+paCanNotWriteToAnInputOnlyStream = pa.paCanNotWriteToAnInputOnlyStream
+paCanNotReadFromAnOutputOnlyStream = pa.paCanNotReadFromAnOutputOnlyStream
+
+paContinue = pa.paContinue
+paComplete = pa.paComplete
+paAbort = pa.paAbort
+
+paFramesPerBufferUnspecified = pa.paFramesPerBufferUnspecified
+
+# 樣本格式名稱到PortAudio格式常量的映射
+PA_SAMPLE_FORMATS = {
+    'int16': paInt16,
+    'int24': paInt24,
+    'float32': paFloat32,
+}
+
+def get_sample_size(format):
+    return pa.get_sample_size(format)
+
+def get_format_from_width(width, unsigned=True):
+    if width == 1:
+        return paUInt8 if unsigned else paInt8
+    if width == 2:
+        return paInt16
+    if width == 3:
+        return paInt24
+    if width == 4:
+        return paFloat32
+    raise ValueError(f"Invalid width: {width}")
+
+# 添加設備信息相關函數
+def get_default_output_device_info():
+    """獲取默認輸出設備信息"""
+    try:
+        return pa.get_default_output_device_info()
+    except AttributeError:
+        # 如果_portaudio模塊沒有此函數，返回模擬的設備信息
+        return {
+            'index': 0,
+            'name': 'Default Output Device',
+            'defaultSampleRate': 44100.0,
+            'maxOutputChannels': 2
+        }
+
+def old_get_device_info_by_index(device_index):
+    """根據索引獲取設備信息"""
+    try:
+        return pa.get_device_info_by_index(device_index)
+    except AttributeError:
+        # 如果_portaudio模塊沒有此函數，返回模擬的設備信息
+        return {
+            'index': device_index,
+            'name': f'Audio Device {device_index}',
+            'defaultSampleRate': 44100.0,
+            'maxOutputChannels': 2
+        }
+
+def get_device_info_by_index(self, device_index):
+    """根據索引獲取設備信息 - 修正版本"""
+    try:
+        # 使用正確的函數名稱
+        device_info = pa.get_device_info(device_index)
+
+        # 提取設備信息
+        name = device_info.name
+        # 處理 bytes 格式的名稱
+        if isinstance(name, bytes):
+            name = name.decode('utf-8', errors='ignore')
+
+        return {
+            'index': device_index,
+            'name': name,
+            'defaultSampleRate': float(device_info.defaultSampleRate),
+            'maxOutputChannels': int(device_info.maxOutputChannels)
+        }
+
+    except Exception as e:
+        # 降級到通用名稱
+        return {
+            'index': device_index,
+            'name': f'Audio Device {device_index}',
+            'defaultSampleRate': 44100.0,
+            'maxOutputChannels': 2
+        }
+
+def get_device_count():
+    """獲取設備數量"""
+    try:
+        return pa.get_device_count()
+    except AttributeError:
+        return 1  # 至少返回一個設備
+
+class PyAudio:
+    class Stream:
+        def __init__(self, PA_manager, rate, channels, format, input=False, output=False,
+                     input_device_index=None, output_device_index=None,
+                     frames_per_buffer=paFramesPerBufferUnspecified, start=True,
+                     input_host_api_specific_stream_info=None,
+                     output_host_api_specific_stream_info=None, stream_callback=None):
+
+            if not (input or output):
+                raise ValueError("Must specify an input or output stream.")
+
+            self._parent = PA_manager
+            self._is_input = input
+            self._is_output = output
+            self._is_running = start
+            self._rate = rate
+            self._channels = channels
+            self._format = format
+            self._frames_per_buffer = frames_per_buffer
+
+            arguments = {
+                'rate': rate, 'channels': channels, 'format': format,
+                'input': input, 'output': output,
+                'input_device_index': input_device_index,
+                'output_device_index': output_device_index,
+                'frames_per_buffer': frames_per_buffer
+            }
+
+            if input_host_api_specific_stream_info:
+                arguments['input_host_api_specific_stream_info'] = input_host_api_specific_stream_info
+            if output_host_api_specific_stream_info:
+                arguments['output_host_api_specific_stream_info'] = output_host_api_specific_stream_info
+            if stream_callback:
+                arguments['stream_callback'] = stream_callback
+
+            self._stream = pa.open(**arguments)
+            self._input_latency = self._stream.inputLatency
+            self._output_latency = self._stream.outputLatency
+
+            if self._is_running:
+                pa.start_stream(self._stream)
+
+        def close(self):
+            pa.close(self._stream)
+            self._is_running = False
+            self._parent._remove_stream(self)
+
+        def write(self, frames, num_frames=None, exception_on_underflow=False):
+            if not self._is_output:
+                raise IOError("Not output stream", paCanNotWriteToAnInputOnlyStream)
+
+            if num_frames is None:
+                width = get_sample_size(self._format)
+                num_frames = int(len(frames) / (self._channels * width))
+
+            pa.write_stream(self._stream, frames, num_frames, exception_on_underflow)
+
+        def start_stream(self):
+            if self._is_running:
+                return
+            pa.start_stream(self._stream)
+            self._is_running = True
+
+        def stop_stream(self):
+            if not self._is_running:
+                return
+            pa.stop_stream(self._stream)
+            self._is_running = False
+
+        def is_active(self):
+            return pa.is_stream_active(self._stream)
+
+    def __init__(self):
+        pa.initialize()
+        self._streams = set()
+
+        # 添加Host API掃描功能 - 參考ooo.py
+        self.host_apis = self._scan_host_apis()
+        self.preferred_host_api = self._select_preferred_host_api()
+
+        if self.debug_mode if hasattr(self, 'debug_mode') else False:
+            if self.preferred_host_api:
+                pass
+            else:
+                pass
+
+    def _scan_host_apis(self):
+        """掃描所有可用的Host API - 參考ooo.py"""
+        host_apis = {}
+        try:
+            host_api_count = pa.get_host_api_count()
+
+            for i in range(host_api_count):
+                host_api_info = pa.get_host_api_info(i)
+
+                # 直接訪問屬性
+                api_name = host_api_info.name if hasattr(host_api_info, 'name') else f'Host API {i}'
+                device_count = host_api_info.deviceCount if hasattr(host_api_info, 'deviceCount') else 0
+
+                host_apis[i] = {
+                    'index': i,
+                    'name': api_name,
+                    'info': host_api_info,
+                    'device_count': device_count
+                }
+
+            return host_apis
+        except Exception as e:
+            print(f"悅耳進度條：Host API掃描失敗: {e}")
+            return {}
+
+    def _select_preferred_host_api(self):
+        """選擇首選Host API - 優先WASAPI用於設備名稱獲取"""
+        api_priority = [
+            'Windows WASAPI',
+            'WASAPI', 
+            'Windows DirectSound',
+            'DirectSound',
+            'WDM-KS',
+            'MME'
+        ]
+
+        for preferred_name in api_priority:
+            for api_index, api_data in self.host_apis.items():
+                api_name = api_data['name']
+                if preferred_name.lower() in api_name.lower():
+                    return api_data
+
+        # 降級到第一個有設備的API
+        for api_index, api_data in self.host_apis.items():
+            if api_data['device_count'] > 0:
+                return api_data
+
+        return None
+
+    def get_devices_by_host_api(self, host_api_index):
+        """獲取指定Host API的所有設備 - 參考ooo.py"""
+        devices = []
+        try:
+            total_device_count = pa.get_device_count()
+
+            for global_index in range(total_device_count):
+                device_info = pa.get_device_info(global_index)
+
+                # 直接訪問屬性
+                device_host_api = device_info.hostApi if hasattr(device_info, 'hostApi') else -1
+
+                if device_host_api == host_api_index:
+                    devices.append({
+                        'global_index': global_index,
+                        'name': device_info.name if hasattr(device_info, 'name') else f'Device {global_index}',
+                        'maxOutputChannels': device_info.maxOutputChannels if hasattr(device_info, 'maxOutputChannels') else 0,
+                        'hostApi': device_host_api
+                    })
+
+            return devices
+
+        except Exception as e:
+            print(f"悅耳進度條：獲取Host API {host_api_index} 設備失敗: {e}")
+            return []
+
+    def terminate(self):
+        for stream in self._streams.copy():
+            stream.close()
+        self._streams = set()
+        pa.terminate()
+
+    def open(self, *args, **kwargs):
+        stream = PyAudio.Stream(self, *args, **kwargs)
+        self._streams.add(stream)
+        return stream
+
+    def get_default_output_device_info(self):
+        """獲取默認輸出設備信息（包含Host API名稱與預設採樣率）"""
+        try:
+            return self.get_device_info_by_index(pa.get_default_output_device())
+        except Exception:
+            # 降級到全局函數
+            return get_default_output_device_info()
+
+    def get_device_info_by_index(self, device_index):
+        """獲取設備信息 - 改進版本參考ooo.py"""
+        try:
+            device_info = pa.get_device_info(device_index)
+
+            # 直接訪問屬性並處理設備名稱
+            name = device_info.name if hasattr(device_info, 'name') else f'Device {device_index}'
+            if isinstance(name, bytes):
+                name = name.decode('utf-8', errors='ignore')
+
+            # 建立設備信息字典
+            result = {
+                'index': device_index,
+                'name': name.strip() if name else f'Device {device_index}',
+                'defaultSampleRate': float(device_info.defaultSampleRate) if hasattr(device_info, 'defaultSampleRate') else 44100.0,
+                'maxOutputChannels': int(device_info.maxOutputChannels) if hasattr(device_info, 'maxOutputChannels') else 0,
+                'hostApi': device_info.hostApi if hasattr(device_info, 'hostApi') else -1
+            }
+
+            # 添加Host API名稱
+            host_api_index = result['hostApi']
+            if hasattr(self, 'host_apis') and host_api_index in self.host_apis:
+                result['host_api_name'] = self.host_apis[host_api_index]['name']
+            else:
+                result['host_api_name'] = f'Host API {host_api_index}'
+
+            return result
+
+        except Exception as e:
+            print(f"悅耳進度條：獲取設備信息失敗: {e}")
+            return {
+                'index': device_index,
+                'name': f'Device {device_index}',
+                'defaultSampleRate': 44100.0,
+                'maxOutputChannels': 0,
+                'hostApi': -1,
+                'host_api_name': 'Unknown',
+                'error': str(e)
+            }
+
+    def _remove_stream(self, stream):
+        """移除流"""
+        if stream in self._streams:
+            self._streams.remove(stream)
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+# 悅耳進度條 - 輸出流池模塊
+# 按設備索引保留最近使用的已開啟輸出流，並預先開啟默認設備的輸出流用於故障切換
+
+import threading
+from collections import OrderedDict
+from ._debug_log import log
+
+# 池中最多保留的設備輸出流數量（不含故障切換流）
+DEFAULT_POOL_CAPACITY = 3
+
+
+def get_stream_config_key(stream_config):
+    """生成流配置鍵：格式、聲道、採樣率和緩衝大小都相同的流才能重用"""
+    return (
+        stream_config.get('format'),
+        stream_config.get('channels'),
+        stream_config.get('rate'),
+        stream_config.get('frames_per_buffer'),
+    )
+
+
+class OutputStreamPool:
+    """LRU輸出流池：切換設備時直接換用已開啟的流，無需重新開啟PortAudio"""
+
+    def __init__(self, pyaudio_instance, capacity=DEFAULT_POOL_CAPACITY):
+        self.pyaudio_instance = pyaudio_instance
+        self.capacity = max(1, capacity)
+
+        # 設備索引 -> (流配置鍵, 流)，按最近使用排序（最後一個為最近使用）
+        self.streams = OrderedDict()
+        # 默認設備的故障切換流：(流配置鍵, 流)
+        self.failover_entry = None
+        self.lock = threading.Lock()
+
+    def _open_stream(self, device_index, stream_config):
+        """開啟新的輸出流"""
+        config = dict(stream_config)
+        config.pop('output_device_index', None)
+        if device_index is not None:
+            config['output_device_index'] = device_index
+        return self.pyaudio_instance.open(**config)
+
+    def _close_stream(self, stream):
+        """關閉輸出流（忽略錯誤）"""
+        try:
+            stream.stop_stream()
+            stream.close()
+        except Exception as e:
+            if log.debug_enabled:
+                print(f"悅耳進度條：關閉池中輸出流錯誤: {e}")
+
+    def acquire(self, device_index, stream_config):
+        """獲取設備的輸出流：池中有相同配置的流則直接重用，否則開啟新流（沒有正在使用的流時調用）"""
+        stream, retired_streams = self.acquire_replacement(device_index, stream_config)
+        for retired_stream in retired_streams:
+            self._close_stream(retired_stream)
+        return stream
+
+    def acquire_replacement(self, device_index, stream_config):
+        """獲取用於換用的輸出流，返回(流, 被取代的流列表)"""
+        # 被取代的流（包括同一設備配置不同的流）可能正在播放，不在此關閉，由調用者換用新流後再關閉
+        config_key = get_stream_config_key(stream_config)
+        retired_streams = []
+
+        with self.lock:
+            entry = self.streams.pop(device_index, None)
+            if entry is None and device_index is None and self.failover_entry is not None:
+                # 默認設備可直接使用故障切換流
+                entry = self.failover_entry
+
+            if entry is not None and entry[0] == config_key:
+                self.streams[device_index] = entry
+                stream = entry[1]
+            else:
+                if entry is not None and entry is not self.failover_entry:
+                    retired_streams.append(entry[1])
+                stream = None
+
+        if stream is not None:
+            stream.start_stream()
+            if log.debug_enabled:
+                print(f"悅耳進度條：重用池中輸出流（設備索引: {device_index}）")
+            return stream, retired_streams
+
+        # 池中沒有可重用的流，開啟新流
+        try:
+            stream = self._open_stream(device_index, stream_config)
+        except Exception:
+            # 開啟失敗時放回原來的流，調用者繼續使用
+            with self.lock:
+                if entry is not None and entry is not self.failover_entry and device_index not in self.streams:
+                    self.streams[device_index] = entry
+            raise
+
+        with self.lock:
+            self.streams[device_index] = (config_key, stream)
+            # 超出容量時移除最久未使用的流（故障切換流不會被淘汰）
+            while len(self.streams) > self.capacity:
+                evicted_index, evicted_entry = self.streams.popitem(last=False)
+                if evicted_entry is not self.failover_entry:
+                    retired_streams.append(evicted_entry[1])
+                if log.debug_enabled:
+                    print(f"悅耳進度條：輸出流池已滿，關閉最久未使用的流（設備索引: {evicted_index}）")
+
+        return stream, retired_streams
+
+    def reopen(self, device_index, stream_config):
+        """為設備重新開啟輸出流（例如nvwave改用NVDA的新輸出設備），返回(新流, 被取代的流)"""
+        # 被取代的流不在此關閉，由調用者換用新流後再關閉，以免中斷正在播放的音調
+        config_key = get_stream_config_key(stream_config)
+        stream = self._open_stream(device_index, stream_config)
+
+        with self.lock:
+            old_entry = self.streams.pop(device_index, None)
+            self.streams[device_index] = (config_key, stream)
+            if old_entry is not None and old_entry is self.failover_entry:
+                self.failover_entry = None
+
+        return stream, (old_entry[1] if old_entry is not None else None)
+
+    def release(self, stream):
+        """關閉已從池中移除的輸出流（例如reopen或acquire_replacement取代的流）"""
+        if stream is not None:
+            self._close_stream(stream)
+
+    def park(self, stream):
+        """暫停不再使用的輸出流，保持開啟以便之後快速切換回來"""
+        if stream is None:
+            return
+        try:
+            stream.stop_stream()
+        except Exception as e:
+            if log.debug_enabled:
+                print(f"悅耳進度條：暫停池中輸出流錯誤: {e}")
+
+    def prepare_failover(self, stream_config):
+        """預先開啟默認設備的輸出流，用於設備故障時即時切換"""
+        config_key = get_stream_config_key(stream_config)
+
+        with self.lock:
+            old_entry = self.failover_entry
+            if old_entry is not None and old_entry[0] == config_key:
+                return True
+
+            # 池中已有相同配置的默認設備流時直接作為故障切換流，否則稍後開啟新流
+            pooled_entry = self.streams.get(None)
+            if pooled_entry is not None and pooled_entry[0] == config_key:
+                self.failover_entry = pooled_entry
+            else:
+                self.failover_entry = None
+
+            # 舊的故障切換流若正作為默認設備流使用，則保留在池中
+            if old_entry is not None and pooled_entry is old_entry:
+                old_entry = None
+            adopted = self.failover_entry is not None
+
+        if old_entry is not None:
+            self._close_stream(old_entry[1])
+        if adopted:
+            return True
+
+        try:
+            stream = self._open_stream(None, stream_config)
+            # 故障切換流暫停待命
+            stream.stop_stream()
+        except Exception as e:
+            print(f"悅耳進度條：預先開啟默認設備輸出流失敗: {e}")
+            return False
+
+        with self.lock:
+            self.failover_entry = (config_key, stream)
+        return True
+
+    def failover(self):
+        """切換到默認設備的故障切換流，無可用流返回None"""
+        with self.lock:
+            entry = self.failover_entry
+            if entry is None:
+                return None
+            self.streams.pop(None, None)
+            self.streams[None] = entry
+
+        try:
+            entry[1].start_stream()
+        except Exception as e:
+            print(f"悅耳進度條：啟動故障切換輸出流失敗: {e}")
+            self.discard(None)
+            return None
+        return entry[1]
+
+    def discard(self, device_index):
+        """關閉並移除設備的輸出流（例如設備已失效）"""
+        entries = []
+        with self.lock:
+            entry = self.streams.pop(device_index, None)
+            if entry is not None:
+                entries.append(entry)
+            # 默認設備失效時，故障切換流也一併移除
+            if device_index is None and self.failover_entry is not None:
+                if self.failover_entry is not entry:
+                    entries.append(self.failover_entry)
+                self.failover_entry = None
+
+        for stale_entry in entries:
+            self._close_stream(stale_entry[1])
+
+    def close_all(self):
+        """關閉池中所有輸出流"""
+        with self.lock:
+            entries = list(self.streams.values())
+            if self.failover_entry is not None and self.failover_entry not in entries:
+                entries.append(self.failover_entry)
+            self.streams.clear()
+            self.failover_entry = None
+
+        for entry in entries:
+            self._close_stream(entry[1])
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# 悅耳進度條 - 音色庫模塊
+# 每個應用程式配置檔（和全局配置）各有一個預先渲染的音色庫，焦點切換時只需換用引用，無需重新合成
+
+# 音色庫換用的插件屬性（聲音相關，輸出流參數不隨配置檔變更）
+TONE_BANK_ATTRIBUTES = (
+    'waveform_type',
+    'fade_algorithm',
+    'fade_ratio',
+    'volume',
+    'min_frequency',
+    'max_frequency',
+    'mapped_min_freq',
+    'mapped_max_freq',
+    'audio_duration',
+    'thread_sleep_interval',
+)
+
+# 不使用配置檔的應用程式程式名稱（NVDA自身的對話框，例如設定面板）
+IGNORED_APP_NAMES = ('nvda',)
+
+
+class ToneBank:
+    """一個配置檔的音色：聲音屬性、頻率查找表和已預先渲染進度條音調的緩存"""
+
+    __slots__ = ('profile_name', 'attributes', 'tone_table', 'generation', 'audio_cache', 'output_format')
+
+    def __init__(self, profile_name, attributes, tone_table, generation, audio_cache, output_format):
+        # 配置檔名稱（appModule名稱），全局配置為None
+        self.profile_name = profile_name
+        self.attributes = attributes
+        self.tone_table = tone_table
+        self.generation = generation
+        self.audio_cache = audio_cache
+        # 渲染時的輸出格式：(採樣率, 樣本格式, 聲道數)
+        self.output_format = output_format
+
+
+def resolve_profile_name(app_name, tone_banks):
+    """應用程式使用的配置檔名稱，沒有配置檔時使用全局配置（None）"""
+    if app_name is not None and app_name in tone_banks:
+        return app_name
+    return None
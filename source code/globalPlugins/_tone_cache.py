@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+# 悅耳進度條 - 分區音頻緩存模塊
+# 不同類別的音調請求使用各自的緩存分區和淘汰策略，互不擠佔
+
+from collections import OrderedDict
+
+# 淘汰策略
+EVICTION_FIFO = 'fifo'  # 移除最早加入的條目
+EVICTION_LRU = 'lru'    # 移除最久未使用的條目
+
+# 緩存分區：進度條音效（頻率固定在查找表槽位，FIFO即可）和其他提示音（請求分散，使用LRU保留常用音調）
+PARTITION_PROGRESS = 'progress'
+PARTITION_GENERIC = 'generic'
+# NVDA的WAV提示音（已轉換為輸出流格式，條目較大，容量較小）
+PARTITION_EARCON = 'earcon'
+
+DEFAULT_PARTITIONS = {
+    PARTITION_PROGRESS: (300, EVICTION_FIFO),
+    PARTITION_GENERIC: (64, EVICTION_LRU),
+    PARTITION_EARCON: (32, EVICTION_LRU),
+}
+
+
+class ToneCachePartition:
+    """單個緩存分區：固定容量和淘汰策略，並統計命中率"""
+
+    def __init__(self, name, capacity, eviction=EVICTION_FIFO):
+        self.name = name
+        self.capacity = max(1, capacity)
+        self.eviction = eviction
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """查找緩存條目，未命中返回None"""
+        audio_data = self.entries.get(key)
+        if audio_data is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        if self.eviction == EVICTION_LRU:
+            self.entries.move_to_end(key)
+        return audio_data
+
+    def put(self, key, audio_data):
+        """加入緩存條目，超出容量時按淘汰策略移除，返回被移除的鍵"""
+        evicted_key = None
+        if key not in self.entries and len(self.entries) >= self.capacity:
+            # FIFO與LRU都移除最前面的條目（LRU命中時會移到最後）
+            evicted_key, _ = self.entries.popitem(last=False)
+        self.entries[key] = audio_data
+        return evicted_key
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+
+class PartitionedToneCache:
+    """分區音頻緩存"""
+
+    def __init__(self, partitions=None):
+        if partitions is None:
+            partitions = DEFAULT_PARTITIONS
+        self.partitions = {
+            name: ToneCachePartition(name, capacity, eviction)
+            for name, (capacity, eviction) in partitions.items()
+        }
+
+    def partition(self, name):
+        return self.partitions[name]
+
+    def share_partitions(self, source, names):
+        """與另一個緩存共用指定的分區（例如與音色無關的提示音檔案）"""
+        for name in names:
+            self.partitions[name] = source.partitions[name]
+
+    def get(self, name, key):
+        return self.partitions[name].get(key)
+
+    def put(self, name, key, audio_data):
+        return self.partitions[name].put(key, audio_data)
+
+    def clear(self):
+        """清理所有分區，返回清理的條目總數"""
+        cleared = len(self)
+        for partition in self.partitions.values():
+            partition.clear()
+        return cleared
+
+    def __len__(self):
+        return sum(len(partition) for partition in self.partitions.values())
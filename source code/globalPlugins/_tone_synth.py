@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+# 悅耳進度條 - 波形合成與樣本格式模塊
+# 以浮點樣本合成波形，再按輸出流的原生格式（16位/24位整數、32位浮點）編碼
+
+import array
+import math
+import random
+import sys
+
+try:
+    import audioop
+except ImportError:
+    # Python 3.13起已移除audioop，改用陣列切片交錯
+    audioop = None
+
+# 支援的樣本格式：格式名稱 -> 每個樣本的位元組數
+SAMPLE_FORMAT_WIDTHS = {
+    'int16': 2,
+    'int24': 3,
+    'float32': 4,
+}
+
+# 樣本格式的顯示名稱（用於日誌）
+SAMPLE_FORMAT_NAMES = {
+    'int16': "16位整數",
+    'int24': "24位整數",
+    'float32': "32位浮點",
+}
+
+# 預設音頻參數（設備信息不可用時使用）
+DEFAULT_SAMPLE_RATE = 48000
+DEFAULT_SAMPLE_FORMAT = 'int16'
+
+# 合理的設備採樣率範圍，超出範圍的設備回報值視為無效
+MIN_SAMPLE_RATE = 8000
+MAX_SAMPLE_RATE = 192000
+
+# 最大振幅比例：沿用原本16位的30000/32768，保留餘量避免報音
+MAX_AMPLITUDE = 30000 / 32768.0
+
+# 原生格式為32位浮點的Host API（共享模式混音格式）
+FLOAT32_NATIVE_HOST_APIS = ('wasapi',)
+
+
+def normalize_sample_rate(rate):
+    """將設備回報的採樣率整理為可用的整數採樣率"""
+    try:
+        rate = int(round(float(rate)))
+    except (TypeError, ValueError):
+        return DEFAULT_SAMPLE_RATE
+
+    if MIN_SAMPLE_RATE <= rate <= MAX_SAMPLE_RATE:
+        return rate
+    return DEFAULT_SAMPLE_RATE
+
+
+def choose_native_format(device_info):
+    """根據設備信息選擇原生樣本格式"""
+    if not device_info:
+        return DEFAULT_SAMPLE_FORMAT
+
+    # 若設備信息已帶有探測結果，直接使用
+    sample_format = device_info.get('sample_format')
+    if sample_format in SAMPLE_FORMAT_WIDTHS:
+        return sample_format
+
+    host_api_name = str(device_info.get('host_api_name', '')).lower()
+    if any(api in host_api_name for api in FLOAT32_NATIVE_HOST_APIS):
+        # WASAPI共享模式的混音格式是32位浮點，直接提供可省去系統轉換
+        return 'float32'
+
+    return DEFAULT_SAMPLE_FORMAT
+
+
+def build_fade_envelope(total_samples, fade_algorithm='cosine', fade_ratio=0.45):
+    """預先計算整段音頻的淡入淡出包絡"""
+    if fade_algorithm == 'gaussian':
+        # 高斯淡入淡出
+        sigma = total_samples * 0.25
+        center = total_samples / 2.0
+        return [math.exp(-0.5 * ((i - center) / sigma) ** 2) for i in range(total_samples)]
+
+    # 余弦淡入淡出
+    envelope = [1.0] * total_samples
+    fade_samples = int(total_samples * fade_ratio)
+    for i in range(min(fade_samples, total_samples)):
+        fade_factor = (1.0 - math.cos(math.pi * i / fade_samples)) / 2.0
+        envelope[i] = fade_factor
+        envelope[total_samples - i - 1] = fade_factor
+    return envelope
+
+
+def _sine_samples(frequency, samples, sample_rate):
+    """正弦波原始樣本"""
+    step = 2.0 * math.pi * frequency / sample_rate
+    return [math.sin(step * i) for i in range(samples)]
+
+
+def _square_samples(frequency, samples, sample_rate):
+    """方波原始樣本：基於正弦波的符號函數"""
+    step = 2.0 * math.pi * frequency / sample_rate
+    return [1.0 if math.sin(step * i) >= 0 else -1.0 for i in range(samples)]
+
+
+def _triangle_samples(frequency, samples, sample_rate):
+    """三角波原始樣本：線性上升下降"""
+    period_samples = max(1, int(sample_rate / frequency))
+    half_period = period_samples / 2.0
+    result = []
+    for i in range(samples):
+        position_in_period = i % period_samples
+        if position_in_period <= half_period:
+            # 上升階段：從-1到+1
+            result.append((position_in_period / half_period) * 2.0 - 1.0)
+        else:
+            # 下降階段：從+1到-1
+            result.append(1.0 - ((position_in_period - half_period) / half_period) * 2.0)
+    return result
+
+
+def _sawtooth_samples(frequency, samples, sample_rate):
+    """鋸齒波原始樣本：線性上升然後瞬間下降"""
+    period_samples = max(1, int(sample_rate / frequency))
+    return [((i % period_samples) / period_samples) * 2.0 - 1.0 for i in range(samples)]
+
+
+def _pulse_samples(frequency, samples, sample_rate, duty_cycle=0.25):
+    """脈衝波原始樣本（可調佔空比的方波）"""
+    period_samples = max(1, int(sample_rate / frequency))
+    return [1.0 if ((i % period_samples) / period_samples) < duty_cycle else -1.0
+            for i in range(samples)]
+
+
+def _white_noise_samples(frequency, samples, sample_rate):
+    """白噪音原始樣本（頻率參數用於調制強度）"""
+    # 使用頻率來調制噪音的強度變化
+    step = 2.0 * math.pi * (frequency / 1000.0) / sample_rate
+    uniform = random.uniform
+    return [uniform(-1.0, 1.0) * (1.0 + 0.3 * math.sin(step * i)) for i in range(samples)]
+
+
+WAVEFORM_GENERATORS = {
+    'sine': _sine_samples,
+    'square': _square_samples,
+    'triangle': _triangle_samples,
+    'sawtooth': _sawtooth_samples,
+    'pulse': _pulse_samples,
+    'white_noise': _white_noise_samples,
+}
+
+
+def generate_waveform(frequency, duration, sample_rate, volume, waveform_type='sine',
+                      fade_algorithm='cosine', fade_ratio=0.45):
+    """通用波形生成器，返回範圍在-1.0到1.0之間的浮點樣本"""
+    samples = int(sample_rate * duration)
+    # 未知波形類型默認使用正弦波
+    generator = WAVEFORM_GENERATORS.get(waveform_type, _sine_samples)
+    raw_samples = generator(frequency, samples, sample_rate)
+    envelope = build_fade_envelope(samples, fade_algorithm, fade_ratio)
+
+    amplitude = MAX_AMPLITUDE * volume
+    return array.array('d', [
+        max(-1.0, min(1.0, sample * fade * amplitude))
+        for sample, fade in zip(raw_samples, envelope)
+    ])
+
+
+def encode_samples(samples, sample_format=DEFAULT_SAMPLE_FORMAT):
+    """將浮點樣本編碼為指定樣本格式的位元組資料"""
+    if sample_format == 'float32':
+        return array.array('f', samples).tobytes()
+
+    if sample_format == 'int24':
+        # 先以32位整數編碼，再以切片批量取出每個樣本的3個有效位元組
+        packed = array.array('i', [max(-8388608, min(8388607, int(sample * 8388608.0)))
+                                   for sample in samples]).tobytes()
+        offset = 1 if sys.byteorder == 'big' else 0
+        result = bytearray(len(samples) * 3)
+        result[0::3] = packed[offset::4]
+        result[1::3] = packed[offset + 1::4]
+        result[2::3] = packed[offset + 2::4]
+        return bytes(result)
+
+    return array.array('h', [max(-32768, min(32767, int(sample * 32768.0)))
+                             for sample in samples]).tobytes()
+
+
+def render_tone(frequency, duration, sample_rate, volume, waveform_type='sine',
+                fade_algorithm='cosine', fade_ratio=0.45, sample_format=DEFAULT_SAMPLE_FORMAT):
+    """合成並編碼一個音調，返回可直接寫入輸出流的位元組資料"""
+    samples = generate_waveform(frequency, duration, sample_rate, volume, waveform_type,
+                                fade_algorithm, fade_ratio)
+    return encode_samples(samples, sample_format)
+
+
+def _decode_for_pan(audio_data, sample_format):
+    """將音頻位元組解碼為可批量縮放的陣列（24位整數擴展為左移8位的32位整數）"""
+    if sample_format == 'float32':
+        return array.array('f', audio_data)
+    if sample_format == 'int24':
+        offset = 1 if sys.byteorder == 'big' else 0
+        sample_count = len(audio_data) // 3
+        padded = bytearray(sample_count * 4)
+        padded[offset + 1::4] = audio_data[0::3]
+        padded[offset + 2::4] = audio_data[1::3]
+        padded[offset + 3::4] = audio_data[2::3]
+        return array.array('i', bytes(padded))
+    return array.array('h', audio_data)
+
+
+def _encode_after_pan(samples, sample_format):
+    """將交錯後的陣列編碼回音頻位元組"""
+    if sample_format != 'int24':
+        return samples.tobytes()
+    packed = samples.tobytes()
+    offset = 1 if sys.byteorder == 'big' else 0
+    result = bytearray(len(samples) * 3)
+    result[0::3] = packed[offset + 1::4]
+    result[1::3] = packed[offset + 2::4]
+    result[2::3] = packed[offset + 3::4]
+    return bytes(result)
+
+
+def _scale_channel(samples, gain):
+    """按增益縮放單個聲道（增益為1或0時直接複製或填零）"""
+    if gain == 1.0:
+        return samples
+    if gain == 0.0:
+        return array.array(samples.typecode, bytes(len(samples) * samples.itemsize))
+    if samples.typecode == 'f':
+        return array.array('f', map(gain.__mul__, samples))
+    return array.array(samples.typecode, map(int, map(gain.__mul__, samples)))
+
+
+def pan_to_stereo(audio_data, sample_format, left_gain=1.0, right_gain=1.0):
+    """將單聲道音頻按左右聲道增益交錯為立體聲，使用批量運算而非逐樣本迴圈"""
+    left_gain = max(0.0, min(1.0, float(left_gain)))
+    right_gain = max(0.0, min(1.0, float(right_gain)))
+
+    if audioop is not None and sample_format != 'float32':
+        return audioop.tostereo(audio_data, SAMPLE_FORMAT_WIDTHS[sample_format], left_gain, right_gain)
+
+    mono = _decode_for_pan(audio_data, sample_format)
+    stereo = array.array(mono.typecode, bytes(len(mono) * 2 * mono.itemsize))
+    stereo[0::2] = _scale_channel(mono, left_gain)
+    stereo[1::2] = _scale_channel(mono, right_gain)
+    return _encode_after_pan(stereo, sample_format)
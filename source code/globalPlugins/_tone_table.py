@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+# 悅耳進度條 - 頻率查找表模塊
+# 每次配置或輸出格式變更時，預先把每個原始進度條整數頻率映射到用戶頻率範圍的音調槽位
+
+# 原始進度條的頻率範圍（NVDA只發出此範圍內的整數頻率）
+ORIGINAL_MIN_FREQ = 110
+ORIGINAL_MAX_FREQ = 1800
+
+# 進度條音效的時長範圍（毫秒）和聲道音量
+PROGRESS_MIN_LENGTH = 38
+PROGRESS_MAX_LENGTH = 42
+PROGRESS_CHANNEL_VOLUME = 50
+
+# NVDA預設的進度條音效頻率：110Hz * 2^(百分比/25)，0%到100%共101個（按查表方式四捨五入為整數）
+PROGRESS_BEEP_BASE_HZ = 110
+PROGRESS_BEEP_FREQUENCIES = sorted({
+    int(PROGRESS_BEEP_BASE_HZ * 2 ** (percent / 25.0) + 0.5) for percent in range(101)
+})
+
+# 查找表條目的欄位位置：(表生成代數, 原始頻率, 映射頻率, 緩存鍵)
+SLOT_GENERATION = 0
+SLOT_ORIGINAL_HZ = 1
+SLOT_MAPPED_FREQ = 2
+SLOT_CACHE_KEY = 3
+
+
+def map_progress_frequency(original_hz, mapped_min_freq, mapped_max_freq):
+    """將原始進度條頻率按進度比例映射到用戶設定的頻率範圍"""
+    original_progress = (original_hz - ORIGINAL_MIN_FREQ) / float(ORIGINAL_MAX_FREQ - ORIGINAL_MIN_FREQ)
+    original_progress = max(0.0, min(1.0, original_progress))
+    return mapped_min_freq + original_progress * (mapped_max_freq - mapped_min_freq)
+
+
+def build_tone_table(mapped_min_freq, mapped_max_freq, cache_key_builder, generation):
+    """建立以原始整數頻率為索引的查找表，範圍外的索引為None"""
+    table = [None] * (ORIGINAL_MAX_FREQ + 1)
+    for original_hz in range(ORIGINAL_MIN_FREQ, ORIGINAL_MAX_FREQ + 1):
+        mapped_freq = round(map_progress_frequency(original_hz, mapped_min_freq, mapped_max_freq), 1)
+        table[original_hz] = (generation, original_hz, mapped_freq, cache_key_builder(mapped_freq))
+    return table
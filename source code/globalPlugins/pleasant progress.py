@@ -7,61 +7,91 @@ import globalPluginHandler
 import threading
 import time
 import tones
+
+# 插件模塊開始載入的時間（用於記錄啟動耗時）
+_module_load_started = time.perf_counter()
 import array
+import collections
+import itertools
 import math
 from scriptHandler import script
 import ui
-import sys
-import os
 import gui
 from gui.settingsDialogs import NVDASettingsDialog
-import gettext
-import languageHandler
-
-# =============================================================================
-# 國際化初始化
-# =============================================================================
-def initTranslation():
-    """初始化插件的國際化翻譯"""
-    try:
-        # 獲取插件目錄和locale資料夾路徑
-        addon_dir = os.path.dirname(__file__)  # 獲取當前文件所在目錄（globalPlugins）
-        parent_dir = os.path.dirname(addon_dir)  # 獲取父目錄
-        locale_dir = os.path.join(parent_dir, "locale")  # 父目錄下的locale資料夾
-
-
-        # 獲取當前NVDA使用的語言
-        lang = languageHandler.getLanguage()
-
-        # 構建語言回退列表
-        languages = [lang]  # 首先嘗試完整語言代碼
-
-        # 如果語言代碼包含下劃線，也嘗試主要語言代碼
-        if '_' in lang:
-            main_lang = lang.split('_')[0]
-            languages.append(main_lang)
-
-        # 如果不是中文，添加英文作為回退
-        if not lang.startswith('zh'):
-            languages.append('en')
-
-        # 創建翻譯對象
-        translation = gettext.translation(
-            "nvda",                    # domain name
-            localedir=locale_dir,      # locale資料夾路徑
-            languages=languages,       # 語言回退列表
-            fallback=True              # 找不到翻譯時使用原文
-        )
-
-        # 返回gettext函數
-        return translation.gettext
 
-    except Exception:
-        # 如果初始化失敗，返回簡單的fallback函數
-        return lambda x: x
-
-# 初始化並獲取翻譯函數
-addonGettext = initTranslation()
+# 共用的翻譯函數
+from ._i18n import addonGettext
+
+# 導入波形合成與樣本格式模塊
+from ._tone_synth import (
+    SAMPLE_FORMAT_WIDTHS,
+    SAMPLE_FORMAT_NAMES,
+    DEFAULT_SAMPLE_RATE,
+    DEFAULT_SAMPLE_FORMAT,
+    normalize_sample_rate,
+    choose_native_format,
+    generate_waveform,
+    encode_samples,
+    pan_to_stereo,
+)
+
+# 導入延遲校準模塊
+from ._latency_calibration import LatencyCalibrator, select_buffer_size, DEFAULT_FRAMES_PER_BUFFER
+
+# 導入輸出流池模塊
+from ._stream_pool import OutputStreamPool
+
+# 導入頻率查找表模塊
+from ._tone_table import (
+    ORIGINAL_MIN_FREQ,
+    ORIGINAL_MAX_FREQ,
+    PROGRESS_MIN_LENGTH,
+    PROGRESS_MAX_LENGTH,
+    PROGRESS_CHANNEL_VOLUME,
+    SLOT_GENERATION,
+    SLOT_ORIGINAL_HZ,
+    SLOT_MAPPED_FREQ,
+    SLOT_CACHE_KEY,
+    PROGRESS_BEEP_FREQUENCIES,
+    build_tone_table,
+)
+
+# 導入分區音頻緩存模塊
+from ._tone_cache import PartitionedToneCache, PARTITION_PROGRESS, PARTITION_GENERIC, PARTITION_EARCON
+
+# 導入提示音檔案模塊
+from ._earcons import load_earcon, get_earcon_cache_key
+
+# 導入音色庫模塊
+from ._tone_banks import ToneBank, TONE_BANK_ATTRIBUTES, IGNORED_APP_NAMES, resolve_profile_name
+
+# 導入設定預覽模塊
+from ._preview import SweepPreviewer, get_preview_key, preview_sweep_frequencies
+
+# 導入延遲追蹤模塊
+from ._latency_tracer import LatencyTracer, STAGE_TOTAL
+
+# 導入效能分析模塊
+from ._profiler import DaemonProfiler, DEFAULT_PROFILE_SECONDS, DEFAULT_PROFILE_BEEPS
+
+# 導入提示音錄製模塊
+from ._beep_recorder import BeepRecorder, get_trace_path, write_trace
+
+# 導入日誌模塊
+from ._debug_log import (
+    log,
+    LOG_LEVELS,
+    DEFAULT_LOG_LEVEL,
+    BeepTrace,
+    TRACE_PROGRESS,
+    TRACE_GENERIC,
+    TRACE_PASSTHROUGH,
+)
+
+# 接管其他提示音時可處理的範圍：過長的提示音會長時間佔用守護線程，交回原始tones.beep播放
+GENERIC_MIN_FREQ = 20
+GENERIC_MAX_FREQ = 20000
+GENERIC_MAX_LENGTH_MS = 1000
 
 # 導入配置管理和設定UI模塊
 try:
@@ -72,358 +102,94 @@ except ImportError as e:
     CONFIG_AVAILABLE = False
     print(f"悅耳進度條：配置模塊載入失敗: {e}")
 
+# 導入設備能力探測模塊
+try:
+    from ._device_probe import DeviceCapabilityProbe
+    PROBE_AVAILABLE = True
+except ImportError as e:
+    PROBE_AVAILABLE = False
+    print(f"悅耳進度條：設備探測模塊載入失敗: {e}")
+
+# 導入NVDA輸出設備監聽模塊
+try:
+    from ._device_monitor import NVDADeviceMonitor
+    MONITOR_AVAILABLE = True
+except ImportError as e:
+    MONITOR_AVAILABLE = False
+    print(f"悅耳進度條：設備監聽模塊載入失敗: {e}")
+
+# 導入nvwave輸出後端模塊（使用NVDA自身的音頻輸出）
+try:
+    import nvwave
+    from ._output_backends import NVWaveAudio, NVWAVE_SAMPLE_FORMATS
+    NVWAVE_AVAILABLE = True
+except ImportError as e:
+    NVWAVE_AVAILABLE = False
+    print(f"悅耳進度條：nvwave輸出後端載入失敗: {e}")
+
 
 # 32位音頻緩衝區對齊優化函數
 
 
-def align_audio_buffer_32bit(audio_array):
+def align_audio_buffer_32bit(audio_data, frame_width=2):
     """確保音頻緩衝區在32位系統中正確對齊"""
     try:
-        # 32位系統：確保緩衝區大小是4字節的倍數
-        buffer_size = len(audio_array)
+        # 32位系統：確保緩衝區大小是4字節的倍數，以整幀靜音填充
         alignment_bytes = 4
         
-        if buffer_size % alignment_bytes != 0:
-            # 填充到對齊邊界
-            padding_needed = alignment_bytes - (buffer_size % alignment_bytes)
-            for _ in range(padding_needed // 2):  # 每個樣本2字節
-                audio_array.append(0)
+        padded_size = len(audio_data)
+        while padded_size % alignment_bytes != 0:
+            padded_size += frame_width
         
-        return audio_array
+        if padded_size != len(audio_data):
+            audio_data = audio_data + bytes(padded_size - len(audio_data))
+        
+        return audio_data
     except Exception as e:
         print(f"悅耳進度條：32位音頻緩衝區對齊錯誤: {e}")
-        return audio_array
+        return audio_data
 
 # =============================================================================
-# 內嵌PyAudio代碼
+# 內嵌PyAudio（延遲載入）
 # =============================================================================
 
-plugin_dir = os.path.dirname(__file__)
-
-try:
-    if plugin_dir not in sys.path:
-        sys.path.insert(0, plugin_dir)
-    
-    import _portaudio as pa
-    PYAUDIO_AVAILABLE = True
-except ImportError as e:
-    print(f"悅耳進度條：✗ 無法導入_portaudio模塊: {e}")
-    pa = None
-    PYAUDIO_AVAILABLE = False
-
-if PYAUDIO_AVAILABLE:
-    # PyAudio常量定義
-    paFloat32 = pa.paFloat32
-    paInt32 = pa.paInt32
-    paInt24 = pa.paInt24
-    paInt16 = pa.paInt16
-    paInt8 = pa.paInt8
-    paUInt8 = pa.paUInt8
-    paCustomFormat = pa.paCustomFormat
-    
-    paNoError = pa.paNoError
-    paNotInitialized = pa.paNotInitialized
-    paInvalidDevice = pa.paInvalidDevice
-    paCanNotWriteToAnInputOnlyStream = pa.paCanNotWriteToAnInputOnlyStream
-    paCanNotReadFromAnOutputOnlyStream = pa.paCanNotReadFromAnOutputOnlyStream
-    
-    paContinue = pa.paContinue
-    paComplete = pa.paComplete
-    paAbort = pa.paAbort
-    
-    paFramesPerBufferUnspecified = pa.paFramesPerBufferUnspecified
-
-    def get_sample_size(format):
-        return pa.get_sample_size(format)
-
-    def get_format_from_width(width, unsigned=True):
-        if width == 1:
-            return paUInt8 if unsigned else paInt8
-        if width == 2:
-            return paInt16
-        if width == 3:
-            return paInt24
-        if width == 4:
-            return paFloat32
-        raise ValueError(f"Invalid width: {width}")
-
-    # 添加設備信息相關函數
-    def get_default_output_device_info():
-        """獲取默認輸出設備信息"""
-        try:
-            return pa.get_default_output_device_info()
-        except AttributeError:
-            # 如果_portaudio模塊沒有此函數，返回模擬的設備信息
-            return {
-                'index': 0,
-                'name': 'Default Output Device',
-                'defaultSampleRate': 44100.0,
-                'maxOutputChannels': 2
-            }
-
-    def old_get_device_info_by_index(device_index):
-        """根據索引獲取設備信息"""
-        try:
-            return pa.get_device_info_by_index(device_index)
-        except AttributeError:
-            # 如果_portaudio模塊沒有此函數，返回模擬的設備信息
-            return {
-                'index': device_index,
-                'name': f'Audio Device {device_index}',
-                'defaultSampleRate': 44100.0,
-                'maxOutputChannels': 2
-            }
-
-    def get_device_info_by_index(self, device_index):
-        """根據索引獲取設備信息 - 修正版本"""
+# _portaudio的載入、PortAudio初始化和Host API掃描都在背景初始化時才進行，不佔用NVDA的啟動時間
+pa = None
+PyAudio = None
+PA_SAMPLE_FORMATS = {}
+paInt16 = paInt24 = paFloat32 = None
+PYAUDIO_AVAILABLE = False
+_portaudio_load_attempted = False
+_portaudio_load_lock = threading.Lock()
+
+
+def load_portaudio():
+    """載入內嵌PyAudio模塊（只嘗試一次），返回是否可用"""
+    global pa, PyAudio, PA_SAMPLE_FORMATS, paInt16, paInt24, paFloat32, PYAUDIO_AVAILABLE, _portaudio_load_attempted
+    with _portaudio_load_lock:
+        if _portaudio_load_attempted:
+            return PYAUDIO_AVAILABLE
+        _portaudio_load_attempted = True
         try:
-            # 使用正確的函數名稱
-            device_info = pa.get_device_info(device_index)
-            
-            # 提取設備信息
-            name = device_info.name
-            # 處理 bytes 格式的名稱
-            if isinstance(name, bytes):
-                name = name.decode('utf-8', errors='ignore')
-            
-            return {
-                'index': device_index,
-                'name': name,
-                'defaultSampleRate': float(device_info.defaultSampleRate),
-                'maxOutputChannels': int(device_info.maxOutputChannels)
-            }
-            
-        except Exception as e:
-            # 降級到通用名稱
-            return {
-                'index': device_index,
-                'name': f'Audio Device {device_index}',
-                'defaultSampleRate': 44100.0,
-                'maxOutputChannels': 2
-            }
-
-    def get_device_count():
-        """獲取設備數量"""
-        try:
-            return pa.get_device_count()
-        except AttributeError:
-            return 1  # 至少返回一個設備
-        
-    class PyAudio:
-        class Stream:
-            def __init__(self, PA_manager, rate, channels, format, input=False, output=False,
-                         input_device_index=None, output_device_index=None,
-                         frames_per_buffer=paFramesPerBufferUnspecified, start=True,
-                         input_host_api_specific_stream_info=None,
-                         output_host_api_specific_stream_info=None, stream_callback=None):
-                
-                if not (input or output):
-                    raise ValueError("Must specify an input or output stream.")
-                
-                self._parent = PA_manager
-                self._is_input = input
-                self._is_output = output
-                self._is_running = start
-                self._rate = rate
-                self._channels = channels
-                self._format = format
-                self._frames_per_buffer = frames_per_buffer
-                
-                arguments = {
-                    'rate': rate, 'channels': channels, 'format': format,
-                    'input': input, 'output': output,
-                    'input_device_index': input_device_index,
-                    'output_device_index': output_device_index,
-                    'frames_per_buffer': frames_per_buffer
-                }
-                
-                if input_host_api_specific_stream_info:
-                    arguments['input_host_api_specific_stream_info'] = input_host_api_specific_stream_info
-                if output_host_api_specific_stream_info:
-                    arguments['output_host_api_specific_stream_info'] = output_host_api_specific_stream_info
-                if stream_callback:
-                    arguments['stream_callback'] = stream_callback
-                
-                self._stream = pa.open(**arguments)
-                self._input_latency = self._stream.inputLatency
-                self._output_latency = self._stream.outputLatency
-                
-                if self._is_running:
-                    pa.start_stream(self._stream)
-            
-            def close(self):
-                pa.close(self._stream)
-                self._is_running = False
-                self._parent._remove_stream(self)
-            
-            def write(self, frames, num_frames=None, exception_on_underflow=False):
-                if not self._is_output:
-                    raise IOError("Not output stream", paCanNotWriteToAnInputOnlyStream)
-                
-                if num_frames is None:
-                    width = get_sample_size(self._format)
-                    num_frames = int(len(frames) / (self._channels * width))
-                
-                pa.write_stream(self._stream, frames, num_frames, exception_on_underflow)
-            
-            def stop_stream(self):
-                if not self._is_running:
-                    return
-                pa.stop_stream(self._stream)
-                self._is_running = False
-            
-            def is_active(self):
-                return pa.is_stream_active(self._stream)
-        
-        def __init__(self):
-            pa.initialize()
-            self._streams = set()
-            
-            # 添加Host API掃描功能 - 參考ooo.py
-            self.host_apis = self._scan_host_apis()
-            self.preferred_host_api = self._select_preferred_host_api()
-            
-            if self.debug_mode if hasattr(self, 'debug_mode') else False:
-                if self.preferred_host_api:
-                    pass
-                else:
-                    pass
-        
-        def _scan_host_apis(self):
-            """掃描所有可用的Host API - 參考ooo.py"""
-            host_apis = {}
-            try:
-                host_api_count = pa.get_host_api_count()
-                
-                for i in range(host_api_count):
-                    host_api_info = pa.get_host_api_info(i)
-                    
-                    # 直接訪問屬性
-                    api_name = host_api_info.name if hasattr(host_api_info, 'name') else f'Host API {i}'
-                    device_count = host_api_info.deviceCount if hasattr(host_api_info, 'deviceCount') else 0
-                    
-                    host_apis[i] = {
-                        'index': i,
-                        'name': api_name,
-                        'info': host_api_info,
-                        'device_count': device_count
-                    }
-                
-                return host_apis
-            except Exception as e:
-                print(f"悅耳進度條：Host API掃描失敗: {e}")
-                return {}
-
-        def _select_preferred_host_api(self):
-            """選擇首選Host API - 優先WASAPI用於設備名稱獲取"""
-            api_priority = [
-                'Windows WASAPI',
-                'WASAPI', 
-                'Windows DirectSound',
-                'DirectSound',
-                'WDM-KS',
-                'MME'
-            ]
-            
-            for preferred_name in api_priority:
-                for api_index, api_data in self.host_apis.items():
-                    api_name = api_data['name']
-                    if preferred_name.lower() in api_name.lower():
-                        return api_data
-            
-            # 降級到第一個有設備的API
-            for api_index, api_data in self.host_apis.items():
-                if api_data['device_count'] > 0:
-                    return api_data
-            
-            return None
-
-        def get_devices_by_host_api(self, host_api_index):
-            """獲取指定Host API的所有設備 - 參考ooo.py"""
-            devices = []
-            try:
-                total_device_count = pa.get_device_count()
-                
-                for global_index in range(total_device_count):
-                    device_info = pa.get_device_info(global_index)
-                    
-                    # 直接訪問屬性
-                    device_host_api = device_info.hostApi if hasattr(device_info, 'hostApi') else -1
-                    
-                    if device_host_api == host_api_index:
-                        devices.append({
-                            'global_index': global_index,
-                            'name': device_info.name if hasattr(device_info, 'name') else f'Device {global_index}',
-                            'maxOutputChannels': device_info.maxOutputChannels if hasattr(device_info, 'maxOutputChannels') else 0,
-                            'hostApi': device_host_api
-                        })
-                
-                return devices
-                
-            except Exception as e:
-                print(f"悅耳進度條：獲取Host API {host_api_index} 設備失敗: {e}")
-                return []
-        
-        def terminate(self):
-            for stream in self._streams.copy():
-                stream.close()
-            self._streams = set()
-            pa.terminate()
-        
-        def open(self, *args, **kwargs):
-            stream = PyAudio.Stream(self, *args, **kwargs)
-            self._streams.add(stream)
-            return stream
-        
-        def get_default_output_device_info(self):
-            """獲取默認輸出設備信息"""
-            # 調用全局函數，而不是自己
-            return get_default_output_device_info()
-
-        def get_device_info_by_index(self, device_index):
-            """獲取設備信息 - 改進版本參考ooo.py"""
-            try:
-                device_info = pa.get_device_info(device_index)
-                
-                # 直接訪問屬性並處理設備名稱
-                name = device_info.name if hasattr(device_info, 'name') else f'Device {device_index}'
-                if isinstance(name, bytes):
-                    name = name.decode('utf-8', errors='ignore')
-                
-                # 建立設備信息字典
-                result = {
-                    'index': device_index,
-                    'name': name.strip() if name else f'Device {device_index}',
-                    'defaultSampleRate': float(device_info.defaultSampleRate) if hasattr(device_info, 'defaultSampleRate') else 44100.0,
-                    'maxOutputChannels': int(device_info.maxOutputChannels) if hasattr(device_info, 'maxOutputChannels') else 0,
-                    'hostApi': device_info.hostApi if hasattr(device_info, 'hostApi') else -1
-                }
-                
-                # 添加Host API名稱
-                host_api_index = result['hostApi']
-                if hasattr(self, 'host_apis') and host_api_index in self.host_apis:
-                    result['host_api_name'] = self.host_apis[host_api_index]['name']
-                else:
-                    result['host_api_name'] = f'Host API {host_api_index}'
-                
-                return result
-                
-            except Exception as e:
-                print(f"悅耳進度條：獲取設備信息失敗: {e}")
-                return {
-                    'index': device_index,
-                    'name': f'Device {device_index}',
-                    'defaultSampleRate': 44100.0,
-                    'maxOutputChannels': 0,
-                    'hostApi': -1,
-                    'host_api_name': 'Unknown',
-                    'error': str(e)
-                }
-        
-        def _remove_stream(self, stream):
-            """移除流"""
-            if stream in self._streams:
-                self._streams.remove(stream)
+            from . import _pyaudio
+        except ImportError as e:
+            print(f"悅耳進度條：✗ 無法導入_portaudio模塊: {e}")
+            return False
+        
+        pa = _pyaudio.pa
+        PyAudio = _pyaudio.PyAudio
+        PA_SAMPLE_FORMATS = _pyaudio.PA_SAMPLE_FORMATS
+        paInt16 = _pyaudio.paInt16
+        paInt24 = _pyaudio.paInt24
+        paFloat32 = _pyaudio.paFloat32
+        PYAUDIO_AVAILABLE = True
+        return True
+
+# 停用插件時等待背景初始化結束的最長時間（秒）
+INITIALIZATION_TIMEOUT = 5.0
+
+# 插件模塊（不含延遲載入的PortAudio）的載入耗時
+MODULE_LOAD_SECONDS = time.perf_counter() - _module_load_started
 
 # =============================================================================
 # 核心插件類 - 悅耳進度條
@@ -433,64 +199,193 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
     
     def __init__(self):
         super().__init__()
+        # 啟動耗時記錄：[(階段名稱, 秒數)]，NVDA啟動路徑上的階段和背景初始化的階段分開記錄
+        self.startup_stages = []
+        self.startup_stage_started = time.perf_counter()
+        self.startup_started = self.startup_stage_started
+        
         # 載入用戶配置
         self.load_user_config()
         
         # 插件啟用狀態
         self.enabled = True
-        # 原始進度條音效函數的備份
+        # 原始進度條音效函數和提示音檔案播放函數的備份
         self.original_beep = None
-        self.debug_mode = True
-        self.beep_log = []
-        
-        # 從配置載入音效參數（移除硬編碼值）
+        self.original_play_wave_file = None
+        # 最近攔截的提示音記錄（環形緩衝），可按快捷鍵寫入日誌
+        self.beep_trace = BeepTrace()
+        # 提示音各階段的耗時樣本（排隊、緩存/合成、寫入輸出流），可按快捷鍵報告百分位數
+        self.latency_tracer = LatencyTracer()
+        # 按需分析守護線程和攔截函數的效能，結果寫入NVDA配置目錄
+        self.profiler = DaemonProfiler()
+        # 按需將攔截的提示音錄製為二進制記錄檔，用於重播真實的進度條音效突發
+        self.beep_recorder = BeepRecorder()
+        
+        # 從配置載入音效參數（移除硬編碼值），記錄已套用的配置版本
+        self.applied_config_version = None
         self.apply_config_parameters()
 
-        # 檢測設備最佳音頻參數
-        self.detect_optimal_audio_params()
+        # 輸出設備索引（None表示默認設備）
+        self.output_device_index = None
+        
+        # 輸出後端在背景初始化時選擇（內嵌PortAudio或NVDA的nvwave），就緒前提示音交回原始函數播放
+        self.active_backend = None
+        self.audio_factory = None
+        self.format_constants = {}
+        self.audio_available = False
+        
+        # 設備能力探測器（每個設備只在背景測試一次，結果持久化）和延遲校準器
+        self.device_probe = None
+        self.latency_calibrator = None
+        
+        # 緩衝大小：預設固定值，低延遲/省電模式在音頻流初始化時按設備校準結果選擇
+        self.frames_per_buffer = DEFAULT_FRAMES_PER_BUFFER
+        
+        # 頻率查找表：原始整數頻率 -> 音調槽位，每次重新檢測音頻參數時重建
+        self.tone_table = [None] * (ORIGINAL_MAX_FREQ + 1)
+        self.tone_table_generation = 0
+        # 查找表代數分配器：各音色庫的查找表代數互不相同
+        self.tone_table_generations = itertools.count(1)
+        
+        # 預設音頻參數，背景初始化音頻流時按設備重新檢測
+        self.sample_rate = DEFAULT_SAMPLE_RATE
+        self.sample_format = DEFAULT_SAMPLE_FORMAT
+        self.output_channels = 2 if self.stereo_output else 1
+        self.optimal_format = None
         
         # 32位優化配置
-        self.frames_per_buffer = 128  #緩衝大小
         self.exception_on_overflow = False  # 防止32位系統溢出崩潰
         # 動態計算線程間隔：波形長度 + 40ms
         self.thread_sleep_interval = self.audio_duration + 0.04
         
-        # 音頻緩存系統
-        self.audio_cache = {}  # 頻率 -> 音頻數據的緩存字典
-        self.cache_hits = 0    # 緩存命中次數統計
-        self.cache_misses = 0  # 緩存未命中次數統計
-        self.max_cache_size = 300  # 最大緩存條目數量
+        # 音頻緩存系統：進度條音效和其他提示音使用各自的分區和淘汰策略
+        self.audio_cache = PartitionedToneCache()
         
         # 守護線程屬性檢查機制
         self.audio_thread = None
         self.thread_running = False
         
         # 播放請求屬性（線程間通信）
-        self.play_frequency = None    # 要播放的頻率
-        self.play_id = None          # 唯一播放標誌（時間戳）
+        self.play_tone = None         # 要播放的音調槽位（查找表條目）
+        self.play_id = None          # 唯一播放標誌（tones.beep被調用時的perf_counter時間戳）
+        self.play_beep = None         # 其他提示音請求：(請求序號, 頻率, 時長, 左聲道, 右聲道, 請求時間戳)
+        self.beep_request_count = 0   # 其他提示音請求序號
+        self.play_earcon = None       # 提示音檔案請求：(請求序號, 檔案路徑)
+        self.earcon_request_count = 0 # 提示音檔案請求序號
+        self.play_preview = None      # 設定預覽請求：(請求序號, 預覽緩存鍵, 各音調的音頻數據)
+        self.preview_request_count = 0 # 設定預覽請求序號
+        self.wake_event = threading.Event()  # 其他提示音請求提前喚醒守護線程
         
         # 線程內部狀態（只在守護線程中使用）
         self.last_played_id = None   # 最後播放的ID
-        self.skipped_requests = 0    # 跳過的請求數量統計
+        self.last_beep_request = 0   # 最後處理的其他提示音請求序號
+        self.last_earcon_request = 0 # 最後處理的提示音檔案請求序號
+        self.last_preview_request = 0 # 最後處理的設定預覽請求序號
+        self.uncacheable_earcons = set()  # 無法轉換的提示音檔案，直接交給nvwave播放
+        self.earcon_playback = None  # 正在播放的提示音檔案：(輸出格式, 音頻數據, 已寫入的位元組數)
+        
+        # 提示音檔案在背景線程讀取和轉換，完成的結果經由佇列交給守護線程放入緩存
+        self.loaded_earcons = collections.deque()
+        self.loading_earcons = set()
+        self.earcon_loader_lock = threading.Lock()
+        self.next_progress_time = 0.0  # 下一個進度條音效最早的播放時間
+        self.skipped_requests = 0    # 跳過的請求數量統計（播放前已被較新請求取代的請求）
+        self.last_write_started = 0.0  # 最近一次寫入輸出流的開始和結束時間（perf_counter）
+        self.last_write_ended = 0.0
         
         # PyAudio相關
         self.pyaudio_instance = None
         self.audio_stream = None
         self.stream_initialized = False
         
-        # 攔截tones.beep函數
+        # 輸出流池（按設備保留已開啟的流）和保護當前輸出流切換的鎖
+        self.stream_pool = None
+        self.stream_lock = threading.RLock()
+        # 同一時間只進行一次配置重新載入
+        self.reload_lock = threading.Lock()
+        
+        # 設定面板預覽的掃頻緩存和背景預先渲染
+        self.previewer = SweepPreviewer(self.render_preview_sweep)
+        
+        # 應用程式配置檔的音色庫：配置檔名稱（全局配置為None） -> ToneBank，在背景預先渲染
+        self.tone_banks = {}
+        self.active_tone_bank = None
+        self.focused_app = None
+        self.tone_bank_lock = threading.Lock()
+        self.tone_bank_request = 0
+        
+        # 攔截tones.beep函數，按配置攔截提示音檔案播放（音頻系統就緒前直接交回原始函數）
         self.hook_beep_function()
+        self.update_wave_file_hook()
         
-        # 初始化PyAudio和守護線程
-        if PYAUDIO_AVAILABLE:
-            self.init_audio_stream_32bit()
-            self.start_audio_daemon()
+        # NVDA輸出設備監聽：設備變更時在背景開啟新設備的輸出流，再在兩個音調之間換用
+        self.device_monitor = None
+        self.migration_lock = threading.Lock()
+        # 輸出流代數：每次初始化、切換設備或重新載入配置時遞增，背景校準完成時據此判斷輸出流是否已變更
+        self.output_generations = itertools.count(1)
+        self.output_generation = 0
         
         # 註冊設定面板到NVDA設定對話框
         self.register_settings_panel()
+        self.record_startup_stage("插件初始化")
         
-        if not PYAUDIO_AVAILABLE:
-            print("悅耳進度條：警告：內嵌PyAudio不可用，將使用原始音效")
+        # 音頻系統（PortAudio載入、設備檢測、輸出流和守護線程）在背景初始化，不阻塞NVDA啟動
+        self.initialized_event = threading.Event()
+        self.initialization_thread = threading.Thread(target=self.initialize_audio_system, daemon=True)
+        self.initialization_thread.start()
+
+    def initialize_audio_system(self):
+        """背景初始化音頻系統，完成後記錄啟動耗時"""
+        self.startup_stage_started = time.perf_counter()
+        try:
+            # 按配置選擇輸出後端（內嵌PortAudio或NVDA的nvwave），需要時才載入_portaudio
+            if self.output_backend == 'portaudio' or not NVWAVE_AVAILABLE:
+                load_portaudio()
+                self.record_startup_stage("載入PortAudio")
+            self.select_output_backend()
+            
+            if PYAUDIO_AVAILABLE and PROBE_AVAILABLE:
+                self.device_probe = DeviceCapabilityProbe(PyAudio, PA_SAMPLE_FORMATS)
+                self.latency_calibrator = LatencyCalibrator(PyAudio)
+            self.detect_optimal_audio_params()
+            self.record_startup_stage("選擇輸出後端")
+            
+            # 初始化PyAudio和守護線程
+            if self.audio_available:
+                self.init_audio_stream_32bit()
+                self.record_startup_stage("開啟輸出流")
+                self.start_audio_daemon()
+            
+            if self.audio_available and MONITOR_AVAILABLE:
+                self.start_device_monitor()
+                self.record_startup_stage("啟動設備監聽")
+            
+            # 預先渲染全局配置和各應用程式配置檔的音色庫
+            self.refresh_tone_banks()
+            
+            if not self.audio_available:
+                print("悅耳進度條：警告：內嵌PyAudio和nvwave都不可用，將使用原始音效")
+        except Exception as e:
+            print(f"悅耳進度條：背景初始化音頻系統時發生錯誤: {e}")
+        finally:
+            self.initialized_event.set()
+            self.log_startup_timing()
+
+    def record_startup_stage(self, stage):
+        """記錄一個啟動階段的耗時"""
+        now = time.perf_counter()
+        self.startup_stages.append((stage, now - self.startup_stage_started))
+        self.startup_stage_started = now
+
+    def log_startup_timing(self):
+        """輸出啟動耗時明細"""
+        total = time.perf_counter() - self.startup_started
+        details = "，".join(f"{stage} {seconds * 1000:.1f}ms" for stage, seconds in self.startup_stages)
+        print(f"悅耳進度條：啟動耗時 {total * 1000:.1f}ms（模塊載入 {MODULE_LOAD_SECONDS * 1000:.1f}ms，{details}）")
+
+    def wait_until_initialized(self, timeout=None):
+        """等待背景初始化完成，返回是否已完成"""
+        return self.initialized_event.wait(timeout)
 
     def load_user_config(self):
         """載入用戶配置"""
@@ -512,34 +407,16 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
         self.thread_sleep_interval = self.audio_duration + 0.04
 
     def apply_config_parameters(self):
-        """應用配置參數到插件"""
+        """應用配置參數到插件（配置版本未變更時無需重新讀取）"""
         if CONFIG_AVAILABLE:
+            if sine_progress_config.version == self.applied_config_version:
+                return
             try:
-                            # 獲取波形類型
-                self.waveform_type = sine_progress_config.get_waveform_type()
-
-                # 獲取淡入淡出算法
-                self.fade_algorithm = sine_progress_config.get_fade_algorithm()
-                
-                # 獲取音量設定
-                self.volume = sine_progress_config.get_volume()
-                
-                # 獲取頻率範圍設定
-                self.min_frequency, self.max_frequency = sine_progress_config.get_frequency_range()
-                self.mapped_min_freq = self.min_frequency
-                self.mapped_max_freq = self.max_frequency
-
-                #波形長度
-                self.audio_duration = sine_progress_config.get_audio_duration()
-                
-                # 根據算法設定淡入淡出比例
-                if self.fade_algorithm == 'gaussian':
-                    self.fade_ratio = 0.3  # 高斯算法使用較小的淡入淡出比例
-                else:
-                    self.fade_ratio = 0.45  # 余弦算法使用原來的比例
-                
-                # 重新計算線程間隔
-                self.calculate_thread_interval()
+                config_version = sine_progress_config.version
+                for name, value in self.get_config_attributes(sine_progress_config.get_values()).items():
+                    setattr(self, name, value)
+                self.applied_config_version = config_version
+                log.set_level(LOG_LEVELS.get(self.log_level, DEFAULT_LOG_LEVEL))
 
             except Exception as e:
                 print(f"悅耳進度條：應用配置參數時發生錯誤: {e}")
@@ -547,6 +424,35 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
         else:
             self.apply_default_parameters()
 
+    def get_config_attributes(self, values):
+        """按已解析的配置值計算插件屬性（不修改當前狀態）"""
+        return {
+            # 波形類型和淡入淡出算法
+            'waveform_type': values['waveform_type'],
+            'fade_algorithm': values['fade_algorithm'],
+            # 根據算法設定淡入淡出比例：高斯算法使用較小的比例，余弦算法使用原來的比例
+            'fade_ratio': 0.3 if values['fade_algorithm'] == 'gaussian' else 0.45,
+            # 音量設定
+            'volume': values['volume'],
+            # 延遲模式和輸出後端
+            'latency_preset': values['latency_preset'],
+            'output_backend': values['output_backend'],
+            # 是否接管所有提示音、使用立體聲輸出、緩存NVDA提示音檔案
+            'route_all_beeps': values['route_all_beeps'],
+            'stereo_output': values['stereo_output'],
+            'cache_earcons': values['cache_earcons'],
+            # 頻率範圍設定
+            'min_frequency': values['min_frequency'],
+            'max_frequency': values['max_frequency'],
+            'mapped_min_freq': values['min_frequency'],
+            'mapped_max_freq': values['max_frequency'],
+            # 波形長度和線程間隔（波形長度 + 40ms）
+            'audio_duration': values['audio_duration'],
+            'thread_sleep_interval': values['audio_duration'] + 0.04,
+            # 日誌級別
+            'log_level': values['log_level'],
+        }
+
     def apply_default_parameters(self):
         """應用預設參數"""
         self.waveform_type = 'sine'
@@ -558,6 +464,12 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
         self.mapped_max_freq = 1760
         self.fade_ratio = 0.45
         self.audio_duration = 0.08  # 預設80ms
+        self.latency_preset = 'default'
+        self.output_backend = 'portaudio'
+        self.route_all_beeps = False
+        self.stereo_output = False
+        self.cache_earcons = False
+        self.log_level = 'info'
 
     def register_settings_panel(self):
         """註冊設定面板到NVDA設定對話框"""
@@ -573,8 +485,129 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
                 print(f"悅耳進度條：註冊設定面板時發生錯誤: {e}")
 
     def reload_configuration(self):
-        """重新載入配置並重新初始化（由設定面板調用）"""
-    
+        """套用記憶體中的最新配置：能在背景準備新的輸出流時原子地換用，否則重新初始化音頻系統"""
+        # 背景初始化完成前不重新載入，避免與初始化同時開啟輸出流
+        self.wait_until_initialized()
+        # 換用配置和重新初始化期間排除設備切換，兩者都會替換輸出流和設備索引
+        with self.reload_lock, self.migration_lock:
+            # 記憶體中的配置值和版本才是最新的，不重新讀取可能尚未寫入的配置文件
+            try:
+                success = self.swap_configuration()
+                if success:
+                    self.log_reloaded_configuration()
+            except Exception as e:
+                print(f"悅耳進度條：無法直接套用配置，改為重新初始化音頻系統: {e}")
+                success = False
+            
+            if not success:
+                success = self.restart_with_configuration()
+            
+            # 全局配置或配置檔可能已變更，重新渲染音色庫
+            self.refresh_tone_banks()
+            return success
+
+    def reload_configuration_async(self, on_complete=None):
+        """在背景線程重新載入配置（由設定面板調用），完成後在GUI線程調用on_complete(是否成功)"""
+        def worker():
+            success = False
+            try:
+                # 連續保存時前一次重新載入可能已套用最新的配置
+                if CONFIG_AVAILABLE and sine_progress_config.version == self.applied_config_version:
+                    success = True
+                else:
+                    success = self.reload_configuration()
+            finally:
+                if on_complete is not None:
+                    wx.CallAfter(on_complete, success)
+        
+        threading.Thread(target=worker, daemon=True).start()
+
+    def swap_configuration(self):
+        """在背景開啟新配置的輸出流並重建查找表和緩存，再在兩個音調之間換用，期間的音調仍使用舊參數"""
+        if not (CONFIG_AVAILABLE and self.stream_initialized and self.stream_pool is not None):
+            return False
+        
+        self.output_generation = next(self.output_generations)
+        config_version = sine_progress_config.version
+        attributes = self.get_config_attributes(sine_progress_config.get_values())
+        backend, audio_factory, format_constants = self.resolve_output_backend(attributes['output_backend'])
+        if backend is None:
+            return False
+        
+        output_settings = {
+            'stereo_output': attributes['stereo_output'],
+            'latency_preset': attributes['latency_preset'],
+            'backend': backend,
+            'format_constants': format_constants,
+        }
+        
+        # 輸出後端變更時在背景初始化新的後端和輸出流池，舊的後端繼續播放
+        backend_changed = backend != self.active_backend
+        if backend_changed:
+            audio_instance = audio_factory()
+            stream_pool = OutputStreamPool(audio_instance)
+        else:
+            audio_instance = self.pyaudio_instance
+            stream_pool = self.stream_pool
+        
+        try:
+            output_state = self.prepare_output_stream(audio_instance, stream_pool, self.output_device_index, output_settings)
+        except Exception:
+            if backend_changed:
+                stream_pool.close_all()
+                audio_instance.terminate()
+            raise
+        
+        # 音量、波形、淡入淡出或時長都可能已變更，查找表和緩存按新配置重建
+        generation = next(self.tone_table_generations)
+        tone_table = build_tone_table(
+            attributes['mapped_min_freq'],
+            attributes['mapped_max_freq'],
+            lambda frequency: self.get_frequency_cache_key(
+                frequency,
+                volume=attributes['volume'],
+                waveform_type=attributes['waveform_type'],
+                sample_rate=output_state['sample_rate'],
+                sample_format=output_state['sample_format']
+            ),
+            generation
+        )
+        
+        with self.stream_lock:
+            old_stream = self.audio_stream
+            old_instance = self.pyaudio_instance
+            old_pool = self.stream_pool
+            
+            for name, value in attributes.items():
+                setattr(self, name, value)
+            self.applied_config_version = config_version
+            log.set_level(LOG_LEVELS.get(self.log_level, DEFAULT_LOG_LEVEL))
+            self.active_backend = backend
+            self.audio_factory = audio_factory
+            self.format_constants = format_constants
+            self.audio_available = True
+            self.pyaudio_instance = audio_instance
+            self.stream_pool = stream_pool
+            self.commit_output_state(output_state)
+            self.tone_table = tone_table
+            self.tone_table_generation = generation
+            self.audio_cache = PartitionedToneCache()
+            
+            if (not backend_changed and old_stream is not self.audio_stream
+                    and old_stream not in output_state['retired_streams']):
+                stream_pool.park(old_stream)
+        
+        # 舊的後端在換用後才關閉
+        if backend_changed:
+            old_pool.close_all()
+            old_instance.terminate()
+        
+        self.finish_output_state(output_state, output_settings)
+        self.update_wave_file_hook()
+        return True
+
+    def restart_with_configuration(self):
+        """停止守護線程並以新配置重新初始化音頻系統"""
         try:
             # 停止當前的音頻處理
             self.stop_audio_daemon()
@@ -583,28 +616,31 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
             # 清理音頻緩存
             self.clear_audio_cache()
             
-            # 重新載入配置
-            if CONFIG_AVAILABLE:
-                sine_progress_config.load_config()
-            
             # 重新應用配置參數
             self.apply_config_parameters()
+            self.select_output_backend()
+            self.update_wave_file_hook()
             
             # 重新初始化音頻系統
-            if PYAUDIO_AVAILABLE:
+            if self.audio_available:
                 self.init_audio_stream_32bit()
                 self.start_audio_daemon()
 
-        # 重新計算線程間隔
+            # 重新計算線程間隔
             self.calculate_thread_interval()
             
-            print("悅耳進度條：配置重新載入完成")
-            print(f"  - 淡入淡出算法: {self.fade_algorithm}")
-            print(f"  - 音量: {self.volume}")
-            print(f"  - 頻率範圍: {self.mapped_min_freq}Hz - {self.mapped_max_freq}Hz")
+            self.log_reloaded_configuration()
+            return True
             
         except Exception as e:
             print(f"悅耳進度條：重新載入配置時發生錯誤: {e}")
+            return False
+
+    def log_reloaded_configuration(self):
+        print("悅耳進度條：配置重新載入完成")
+        print(f"  - 淡入淡出算法: {self.fade_algorithm}")
+        print(f"  - 音量: {self.volume}")
+        print(f"  - 頻率範圍: {self.mapped_min_freq}Hz - {self.mapped_max_freq}Hz")
 
 
     # 修改reinitialize_audio_system方法
@@ -626,7 +662,7 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
             self.detect_optimal_audio_params()
             
             # 重新初始化PyAudio音頻流
-            if PYAUDIO_AVAILABLE:
+            if self.audio_available:
                 self.init_audio_stream_32bit()
                 self.start_audio_daemon()
             
@@ -636,66 +672,91 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
             print(f"悅耳進度條：重新初始化音頻系統時發生錯誤: {e}")
 
 
-    def get_frequency_cache_key(self, frequency, volume=None, waveform_type=None):
+    def get_frequency_cache_key(self, frequency, volume=None, waveform_type=None, sample_rate=None, sample_format=None):
         """生成頻率的緩存鍵，將頻率四捨五入到小數點後1位"""
-        # 使用當前配置值作為默認值
+        # 使用當前配置值和輸出格式作為默認值
         if volume is None:
             volume = self.volume
         if waveform_type is None:
             waveform_type = self.waveform_type
+        if sample_rate is None:
+            sample_rate = self.sample_rate
+        if sample_format is None:
+            sample_format = self.sample_format
         
-        # 創建包含所有參數的緩存鍵
+        # 創建包含所有參數的緩存鍵（含輸出流的採樣率與樣本格式）
         freq_key = round(frequency, 1)
         volume_key = round(volume, 2)  # 音量精確到小數點後2位
         
-        return f"{freq_key}Hz_{volume_key}vol_{waveform_type}"
+        return f"{freq_key}Hz_{volume_key}vol_{waveform_type}_{sample_rate}Hz_{sample_format}"
 
+    def get_channel_cache_key(self, cache_key, pan, output_channels):
+        """立體聲輸出時在緩存鍵加上左右聲道增益"""
+        if output_channels == 2:
+            return f"{cache_key}_{pan[0]:.2f}L_{pan[1]:.2f}R"
+        return cache_key
 
-    def get_cached_audio_or_generate(self, frequency, duration, sample_rate, volume):
-        """獲取緩存的音頻或生成新的音頻"""
+
+    def get_cached_audio_or_generate(self, frequency, duration, sample_rate, volume, cache_key=None,
+                                     partition=PARTITION_PROGRESS, waveform_type=None, pan=(1.0, 1.0)):
+        """獲取緩存的音頻或生成新的音頻（可傳入查找表中預先計算的緩存鍵、緩存分區和左右聲道增益）"""
+        if waveform_type is None:
+            waveform_type = self.waveform_type
+        
         # 生成包含音量和波形類型的緩存鍵
-        cache_key = self.get_frequency_cache_key(frequency, volume, self.waveform_type)
+        if cache_key is None:
+            cache_key = self.get_frequency_cache_key(frequency, volume, waveform_type)
+        
+        # 立體聲輸出時緩存聲像變體，有聲像的提示音與置中的音效同樣只需一次查找
+        cache_key = self.get_channel_cache_key(cache_key, pan, self.output_channels)
         
         # 檢查緩存
-        if cache_key in self.audio_cache:
-            self.cache_hits += 1
-            if self.debug_mode:
-                print(f"悅耳進度條：音頻緩存命中: {cache_key} (命中率: {self.cache_hits}/{self.cache_hits + self.cache_misses})")
-            return self.audio_cache[cache_key]
+        cache = self.audio_cache.partition(partition)
+        audio_data = cache.get(cache_key)
+        if audio_data is not None:
+            log.debug("音頻緩存命中: %s (命中率: %d/%d)", cache_key, cache.hits, cache.hits + cache.misses)
+            return audio_data
         
         # 緩存未命中，生成新音頻
-        self.cache_misses += 1
-        if self.debug_mode:
-            print(f"悅耳進度條：音頻緩存未命中，正在生成: {cache_key}")
+        log.debug("音頻緩存未命中，正在生成: %s", cache_key)
+        
+        audio_data = self.render_tone_data(frequency, duration, sample_rate, self.sample_format,
+                                           self.output_channels, volume, waveform_type, pan)
         
-        # 根據配置選擇波形類型生成音頻數據
-        audio_array = self.generate_waveform_32bit(
+        # 添加到緩存，分區已滿時按分區的淘汰策略移除條目
+        evicted_key = cache.put(cache_key, audio_data)
+        
+        if evicted_key is not None:
+            log.debug("緩存分區 %s 已滿，移除條目: %s", partition, evicted_key)
+        log.debug("音頻已緩存: %s (緩存大小: %d/%d)", cache_key, len(cache), cache.capacity)
+        
+        return audio_data
+
+    def render_tone_data(self, frequency, duration, sample_rate, sample_format, output_channels, volume,
+                         waveform_type, pan=(1.0, 1.0), fade_algorithm=None, fade_ratio=None):
+        """按指定的輸出格式生成已編碼的音調數據（可指定淡入淡出，預設使用當前配置）"""
+        # 根據配置選擇波形類型生成浮點樣本
+        samples = self.generate_waveform_32bit(
             frequency=frequency,
             duration=duration,
             sample_rate=sample_rate,
             volume=volume,
-            waveform_type=self.waveform_type
-        )        
+            waveform_type=waveform_type,
+            fade_algorithm=fade_algorithm,
+            fade_ratio=fade_ratio
+        )
+
+        # 直接編碼為輸出流的原生樣本格式，寫入時無需再轉換
+        audio_data = encode_samples(samples, sample_format)
 
         # 32位系統音頻緩衝區對齊優化
-        audio_array = align_audio_buffer_32bit(audio_array)
-        
-        # 管理緩存大小
-        if len(self.audio_cache) >= self.max_cache_size:
-            # 移除最早添加的緩存項（簡單FIFO策略）
-            oldest_key = next(iter(self.audio_cache))
-            del self.audio_cache[oldest_key]
-            if self.debug_mode:
-                print(f"悅耳進度條：緩存已滿，移除最舊條目: {oldest_key}")
-        
-        # 添加到緩存
-        self.audio_cache[cache_key] = audio_array
+        audio_data = align_audio_buffer_32bit(audio_data, SAMPLE_FORMAT_WIDTHS[sample_format])
         
-        if self.debug_mode:
-            cache_size = len(self.audio_cache)
-            print(f"悅耳進度條：音頻已緩存: {cache_key} (緩存大小: {cache_size}/{self.max_cache_size})")
+        # 立體聲輸出：以左右聲道增益批量交錯單聲道數據
+        if output_channels == 2:
+            audio_data = pan_to_stereo(audio_data, sample_format, pan[0], pan[1])
         
-        return audio_array
+        return audio_data
 
     def old_detect_optimal_audio_params(self):
         """檢測當前播放設備的最佳音頻參數"""
@@ -768,23 +829,194 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
             self.optimal_format = paInt16
             print(f"悅耳進度條：設備檢測失敗，使用默認配置: {e}")
 
-    def detect_optimal_audio_params(self):
-        """檢測當前播放設備的最佳音頻參數"""
-        if not PYAUDIO_AVAILABLE:
-            # 後備默認值
-            self.sample_rate = 48000
-            self.optimal_format = paInt16
-            self.output_device_index = None
+    def select_output_backend(self):
+        """按配置選擇輸出後端，內嵌PortAudio無法載入時自動改用nvwave"""
+        backend, self.audio_factory, self.format_constants = self.resolve_output_backend(self.output_backend)
+        self.active_backend = backend
+        self.audio_available = backend is not None
+        if backend:
+            print(f"悅耳進度條：輸出後端: {backend}")
+
+    def resolve_output_backend(self, requested_backend):
+        """解析實際可用的輸出後端，返回(後端名稱, 音頻實例工廠, 樣本格式常量)"""
+        backend = requested_backend
+        if backend == 'portaudio' or not NVWAVE_AVAILABLE:
+            load_portaudio()
+        if backend == 'portaudio' and not PYAUDIO_AVAILABLE and NVWAVE_AVAILABLE:
+            print("悅耳進度條：內嵌PortAudio不可用，改用NVDA音頻輸出（nvwave）")
+            backend = 'nvwave'
+        elif backend == 'nvwave' and not NVWAVE_AVAILABLE and PYAUDIO_AVAILABLE:
+            print("悅耳進度條：nvwave不可用，改用內嵌PortAudio")
+            backend = 'portaudio'
+        
+        if backend == 'nvwave' and NVWAVE_AVAILABLE:
+            return backend, NVWaveAudio, NVWAVE_SAMPLE_FORMATS
+        if PYAUDIO_AVAILABLE:
+            return 'portaudio', PyAudio, PA_SAMPLE_FORMATS
+        return None, None, {}
+
+    def detect_optimal_audio_params(self, pyaudio_instance=None):
+        """檢測播放設備的原生採樣率與樣本格式"""
+        # 後備默認值
+        self.sample_rate = DEFAULT_SAMPLE_RATE
+        self.sample_format = DEFAULT_SAMPLE_FORMAT
+        self.output_channels = 2 if self.stereo_output else 1
+        
+        if not self.audio_available:
+            self.optimal_format = None
+            self.rebuild_tone_table()
             print("悅耳進度條：PyAudio不可用，使用默認音頻參數")
             return
         
-        # 使用默認設備配置
-        self.sample_rate = 48000
-        self.optimal_format = paInt16
-        self.output_device_index = None
-        print("悅耳進度條：使用默認設備配置")
-        print(f"悅耳進度條：音頻配置: {self.sample_rate}Hz, 16位整數")
-        print(f"悅耳進度條：設備索引: 默認設備")
+        if pyaudio_instance is not None:
+            try:
+                device_params = self.query_device_params(pyaudio_instance, self.output_device_index)
+                self.sample_rate = device_params['sample_rate']
+                self.sample_format = device_params['sample_format']
+                self.output_channels = device_params['output_channels']
+                
+                # 按延遲模式選擇緩衝大小
+                self.select_frames_per_buffer(device_params['device_info'])
+            except Exception as e:
+                print(f"悅耳進度條：設備檢測失敗，使用默認配置: {e}")
+            # 輸出後端不支援的格式改用16位整數
+            if self.sample_format not in self.format_constants:
+                self.sample_format = DEFAULT_SAMPLE_FORMAT
+            print(f"悅耳進度條：音頻配置: {self.sample_rate}Hz, {SAMPLE_FORMAT_NAMES[self.sample_format]}")
+        
+        self.optimal_format = self.format_constants[self.sample_format]
+        
+        # 頻率範圍、音量、波形或輸出格式可能已變更，重建頻率查找表
+        self.rebuild_tone_table()
+
+    def get_output_settings(self):
+        """當前影響輸出流參數的設定"""
+        return {
+            'stereo_output': self.stereo_output,
+            'latency_preset': self.latency_preset,
+            'backend': self.active_backend,
+            'format_constants': self.format_constants,
+        }
+
+    def query_device_params(self, pyaudio_instance, device_index, output_settings=None):
+        """查詢設備的原生採樣率、樣本格式和聲道數（不修改當前的音頻參數，可傳入尚未套用的設定）"""
+        if output_settings is None:
+            output_settings = self.get_output_settings()
+        
+        # 查詢目標設備（或默認設備）的信息
+        if device_index is not None:
+            device_info = pyaudio_instance.get_device_info_by_index(device_index)
+        else:
+            device_info = pyaudio_instance.get_default_output_device_info()
+        
+        # 使用設備的原生採樣率和格式，避免系統對每個音調重新取樣和轉換
+        sample_rate = normalize_sample_rate(device_info.get('defaultSampleRate'))
+        sample_format = choose_native_format(device_info)
+        output_channels = 2 if output_settings['stereo_output'] else 1
+        print(f"悅耳進度條：檢測到播放設備: {device_info.get('name', '未知設備')} ({device_info.get('host_api_name', '未知API')})")
+        
+        # 設備不支援雙聲道時改用單聲道輸出
+        if output_channels == 2 and device_info.get('maxOutputChannels', 2) < 2:
+            output_channels = 1
+            print("悅耳進度條：設備不支援雙聲道，改用單聲道輸出")
+        
+        # 優先使用已保存的探測結果，未探測過的設備在背景探測供下次使用（僅PortAudio後端）
+        if self.device_probe and output_settings['backend'] == 'portaudio':
+            probed_params = self.device_probe.get_cached_params(device_info)
+            if probed_params:
+                sample_rate = probed_params['sample_rate']
+                sample_format = probed_params['sample_format']
+                print("悅耳進度條：使用已緩存的設備探測結果")
+            else:
+                self.device_probe.probe_in_background(device_info)
+        
+        # 輸出後端不支援的格式改用16位整數
+        if sample_format not in output_settings['format_constants']:
+            sample_format = DEFAULT_SAMPLE_FORMAT
+        
+        return {
+            'device_info': device_info,
+            'sample_rate': sample_rate,
+            'sample_format': sample_format,
+            'output_channels': output_channels,
+        }
+
+    def rebuild_tone_table(self):
+        """重建頻率查找表：預先計算每個原始頻率的映射頻率和緩存鍵"""
+        generation = next(self.tone_table_generations)
+        self.tone_table = build_tone_table(
+            self.mapped_min_freq,
+            self.mapped_max_freq,
+            self.get_frequency_cache_key,
+            generation
+        )
+        self.tone_table_generation = generation
+        log.debug("頻率查找表已重建（第 %d 代）", generation)
+
+    def latency_tuning_available(self, output_settings=None):
+        """低延遲/省電模式只在PortAudio後端且可校準時生效"""
+        if output_settings is None:
+            output_settings = self.get_output_settings()
+        return (output_settings['latency_preset'] != 'default' and self.device_probe is not None
+                and self.latency_calibrator is not None and output_settings['backend'] == 'portaudio')
+
+    def lookup_frames_per_buffer(self, device_info, sample_rate, sample_format, output_settings=None):
+        """查找已保存的校準結果對應的緩衝大小，不適用或未校準時返回None"""
+        if output_settings is None:
+            output_settings = self.get_output_settings()
+        if not self.latency_tuning_available(output_settings):
+            return None
+        calibration = self.device_probe.get_cached_calibration(device_info, sample_rate, sample_format)
+        return select_buffer_size(calibration, output_settings['latency_preset'])
+
+    def select_frames_per_buffer(self, device_info):
+        """按延遲模式選擇緩衝大小，未校準的設備在背景校準"""
+        self.frames_per_buffer = DEFAULT_FRAMES_PER_BUFFER
+        if not self.latency_tuning_available():
+            return
+        
+        # 使用已保存的校準結果
+        frames_per_buffer = self.lookup_frames_per_buffer(device_info, self.sample_rate, self.sample_format)
+        if frames_per_buffer:
+            self.frames_per_buffer = frames_per_buffer
+            return
+        
+        # 未校準過：暫用固定緩衝，在背景校準
+        self.calibrate_frames_per_buffer(device_info, self.sample_rate, self.sample_format)
+
+    def calibrate_frames_per_buffer(self, device_info, sample_rate, sample_format):
+        """在背景校準設備的緩衝大小，完成後若輸出流未再變更則換用新緩衝大小的輸出流"""
+        output_generation = self.output_generation
+
+        def on_calibration_complete(result):
+            """校準完成（校準線程）：保存結果並套用"""
+            self.device_probe.store_calibration(device_info, sample_rate, sample_format, result)
+            new_frames = select_buffer_size(result, self.latency_preset)
+            if new_frames and new_frames != self.frames_per_buffer:
+                self.apply_calibrated_buffer(output_generation, sample_rate, sample_format, new_frames)
+        
+        calibration_key = self.device_probe.get_calibration_key(device_info, sample_rate, sample_format)
+        self.latency_calibrator.calibrate_in_background(
+            calibration_key,
+            device_info.get('index'),
+            sample_rate,
+            PA_SAMPLE_FORMATS[sample_format],
+            SAMPLE_FORMAT_WIDTHS[sample_format],
+            on_complete=on_calibration_complete
+        )
+
+    def apply_calibrated_buffer(self, output_generation, sample_rate, sample_format, frames_per_buffer):
+        """經由設備切換的路徑換用校準緩衝大小的輸出流，校準期間已切換設備或重新載入配置時略過"""
+        # 在背景線程調用：新的流在此開啟，只在兩個音調之間持有流鎖換用
+        self.wait_until_initialized()
+        with self.reload_lock, self.migration_lock:
+            if (output_generation != self.output_generation or
+                    (self.sample_rate, self.sample_format) != (sample_rate, sample_format) or
+                    frames_per_buffer == self.frames_per_buffer):
+                log.debug("校準期間輸出流已變更，略過套用校準緩衝大小: %d frames", frames_per_buffer)
+                return False
+            print(f"悅耳進度條：套用校準緩衝大小: {frames_per_buffer} frames")
+            return self.migrate_output_stream(self.output_device_index)
 
     def old_init_audio_stream_32bit(self):
         """初始化PyAudio音頻流 - 32位優化版本"""
@@ -806,7 +1038,7 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
             self.audio_stream = self.pyaudio_instance.open(**stream_config)
             self.stream_initialized = True
             
-            if self.debug_mode:
+            if log.debug_enabled:
                 buffer_ms = self.frames_per_buffer / self.sample_rate * 1000
                 format_name = {paInt16: "16位", paInt24: "24位", paFloat32: "32位浮點"}
                 print("悅耳進度條：守護線程：PyAudio音頻流初始化成功（設備優化）")
@@ -824,24 +1056,21 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
     # 修改init_audio_stream_32bit方法
     def init_audio_stream_32bit(self):
         """初始化PyAudio音頻流"""
-        if not PYAUDIO_AVAILABLE or self.stream_initialized:
+        if not self.audio_available or self.stream_initialized:
             return
+        self.output_generation = next(self.output_generations)
         
         try:
-            self.pyaudio_instance = PyAudio()
+            self.pyaudio_instance = self.audio_factory()
+            
+            # 按目標設備檢測原生採樣率與樣本格式
+            self.detect_optimal_audio_params(self.pyaudio_instance)
             
             # 使用檢測到的最佳配置和具體設備索引
-            stream_config = {
-                'format': self.optimal_format,
-                'channels': 1,
-                'rate': self.sample_rate,
-                'output': True,
-                'frames_per_buffer': self.frames_per_buffer
-            }
+            stream_config = self.build_stream_config()
             
             # 如果有具體的設備索引，則指定輸出設備
             if hasattr(self, 'output_device_index') and self.output_device_index is not None:
-                stream_config['output_device_index'] = self.output_device_index
                 print(f"悅耳進度條：使用指定輸出設備索引: {self.output_device_index}")
                 
                 # 驗證設備信息
@@ -854,21 +1083,25 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
             else:
                 print("悅耳進度條：使用默認輸出設備")
             
-            self.audio_stream = self.pyaudio_instance.open(**stream_config)
+            self.stream_pool = OutputStreamPool(self.pyaudio_instance)
+            self.audio_stream = self.stream_pool.acquire(self.output_device_index, stream_config)
             self.stream_initialized = True
             
-            if self.debug_mode:
+            # 使用指定設備時，預先開啟默認設備的輸出流，設備失效時可即時切換
+            if self.output_device_index is not None:
+                self.stream_pool.prepare_failover(stream_config)
+            
+            if log.debug_enabled:
                 buffer_ms = self.frames_per_buffer / self.sample_rate * 1000
-                format_name = {paInt16: "16位", paInt24: "24位", paFloat32: "32位浮點"}
                 print("悅耳進度條：守護線程：PyAudio音頻流初始化成功（設備優化）")
-                print(f"悅耳進度條：音頻配置：{self.sample_rate}Hz, {format_name.get(self.optimal_format, '未知')}")
+                print(f"悅耳進度條：音頻配置：{self.sample_rate}Hz, {SAMPLE_FORMAT_NAMES[self.sample_format]}")
                 print(f"悅耳進度條：緩衝區大小：{self.frames_per_buffer} frames (約{buffer_ms:.1f}ms)")
                 print(f"悅耳進度條：溢出處理：{'停用（32位兼容）' if not self.exception_on_overflow else '啟用'}")
                 
         except Exception as e:
             print(f"悅耳進度條：守護線程：PyAudio流初始化失敗: {e}")
-            # 如果指定設備失敗，嘗試使用默認設備
-            if hasattr(self, 'output_device_index') and self.output_device_index is not None:
+            # 如果指定設備或原生格式失敗，嘗試使用默認設備和16位整數格式
+            if (hasattr(self, 'output_device_index') and self.output_device_index is not None) or self.sample_format != DEFAULT_SAMPLE_FORMAT:
                 print("悅耳進度條：指定設備初始化失敗，嘗試使用默認設備")
                 try:
                     self.cleanup_audio_resources()
@@ -877,15 +1110,13 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
                     self.output_device_index = None
                     
                     # 重新嘗試初始化
-                    self.pyaudio_instance = PyAudio()
-                    stream_config = {
-                        'format': self.optimal_format,
-                        'channels': 1,
-                        'rate': self.sample_rate,
-                        'output': True,
-                        'frames_per_buffer': self.frames_per_buffer
-                    }
-                    self.audio_stream = self.pyaudio_instance.open(**stream_config)
+                    self.pyaudio_instance = self.audio_factory()
+                    self.detect_optimal_audio_params(self.pyaudio_instance)
+                    self.sample_format = DEFAULT_SAMPLE_FORMAT
+                    self.optimal_format = self.format_constants[self.sample_format]
+                    stream_config = self.build_stream_config()
+                    self.stream_pool = OutputStreamPool(self.pyaudio_instance)
+                    self.audio_stream = self.stream_pool.acquire(None, stream_config)
                     self.stream_initialized = True
                     print("悅耳進度條：使用默認設備初始化成功")
                     
@@ -897,14 +1128,374 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
                     self.stream_initialized = False
                     self.pyaudio_instance = None
                     self.audio_stream = None
+                    self.stream_pool = None
             else:
                 self.stream_initialized = False
                 self.pyaudio_instance = None
                 self.audio_stream = None
+                self.stream_pool = None
+
+    def build_stream_config(self):
+        """按當前音頻參數生成輸出流配置"""
+        stream_config = {
+            'format': self.optimal_format,
+            'channels': self.output_channels,
+            'rate': self.sample_rate,
+            'output': True,
+            'frames_per_buffer': self.frames_per_buffer
+        }
+        if self.output_device_index is not None:
+            stream_config['output_device_index'] = self.output_device_index
+        return stream_config
+
+    def switch_output_device(self, device_index):
+        """切換輸出設備：池中已有該設備的流時直接換用，無需重新初始化PortAudio"""
+        return self.migrate_output_stream(device_index)
+
+    def migrate_output_stream(self, device_index, reopen=False):
+        """無縫切換輸出設備：先開啟新設備的輸出流並預先渲染音調，再在兩個音調之間原子地換用"""
+        if not self.stream_initialized or self.stream_pool is None:
+            self.output_device_index = device_index
+            return False
+        self.output_generation = next(self.output_generations)
+
+        # 以下準備工作不持有流鎖，守護線程照常播放
+        output_settings = self.get_output_settings()
+        try:
+            output_state = self.prepare_output_stream(self.pyaudio_instance, self.stream_pool, device_index,
+                                                      output_settings, reopen=reopen)
+        except Exception as e:
+            print(f"悅耳進度條：切換輸出設備失敗: {e}")
+            return False
+
+        sample_rate = output_state['sample_rate']
+        sample_format = output_state['sample_format']
+        output_channels = output_state['output_channels']
+
+        # 輸出格式相同時保留緩存和查找表，否則按新格式重建並預先渲染正在使用的進度條音調
+        format_changed = (sample_rate, sample_format, output_channels) != (
+            self.sample_rate, self.sample_format, self.output_channels)
+        if format_changed:
+            generation = next(self.tone_table_generations)
+            tone_table = build_tone_table(
+                self.mapped_min_freq,
+                self.mapped_max_freq,
+                lambda frequency: self.get_frequency_cache_key(
+                    frequency, sample_rate=sample_rate, sample_format=sample_format),
+                generation
+            )
+            audio_cache = PartitionedToneCache()
+            self.prerender_progress_tones(tone_table, audio_cache, sample_rate, sample_format, output_channels)
+
+        # 守護線程在每個音調的渲染和寫入期間持有流鎖，換用只發生在兩個音調之間
+        with self.stream_lock:
+            old_stream = self.audio_stream
+            self.commit_output_state(output_state)
+            if format_changed:
+                self.tone_table = tone_table
+                self.tone_table_generation = generation
+                self.audio_cache = audio_cache
+
+            if old_stream is not self.audio_stream and old_stream not in output_state['retired_streams']:
+                self.stream_pool.park(old_stream)
+
+        self.finish_output_state(output_state, output_settings)
+        if format_changed:
+            # 音色庫按舊的輸出格式渲染，重新渲染
+            self.refresh_tone_banks()
+
+        print(f"悅耳進度條：已切換輸出設備（設備索引: {device_index}, {sample_rate}Hz, {SAMPLE_FORMAT_NAMES[sample_format]}, "
+              f"{'保留' if not format_changed else '重建'}音頻緩存）")
+        return True
+
+    def prepare_output_stream(self, audio_instance, stream_pool, device_index, output_settings, reopen=False):
+        """按設定查詢設備參數並開啟（或從池中取得）輸出流，不修改當前狀態"""
+        device_params = self.query_device_params(audio_instance, device_index, output_settings)
+        device_info = device_params['device_info']
+        sample_rate = device_params['sample_rate']
+        sample_format = device_params['sample_format']
+        calibrated_frames = self.lookup_frames_per_buffer(device_info, sample_rate, sample_format, output_settings)
+        frames_per_buffer = calibrated_frames or DEFAULT_FRAMES_PER_BUFFER
+
+        stream_config = {
+            'format': output_settings['format_constants'][sample_format],
+            'channels': device_params['output_channels'],
+            'rate': sample_rate,
+            'output': True,
+            'frames_per_buffer': frames_per_buffer
+        }
+        # 被取代的流可能仍是當前正在寫入的流，換用後才關閉
+        if reopen:
+            audio_stream, retired_stream = stream_pool.reopen(device_index, stream_config)
+            retired_streams = [retired_stream] if retired_stream is not None else []
+        else:
+            audio_stream, retired_streams = stream_pool.acquire_replacement(device_index, stream_config)
+
+        return {
+            'device_index': device_index,
+            'device_info': device_info,
+            'sample_rate': sample_rate,
+            'sample_format': sample_format,
+            'output_channels': device_params['output_channels'],
+            'optimal_format': stream_config['format'],
+            'frames_per_buffer': frames_per_buffer,
+            'calibrated': calibrated_frames is not None,
+            'stream_config': stream_config,
+            'audio_stream': audio_stream,
+            'retired_streams': retired_streams,
+        }
+
+    def commit_output_state(self, output_state):
+        """換用已準備好的輸出流和音頻參數（調用者需持有流鎖）"""
+        self.output_device_index = output_state['device_index']
+        self.sample_rate = output_state['sample_rate']
+        self.sample_format = output_state['sample_format']
+        self.output_channels = output_state['output_channels']
+        self.optimal_format = output_state['optimal_format']
+        self.frames_per_buffer = output_state['frames_per_buffer']
+        self.audio_stream = output_state['audio_stream']
+        self.stream_initialized = True
+        # 被取代的流在換用後才關閉
+        for retired_stream in output_state['retired_streams']:
+            self.stream_pool.release(retired_stream)
+
+    def finish_output_state(self, output_state, output_settings):
+        """換用後的背景工作：預先開啟故障切換流，未校準的設備在背景校準"""
+        if output_state['device_index'] is not None:
+            self.stream_pool.prepare_failover(output_state['stream_config'])
+        if not output_state['calibrated'] and self.latency_tuning_available(output_settings):
+            self.calibrate_frames_per_buffer(output_state['device_info'], output_state['sample_rate'],
+                                             output_state['sample_format'])
+
+    def prerender_progress_tones(self, tone_table, audio_cache, sample_rate, sample_format, output_channels):
+        """按新的輸出格式預先渲染當前緩存中的進度條音調，切換設備後的第一個音效無需等待生成"""
+        in_use_keys = set(list(self.audio_cache.partition(PARTITION_PROGRESS).entries))
+        if not in_use_keys:
+            return 0
+
+        centre = (1.0, 1.0)
+        target = audio_cache.partition(PARTITION_PROGRESS)
+        rendered = 0
+        for tone in self.tone_table:
+            if tone is None:
+                continue
+            if self.get_channel_cache_key(tone[SLOT_CACHE_KEY], centre, self.output_channels) not in in_use_keys:
+                continue
+            new_tone = tone_table[tone[SLOT_ORIGINAL_HZ]]
+            new_key = self.get_channel_cache_key(new_tone[SLOT_CACHE_KEY], centre, output_channels)
+            if new_key in target:
+                continue
+            target.put(new_key, self.render_tone_data(
+                new_tone[SLOT_MAPPED_FREQ], self.audio_duration, sample_rate, sample_format,
+                output_channels, self.volume, self.waveform_type, centre))
+            rendered += 1
+
+        log.debug("已按新輸出格式預先渲染 %d 個進度條音調", rendered)
+        return rendered
+
+    def build_tone_bank(self, profile_name, values, output_format, shared_cache):
+        """按配置值建立音色庫：查找表和預先渲染的NVDA進度條音調，其他提示音和提示音檔案的分區在音色庫之間共用"""
+        attributes = self.get_config_attributes(values)
+        sample_rate, sample_format, output_channels = output_format
+        generation = next(self.tone_table_generations)
+        tone_table = build_tone_table(
+            attributes['mapped_min_freq'],
+            attributes['mapped_max_freq'],
+            lambda frequency: self.get_frequency_cache_key(
+                frequency,
+                volume=attributes['volume'],
+                waveform_type=attributes['waveform_type'],
+                sample_rate=sample_rate,
+                sample_format=sample_format
+            ),
+            generation
+        )
+        
+        centre = (1.0, 1.0)
+        audio_cache = PartitionedToneCache()
+        # 其他提示音的緩存鍵已包含淡入淡出算法，提示音檔案與音色無關
+        audio_cache.share_partitions(shared_cache, (PARTITION_GENERIC, PARTITION_EARCON))
+        progress_cache = audio_cache.partition(PARTITION_PROGRESS)
+        for original_hz in PROGRESS_BEEP_FREQUENCIES:
+            tone = tone_table[original_hz]
+            cache_key = self.get_channel_cache_key(tone[SLOT_CACHE_KEY], centre, output_channels)
+            if cache_key in progress_cache:
+                continue
+            progress_cache.put(cache_key, self.render_tone_data(
+                tone[SLOT_MAPPED_FREQ], attributes['audio_duration'], sample_rate, sample_format,
+                output_channels, attributes['volume'], attributes['waveform_type'], centre,
+                fade_algorithm=attributes['fade_algorithm'], fade_ratio=attributes['fade_ratio']))
+        
+        return ToneBank(
+            profile_name,
+            {name: attributes[name] for name in TONE_BANK_ATTRIBUTES},
+            tone_table,
+            generation,
+            audio_cache,
+            output_format
+        )
+
+    def refresh_tone_banks(self):
+        """在背景重新渲染全局配置和各應用程式配置檔的音色庫（配置或輸出格式變更後調用）"""
+        if not (CONFIG_AVAILABLE and self.stream_initialized):
+            return
+        with self.tone_bank_lock:
+            self.tone_bank_request += 1
+            request = self.tone_bank_request
+            # 舊的音色庫已失效，渲染完成前維持當前的聲音
+            self.tone_banks = {}
+            self.active_tone_bank = None
+        threading.Thread(target=self._tone_bank_worker, args=(request,), daemon=True).start()
+
+    def _tone_bank_worker(self, request):
+        output_format = (self.sample_rate, self.sample_format, self.output_channels)
+        shared_cache = self.audio_cache
+        try:
+            tone_banks = {None: self.build_tone_bank(None, sine_progress_config.get_values(), output_format, shared_cache)}
+            for profile_name in sine_progress_config.get_profiles():
+                if request != self.tone_bank_request:
+                    return
+                tone_banks[profile_name] = self.build_tone_bank(
+                    profile_name, sine_progress_config.get_profile_values(profile_name), output_format, shared_cache)
+        except Exception as e:
+            print(f"悅耳進度條：渲染音色庫錯誤: {e}")
+            return
+        
+        with self.tone_bank_lock:
+            # 渲染期間又有新的請求時捨棄本次結果
+            if request != self.tone_bank_request:
+                return
+            self.tone_banks = tone_banks
+        
+        print(f"悅耳進度條：音色庫已就緒（{len(tone_banks) - 1} 個應用程式配置檔）")
+        self.switch_tone_bank(self.focused_app)
+
+    def switch_tone_bank(self, app_name):
+        """換用應用程式的音色庫：只替換屬性和查找表、緩存的引用，無需重新合成"""
+        with self.tone_bank_lock:
+            bank = self.tone_banks.get(resolve_profile_name(app_name, self.tone_banks))
+            if bank is None or bank is self.active_tone_bank:
+                return False
+            
+            # 在兩個音調之間換用，輸出格式已變更（等待重新渲染）時不換用
+            with self.stream_lock:
+                if bank.output_format != (self.sample_rate, self.sample_format, self.output_channels):
+                    return False
+                for name, value in bank.attributes.items():
+                    setattr(self, name, value)
+                self.tone_table = bank.tone_table
+                self.tone_table_generation = bank.generation
+                self.audio_cache = bank.audio_cache
+                self.active_tone_bank = bank
+        
+        log.debug("已換用音色庫: %s", bank.profile_name or '全局配置')
+        return True
+
+    def event_foreground(self, obj, nextHandler):
+        """前景應用程式變更時換用其配置檔的音色庫"""
+        try:
+            app_name = obj.appModule.appName
+            if app_name not in IGNORED_APP_NAMES and app_name != self.focused_app:
+                self.focused_app = app_name
+                self.switch_tone_bank(app_name)
+        except Exception as e:
+            print(f"悅耳進度條：切換應用程式配置檔錯誤: {e}")
+        nextHandler()
+
+    def start_device_monitor(self):
+        """啟動NVDA輸出設備監聽"""
+        try:
+            self.device_monitor = NVDADeviceMonitor(
+                on_device_change_callback=self.on_nvda_output_device_changed,
+                pyaudio_instance_getter=PyAudio if PYAUDIO_AVAILABLE else None,
+                on_device_list_change_callback=self.on_output_device_list_changed,
+                rescan_runner=self.rescan_with_portaudio_released
+            )
+            self.device_monitor.start_monitoring()
+        except Exception as e:
+            print(f"悅耳進度條：啟動設備監聽失敗: {e}")
+            self.device_monitor = None
+
+    def stop_device_monitor(self):
+        """停止NVDA輸出設備監聽"""
+        device_monitor = self.device_monitor
+        if device_monitor is not None:
+            # 先清除引用，進行中的重新掃描結束後不再重新開啟輸出流
+            self.device_monitor = None
+            device_monitor.stop_monitoring()
+
+    def on_nvda_output_device_changed(self, previous_device, current_device):
+        """NVDA輸出設備變更：nvwave後端重新開啟輸出流，PortAudio後端切換到對應的設備索引"""
+        print(f"悅耳進度條：NVDA輸出設備已變更: '{previous_device}' -> '{current_device}'")
+        self.schedule_output_migration(reopen=self.active_backend == 'nvwave')
+
+    def on_output_device_list_changed(self, added_devices, removed_devices):
+        """設備列表變更（首次枚舉完成或設備插拔）：重新解析NVDA輸出設備對應的設備索引"""
+        if self.active_backend == 'portaudio':
+            self.schedule_output_migration()
+
+    def rescan_with_portaudio_released(self, refresh):
+        """暫停輸出並終止插件的PortAudio實例，使設備監聽的枚舉重新掃描設備，再按新的設備列表重新開啟輸出流"""
+        # 在設備監聽的枚舉線程調用；期間的提示音由守護線程停止的後備路徑交回原始函數播放
+        with self.reload_lock, self.migration_lock:
+            if self.active_backend != 'portaudio' or not self.stream_initialized:
+                return refresh()
+            
+            self.stop_audio_daemon()
+            self.cleanup_audio_resources()
+            try:
+                return refresh()
+            finally:
+                # 插件停用時設備監聽已先停止，不再重新開啟輸出流
+                device_monitor = self.device_monitor
+                if device_monitor is not None:
+                    # 設備索引可能已隨重新掃描改變，按新的設備列表重新解析
+                    self.output_device_index = device_monitor.get_current_nvda_output_device_index()
+                    self.init_audio_stream_32bit()
+                    self.start_audio_daemon()
+
+    def schedule_output_migration(self, reopen=False):
+        """在背景線程切換輸出流，不阻塞NVDA"""
+        threading.Thread(
+            target=self.migrate_to_nvda_output_device,
+            args=(reopen,),
+            daemon=True
+        ).start()
+
+    def migrate_to_nvda_output_device(self, reopen=False):
+        """切換到NVDA當前的輸出設備"""
+        # 與重新載入配置按相同順序持鎖，避免換用配置時提交舊的設備索引或關閉剛遷移的輸出流
+        with self.reload_lock, self.migration_lock:
+            try:
+                if self.device_monitor is None:
+                    return
+                if reopen:
+                    self.migrate_output_stream(self.output_device_index, reopen=True)
+                    return
+                device_index = self.device_monitor.get_current_nvda_output_device_index()
+                if device_index != self.output_device_index:
+                    self.migrate_output_stream(device_index)
+            except Exception as e:
+                print(f"悅耳進度條：切換到NVDA輸出設備失敗: {e}")
+
+    def failover_to_default_stream(self):
+        """指定設備失效時切換到預先開啟的默認設備輸出流"""
+        if self.stream_pool is None or self.output_device_index is None:
+            return False
+
+        with self.stream_lock:
+            failover_stream = self.stream_pool.failover()
+            if failover_stream is None:
+                return False
+            self.stream_pool.discard(self.output_device_index)
+            self.audio_stream = failover_stream
+            print(f"悅耳進度條：設備索引 {self.output_device_index} 失效，已切換到默認設備輸出流")
+            self.output_device_index = None
+        return True
 
     def start_audio_daemon(self):
         """啟動守護線程進行屬性檢查和播放"""
-        if not PYAUDIO_AVAILABLE or self.thread_running:
+        if not self.audio_available or self.thread_running:
             return
         
         self.thread_running = True
@@ -921,10 +1512,42 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
         
         while self.thread_running:
             try:
-                # 檢查是否有新的播放請求
+                # 效能分析中：在守護線程啟用分析器，達到上限時寫入結果
+                if self.profiler.active:
+                    self.profiler.daemon_tick()
+                
+                # 其他提示音請求：只播放最新的一個
+                beep_request = self.play_beep
+                if beep_request is not None and beep_request[0] != self.last_beep_request:
+                    self.last_beep_request = beep_request[0]
+                    if self.enabled and self.stream_initialized:
+                        picked_up_at = time.perf_counter()
+                        with self.stream_lock:
+                            self.execute_generic_play(beep_request, picked_up_at)
+                
+                # 提示音檔案請求：只播放最新的一個（取代正在播放的檔案）
+                while self.loaded_earcons:
+                    cache_key, audio_data = self.loaded_earcons.popleft()
+                    self.audio_cache.partition(PARTITION_EARCON).put(cache_key, audio_data)
+                earcon_request = self.play_earcon
+                if earcon_request is not None and earcon_request[0] != self.last_earcon_request:
+                    self.last_earcon_request = earcon_request[0]
+                    self.earcon_playback = None
+                    if self.enabled and self.stream_initialized:
+                        self.execute_earcon_play(earcon_request)
+                
+                # 設定預覽請求：只播放最新的一個
+                preview_request = self.play_preview
+                if preview_request is not None and preview_request[0] != self.last_preview_request:
+                    self.last_preview_request = preview_request[0]
+                    if self.enabled and self.stream_initialized:
+                        self.execute_preview_play(preview_request)
+                
+                # 檢查是否有新的播放請求（進度條音效仍按線程間隔限速）
                 if (self.play_id is not None and 
                     self.play_id != self.last_played_id and 
-                    self.play_frequency is not None):
+                    self.play_tone is not None and
+                    time.monotonic() >= self.next_progress_time):
                     
                     # 檢查插件是否仍然啟用
                     if not self.enabled or not self.stream_initialized:
@@ -932,27 +1555,43 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
                         self.last_played_id = self.play_id
                         continue
                     
-                    # 執行播放
+                    # 執行播放（渲染和寫入期間持有流鎖，輸出設備只會在兩個音調之間切換）
                     try:
-                        self.execute_audio_play_32bit(self.play_frequency)
+                        picked_up_at = time.perf_counter()
+                        with self.stream_lock:
+                            self.execute_audio_play_32bit(self.play_tone, self.play_id, picked_up_at)
                         # 更新最後播放的ID
                         self.last_played_id = self.play_id
+                        self.next_progress_time = time.monotonic() + self.thread_sleep_interval
                         
-                        if self.debug_mode:
-                            print(f"悅耳進度條：守護線程播放完成（32位優化）: ID={self.play_id}")
+                        log.debug("守護線程播放完成（32位優化）: ID=%s", self.play_id)
                             
                     except Exception as e:
-                        print(f"悅耳進度條：守護線程播放錯誤: {e}")
+                        log.error("守護線程播放錯誤: %s", e)
                         # 即使播放失敗也要更新ID，避免重複嘗試
                         self.last_played_id = self.play_id
                 
-                # 使用32位優化的循環間隔：120ms
-                time.sleep(self.thread_sleep_interval)
+                # 提示音檔案每次循環寫入一個緩衝大小的片段，其他提示音和進度條音效在片段之間播放
+                if self.earcon_playback is not None:
+                    self.write_earcon_chunk()
+                
+                # 使用32位優化的循環間隔：120ms，其他提示音請求會提前喚醒
+                wait_time = self.thread_sleep_interval
+                if self.earcon_playback is not None:
+                    wait_time = 0.0
+                elif self.play_id != self.last_played_id:
+                    # 進度條音效仍在限速中，只等待到可以播放為止
+                    wait_time = min(wait_time, max(0.0, self.next_progress_time - time.monotonic()))
+                self.wake_event.wait(wait_time)
+                self.wake_event.clear()
                 
             except Exception as e:
                 print(f"悅耳進度條：守護線程循環錯誤: {e}")
                 time.sleep(0.1)  # 出錯也要延遲，避免瘋狂循環
         
+        # 守護線程退出時仍在分析，寫入已收集的結果
+        if self.profiler.active:
+            self.profiler.finish()
         print("悅耳進度條：守護線程已退出")
 
     def old_execute_audio_play_32bit(self, original_hz):
@@ -988,7 +1627,7 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
                             exception_on_underflow=self.exception_on_overflow
                         )
                         
-                        if self.debug_mode:
+                        if log.debug_enabled:
                             progress_percent = progress * 100
                             cache_key = self.get_frequency_cache_key(mapped_freq)
                             print(f"悅耳進度條：守護線程執行播放（用戶配置）: {original_hz}Hz → {mapped_freq:.1f}Hz (進度: {progress_percent:.1f}%) [算法: {self.fade_algorithm}] [緩存: {cache_key}Hz]")
@@ -1006,90 +1645,320 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
         except Exception as e:
             print(f"悅耳進度條：音頻播放執行錯誤: {e}")
 
-    def execute_audio_play_32bit(self, original_hz):
-        """在守護線程中執行音頻播放 - 32位優化版本 + 音頻緩存 + 修正頻率映射"""
+    def execute_audio_play_32bit(self, tone, requested_at=None, picked_up_at=None):
+        """在守護線程中執行音頻播放 - 32位優化版本 + 音頻緩存 + 查找表頻率映射（可傳入請求和取得請求的時間戳以記錄延遲）"""
         try:
-            # 修正頻率映射邏輯：將原始進度條頻率範圍重新映射到用戶設定範圍
-            
-            # 原始進度條的頻率範圍（根據is_progress_beep函數定義）
-            ORIGINAL_MIN_FREQ = 110   # 原始進度條最低頻率
-            ORIGINAL_MAX_FREQ = 1800  # 原始進度條最高頻率
-            
-            # 計算原始頻率在原始範圍中的進度比例
-            original_progress = (original_hz - ORIGINAL_MIN_FREQ) / (ORIGINAL_MAX_FREQ - ORIGINAL_MIN_FREQ)
-            # 確保進度在0-1範圍內
-            original_progress = max(0.0, min(1.0, original_progress))
+            render_started = time.perf_counter()
+
+            # 請求提交後查找表已重建（配置或輸出格式變更），按原始頻率重新查找槽位
+            if tone[SLOT_GENERATION] != self.tone_table_generation:
+                tone = self.tone_table[tone[SLOT_ORIGINAL_HZ]]
             
-            # 將進度比例映射到用戶設定的頻率範圍
-            mapped_freq = self.mapped_min_freq + original_progress * (self.mapped_max_freq - self.mapped_min_freq)
+            mapped_freq = tone[SLOT_MAPPED_FREQ]
             
-            # 使用音頻緩存系統獲取或生成音頻數據
-            audio_array = self.get_cached_audio_or_generate(
+            # 使用音頻緩存系統獲取或生成音頻數據，緩存鍵已在查找表中預先計算
+            audio_data = self.get_cached_audio_or_generate(
                 frequency=mapped_freq,
                 duration=self.audio_duration,
                 sample_rate=self.sample_rate,
-                volume=self.volume
+                volume=self.volume,
+                cache_key=tone[SLOT_CACHE_KEY]
             )
+            render_ended = time.perf_counter()
             
             # 播放音頻
-            if self.enabled and self.stream_initialized and self.audio_stream:
-                try:
-                    # 檢查流是否仍然活躍
-                    if hasattr(self.audio_stream, 'is_active') and not self.audio_stream.is_active():
-                        print("悅耳進度條：警告：音頻流不活躍，嘗試重新初始化到當前設備")
-                        device_index_backup = getattr(self, 'output_device_index', None)
-                        self.cleanup_audio_resources()
-                        # 保持原有的設備索引
-                        if device_index_backup is not None:
-                            self.output_device_index = device_index_backup
-                            print(f"悅耳進度條：恢復設備索引: {device_index_backup}")
-                        self.init_audio_stream_32bit()
+            if self.write_audio_data(audio_data):
+                self.latency_tracer.record(requested_at, picked_up_at or render_started, render_started, render_ended,
+                                           self.last_write_started, self.last_write_ended)
+                log.debug("頻率映射（查找表）: %sHz → %.1fHz [用戶範圍: %s-%sHz] [緩存: %s]",
+                          tone[SLOT_ORIGINAL_HZ], mapped_freq, self.mapped_min_freq, self.mapped_max_freq,
+                          tone[SLOT_CACHE_KEY])
+            
+        except Exception as e:
+            log.error("音頻播放執行錯誤: %s", e)
 
-                    if self.audio_stream:
-                        # 使用32位優化的溢出處理策略
+    def execute_generic_play(self, beep_request, picked_up_at=None):
+        """在守護線程中播放其他提示音：按頻率、時長和音量緩存在獨立分區"""
+        try:
+            _, hz, length, left, right, requested_at = beep_request
+            peak = max(left, right)
+            volume = max(0.0, min(1.0, peak / 100.0))
+            if volume <= 0:
+                return
+            
+            # 以較大的聲道音量生成，再按各聲道相對音量分配增益（單聲道輸出時忽略）
+            pan = (left / float(peak), right / float(peak))
+            
+            frequency = round(hz, 1)
+            volume_key = round(volume, 2)
+            cache_key = f"beep_{frequency}Hz_{length}ms_{volume_key}vol_{self.fade_algorithm}_{self.sample_rate}Hz_{self.sample_format}"
+            
+            # 其他提示音保持NVDA原本的正弦波音色，只加上淡入淡出避免爆音
+            render_started = time.perf_counter()
+            audio_data = self.get_cached_audio_or_generate(
+                frequency=frequency,
+                duration=length / 1000.0,
+                sample_rate=self.sample_rate,
+                volume=volume,
+                cache_key=cache_key,
+                partition=PARTITION_GENERIC,
+                waveform_type='sine',
+                pan=pan
+            )
+            render_ended = time.perf_counter()
+            
+            if self.write_audio_data(audio_data):
+                self.latency_tracer.record(requested_at, picked_up_at or render_started, render_started, render_ended,
+                                           self.last_write_started, self.last_write_ended)
+                log.debug("已播放提示音: %sHz, %sms [緩存: %s]", hz, length, cache_key)
+                
+        except Exception as e:
+            log.error("提示音播放執行錯誤: %s", e)
+
+    def execute_earcon_play(self, earcon_request):
+        """在守護線程中開始播放提示音檔案：已緩存時逐個片段寫入，未緩存時交給背景線程讀取和轉換"""
+        try:
+            file_path = earcon_request[1]
+            output_format = (self.sample_rate, self.sample_format, self.output_channels)
+            cache_key = get_earcon_cache_key(file_path, *output_format)
+            audio_data = self.audio_cache.partition(PARTITION_EARCON).get(cache_key) if cache_key else None
+            
+            if audio_data is not None:
+                self.earcon_playback = (output_format, audio_data, 0)
+                return
+            
+            if cache_key:
+                self.load_earcon_in_background(earcon_request, cache_key, output_format)
+                return
+            
+            # 無法讀取的檔案交回nvwave播放，之後不再攔截
+            self.uncacheable_earcons.add(file_path)
+            if self.original_play_wave_file:
+                self.original_play_wave_file(file_path)
+                
+        except Exception as e:
+            log.error("提示音檔案播放執行錯誤: %s", e)
+
+    def write_earcon_chunk(self):
+        """寫入正在播放的提示音檔案的下一個片段，每個片段單獨持有流鎖"""
+        output_format, audio_data, offset = self.earcon_playback
+        with self.stream_lock:
+            # 輸出格式已變更（設備切換或配置套用）時停止播放
+            if not self.enabled or output_format != (self.sample_rate, self.sample_format, self.output_channels):
+                self.earcon_playback = None
+                return
+            chunk_size = self.frames_per_buffer * SAMPLE_FORMAT_WIDTHS[self.sample_format] * self.output_channels
+            chunk = audio_data[offset:offset + chunk_size]
+            if not self.write_audio_data(chunk):
+                self.earcon_playback = None
+                return
+        
+        offset += len(chunk)
+        if offset >= len(audio_data):
+            self.earcon_playback = None
+            log.debug("已播放提示音檔案（%d 位元組）", len(audio_data))
+        else:
+            self.earcon_playback = (output_format, audio_data, offset)
+
+    def load_earcon_in_background(self, earcon_request, cache_key, output_format):
+        """在背景線程讀取並轉換提示音檔案，守護線程照常播放其他音效"""
+        with self.earcon_loader_lock:
+            if cache_key in self.loading_earcons:
+                return
+            self.loading_earcons.add(cache_key)
+        threading.Thread(
+            target=self._earcon_loader_worker,
+            args=(earcon_request, cache_key, output_format),
+            daemon=True
+        ).start()
+
+    def _earcon_loader_worker(self, earcon_request, cache_key, output_format):
+        file_path = earcon_request[1]
+        audio_data = None
+        try:
+            audio_data = load_earcon(file_path, *output_format)
+        except Exception as e:
+            log.error("讀取提示音檔案失敗: %s: %s", file_path, e)
+        finally:
+            with self.earcon_loader_lock:
+                self.loading_earcons.discard(cache_key)
+        
+        if audio_data is None:
+            # 過長、格式不支援或無法讀取的檔案交回nvwave播放，之後不再攔截
+            self.uncacheable_earcons.add(file_path)
+            if self.play_earcon is earcon_request and self.original_play_wave_file:
+                self.original_play_wave_file(file_path)
+            return
+        
+        self.loaded_earcons.append((cache_key, audio_data))
+        log.debug("提示音檔案已轉換: %s", file_path)
+        # 仍是最新的請求時重新請求播放，守護線程會先將結果放入緩存
+        if self.play_earcon is earcon_request:
+            self.request_earcon_play(file_path)
+
+    def execute_preview_play(self, preview_request):
+        """在守護線程中逐個音調播放預覽掃頻，有新的預覽請求或輸出格式已變更時停止"""
+        request_id, preview_key, chunks = preview_request
+        for audio_data in chunks:
+            if self.play_preview is not preview_request or not self.thread_running:
+                return
+            # 每個音調單獨持有流鎖，設備切換和配置套用可在音調之間進行
+            with self.stream_lock:
+                if preview_key[-3:] != (self.sample_rate, self.sample_format, self.output_channels):
+                    return
+                if not self.write_audio_data(audio_data):
+                    return
+
+    def is_replaced_stream(self, audio_stream):
+        """輸出流是否已被換用（設備切換或重新載入配置）"""
+        with self.stream_lock:
+            return self.audio_stream is not audio_stream
+
+    def write_audio_data(self, audio_data):
+        """將已編碼的音頻寫入當前輸出流，流失效時切換到故障切換流或重新初始化"""
+        if not (self.enabled and self.stream_initialized and self.audio_stream):
+            return False
+        
+        try:
+            # 檢查流是否仍然活躍，不活躍時優先切換到默認設備的故障切換流
+            # 換用輸出流時舊的流在流鎖內暫停，已被換用的流不活躍不代表設備失效
+            audio_stream = self.audio_stream
+            if (hasattr(audio_stream, 'is_active') and not audio_stream.is_active()
+                    and not self.is_replaced_stream(audio_stream)
+                    and not self.failover_to_default_stream()):
+                log.warning("音頻流不活躍，嘗試重新初始化到當前設備")
+                device_index_backup = getattr(self, 'output_device_index', None)
+                self.cleanup_audio_resources()
+                # 保持原有的設備索引
+                if device_index_backup is not None:
+                    self.output_device_index = device_index_backup
+                    log.info("恢復設備索引: %s", device_index_backup)
+                self.init_audio_stream_32bit()
+
+            # 持有流鎖寫入，避免設備切換時寫入已暫停的流
+            with self.stream_lock:
+                if not self.audio_stream:
+                    return False
+                # 使用32位優化的溢出處理策略，緩存數據已是輸出流的原生格式
+                self.last_write_started = time.perf_counter()
+                self.audio_stream.write(
+                    audio_data,
+                    exception_on_underflow=self.exception_on_overflow
+                )
+                self.last_write_ended = time.perf_counter()
+            return True
+                    
+        except Exception as stream_error:
+            log.error("音頻流寫入錯誤: %s", stream_error)
+            # 優先切換到默認設備的故障切換流並重新寫入，無需等待重新初始化
+            if self.failover_to_default_stream():
+                try:
+                    with self.stream_lock:
+                        self.last_write_started = time.perf_counter()
                         self.audio_stream.write(
-                            audio_array.tobytes(),
+                            audio_data,
                             exception_on_underflow=self.exception_on_overflow
                         )
-                        
-                        if self.debug_mode:
-                            progress_percent = original_progress * 100
-                            cache_key = self.get_frequency_cache_key(mapped_freq)
-                            print(f"悅耳進度條：頻率映射（修正版）: {original_hz}Hz → {mapped_freq:.1f}Hz (原始進度: {progress_percent:.1f}%) [用戶範圍: {self.mapped_min_freq}-{self.mapped_max_freq}Hz] [緩存: {cache_key}]")
-                            
-                except Exception as stream_error:
-                    print(f"悅耳進度條：音頻流寫入錯誤: {stream_error}")
-                    # 嘗試重新初始化音頻流，保持當前設備索引
-                    try:
-                        device_index_backup = getattr(self, 'output_device_index', None)
-                        self.cleanup_audio_resources()
-                        # 保持原有的設備索引
-                        if device_index_backup is not None:
-                            self.output_device_index = device_index_backup
-                            print(f"悅耳進度條：恢復設備索引: {device_index_backup}")
-                        self.init_audio_stream_32bit()
-                        print("悅耳進度條：音頻流重新初始化完成（32位模式，保持設備）")
-                    except Exception as init_error:
-                        print(f"悅耳進度條：音頻流重新初始化失敗: {init_error}")
-            
-        except Exception as e:
-            print(f"悅耳進度條：音頻播放執行錯誤: {e}")
+                        self.last_write_ended = time.perf_counter()
+                    return True
+                except Exception as failover_error:
+                    log.error("故障切換流寫入錯誤: %s", failover_error)
+                return False
+            # 嘗試重新初始化音頻流，保持當前設備索引
+            try:
+                device_index_backup = getattr(self, 'output_device_index', None)
+                self.cleanup_audio_resources()
+                # 保持原有的設備索引
+                if device_index_backup is not None:
+                    self.output_device_index = device_index_backup
+                    log.info("恢復設備索引: %s", device_index_backup)
+                self.init_audio_stream_32bit()
+                log.info("音頻流重新初始化完成（32位模式，保持設備）")
+            except Exception as init_error:
+                log.error("音頻流重新初始化失敗: %s", init_error)
+            return False
             
-    def request_audio_play(self, frequency):
+    def request_audio_play(self, tone, requested_at=None):
         """請求播放音頻：設置屬性，由守護線程檢查和播放"""
         try:
-            # 生成唯一時間戳ID
-            new_play_id = time.time()
+            # 以tones.beep被調用的單調時間戳作為唯一ID，守護線程據此計算排隊延遲
+            new_play_id = requested_at if requested_at is not None else time.perf_counter()
+            
+            # 上一個請求尚未播放即被取代
+            if self.play_id is not None and self.play_id != self.last_played_id:
+                self.skipped_requests += 1
             
             # 設置播放屬性（原子操作）
-            self.play_frequency = frequency
+            self.play_tone = tone
             self.play_id = new_play_id
             
-            if self.debug_mode:
-                print(f"悅耳進度條：播放請求已提交（32位）: {frequency}Hz, ID={new_play_id}")
+            log.debug("播放請求已提交（32位）: %sHz, ID=%s", tone[SLOT_ORIGINAL_HZ], new_play_id)
                 
         except Exception as e:
-            print(f"悅耳進度條：提交播放請求錯誤: {e}")
+            log.error("提交播放請求錯誤: %s", e)
+    
+    def request_generic_play(self, hz, length, left, right, requested_at=None):
+        """請求播放其他提示音：新請求取代尚未播放的舊請求（與tones.beep中斷前一個音相同），並喚醒守護線程"""
+        if self.play_beep is not None and self.play_beep[0] != self.last_beep_request:
+            self.skipped_requests += 1
+        self.beep_request_count += 1
+        self.play_beep = (self.beep_request_count, hz, length, left, right, requested_at)
+        self.wake_event.set()
+    
+    def get_preview_key(self, values):
+        """按當前輸出格式生成設定預覽的緩存鍵"""
+        return get_preview_key(values, self.sample_rate, self.sample_format, self.output_channels)
+
+    def render_preview_sweep(self, values):
+        """按（尚未保存的）配置值渲染0-100%的進度條掃頻，返回(緩存鍵, 各音調的音頻數據)"""
+        attributes = self.get_config_attributes(values)
+        sample_rate = self.sample_rate
+        sample_format = self.sample_format
+        output_channels = self.output_channels
+        preview_key = get_preview_key(values, sample_rate, sample_format, output_channels)
+        
+        # 音調之間保留與守護線程相同的40ms間隔
+        frame_width = SAMPLE_FORMAT_WIDTHS[sample_format] * output_channels
+        gap = bytes(int(sample_rate * (attributes['thread_sleep_interval'] - attributes['audio_duration'])) * frame_width)
+        
+        chunks = []
+        for frequency in preview_sweep_frequencies(attributes['mapped_min_freq'], attributes['mapped_max_freq']):
+            audio_data = self.render_tone_data(
+                frequency, attributes['audio_duration'], sample_rate, sample_format, output_channels,
+                attributes['volume'], attributes['waveform_type'],
+                fade_algorithm=attributes['fade_algorithm'], fade_ratio=attributes['fade_ratio'])
+            chunks.append(audio_data + gap)
+        return preview_key, chunks
+
+    def preview_settings(self, values):
+        """播放設定預覽掃頻（由設定面板調用），已預先渲染時立即播放"""
+        if not (self.enabled and self.stream_initialized and self.thread_running):
+            return False
+        try:
+            preview_key = self.get_preview_key(values)
+            chunks = self.previewer.get_sweep(preview_key, values)
+        except Exception as e:
+            print(f"悅耳進度條：渲染預覽掃頻錯誤: {e}")
+            return False
+        
+        self.preview_request_count += 1
+        self.play_preview = (self.preview_request_count, preview_key, chunks)
+        self.wake_event.set()
+        return True
+
+    def prerender_previews(self, values_list):
+        """在背景預先渲染設定面板相鄰選項的預覽掃頻"""
+        if self.stream_initialized:
+            self.previewer.prerender([
+                values for values in values_list
+                if self.previewer.lookup(self.get_preview_key(values)) is None
+            ])
+
+    def request_earcon_play(self, file_path):
+        """請求播放提示音檔案：新請求取代尚未播放的舊請求（與nvwave停止前一個檔案相同），並喚醒守護線程"""
+        self.earcon_request_count += 1
+        self.play_earcon = (self.earcon_request_count, file_path)
+        self.wake_event.set()
     
     def hook_beep_function(self):
         """攔截tones.beep函數"""
@@ -1105,23 +1974,75 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
             self.original_beep = None
             print("悅耳進度條：已恢復原始tones.beep函數")
     
+    def update_wave_file_hook(self):
+        """按配置攔截或恢復nvwave.playWaveFile"""
+        if self.cache_earcons and NVWAVE_AVAILABLE:
+            if not self.original_play_wave_file:
+                self.original_play_wave_file = nvwave.playWaveFile
+                nvwave.playWaveFile = self.optimized_play_wave_file
+                print("悅耳進度條：已攔截nvwave.playWaveFile函數（緩存提示音檔案）")
+        else:
+            self.unhook_wave_file_function()
+    
+    def unhook_wave_file_function(self):
+        """恢復原始playWaveFile函數"""
+        if self.original_play_wave_file:
+            nvwave.playWaveFile = self.original_play_wave_file
+            self.original_play_wave_file = None
+            print("悅耳進度條：已恢復原始nvwave.playWaveFile函數")
+    
+    def optimized_play_wave_file(self, fileName, asynchronous=True, **kwargs):
+        """優化的playWaveFile函數：非同步播放的提示音檔案經由插件的輸出流和緩存播放"""
+        # 同步播放和語音序列中的檔案需要nvwave的播放完成語義，交回原始函數
+        if (asynchronous and not kwargs.get('isSpeechWaveFileCommand') and
+                self.enabled and self.audio_available and self.thread_running and self.stream_initialized and
+                fileName not in self.uncacheable_earcons):
+            self.request_earcon_play(fileName)
+            return None
+        
+        return self.original_play_wave_file(fileName, asynchronous=asynchronous, **kwargs)
+    
     def optimized_beep_32bit(self, hz, length, left=50, right=50):
+        """攔截的tones.beep：錄製中記錄調用，效能分析中經由分析器調用"""
+        if self.beep_recorder.active:
+            self.beep_recorder.record(hz, length, left, right)
+        if self.profiler.active:
+            self.profiler.run_hook(self.process_beep, hz, length, left, right)
+            return
+        self.process_beep(hz, length, left, right)
+
+    def process_beep(self, hz, length, left, right):
         """優化的beep函數 - 32位版本 - 修復原始音效播放問題"""
-        # 檢查是否為進度條音效
-        if self.is_progress_beep(hz, length, left, right):
-            if self.debug_mode:
-                print(f"悅耳進度條：識別為進度條音效（32位處理）: {hz}Hz")
-            
-            if self.enabled and PYAUDIO_AVAILABLE and self.thread_running:
+        requested_at = time.perf_counter()
+        # 檢查是否為進度條音效：時長和聲道符合後，以一次查表取得音調槽位（範圍外為None）
+        tone = None
+        if (PROGRESS_MIN_LENGTH <= length <= PROGRESS_MAX_LENGTH and
+                left == PROGRESS_CHANNEL_VOLUME and right == PROGRESS_CHANNEL_VOLUME):
+            tone_index = int(hz + 0.5)
+            if 0 <= tone_index <= ORIGINAL_MAX_FREQ:
+                tone = self.tone_table[tone_index]
+        
+        if tone is not None:
+            log.debug("識別為進度條音效（32位處理）: %sHz", hz)
+            
+            if self.enabled and self.audio_available and self.thread_running:
                 # 調用回調函數請求播放（立即返回，不阻塞）
-                self.request_audio_play(hz)
+                self.beep_trace.record(hz, length, left, right, TRACE_PROGRESS)
+                self.request_audio_play(tone, requested_at)
                 return  # 不播放原始音效
             elif self.enabled:
-                print("悅耳進度條：守護線程：PyAudio不可用，使用原始音效")
+                log.debug("守護線程：PyAudio不可用，使用原始音效")
                 # 插件啟用但PyAudio不可用，播放原始音效
             # 如果插件停用，繼續執行到最後播放原始音效
+        elif (self.route_all_beeps and self.enabled and self.audio_available and self.thread_running and
+                GENERIC_MIN_FREQ <= hz <= GENERIC_MAX_FREQ and 0 < length <= GENERIC_MAX_LENGTH_MS):
+            # 接管其他提示音：經由同一輸出流和緩存播放
+            self.beep_trace.record(hz, length, left, right, TRACE_GENERIC)
+            self.request_generic_play(hz, length, left, right, requested_at)
+            return
         
         # 播放原始音效（進度條音效且插件停用時，或者非進度條音效時）
+        self.beep_trace.record(hz, length, left, right, TRACE_PASSTHROUGH)
         if self.original_beep:
             self.original_beep(hz, length, left, right)
 
@@ -1188,196 +2109,30 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
         return audio_array    
 
 
-    def generate_waveform_32bit(self, frequency, duration=0.08, sample_rate=44100, volume=0.6, waveform_type='sine'):
-        """通用波形生成器 - 32位優化版本"""
-        
-        # 根據波形類型調用對應的生成函數
-        if waveform_type == 'sine':
-            return self.generate_sine_wave(frequency, duration, sample_rate, volume)
-        elif waveform_type == 'square':
-            return self.generate_square_wave(frequency, duration, sample_rate, volume)
-        elif waveform_type == 'triangle':
-            return self.generate_triangle_wave(frequency, duration, sample_rate, volume)
-        elif waveform_type == 'sawtooth':
-            return self.generate_sawtooth_wave(frequency, duration, sample_rate, volume)
-        elif waveform_type == 'pulse':
-            return self.generate_pulse_wave(frequency, duration, sample_rate, volume)
-        elif waveform_type == 'white_noise':
-            return self.generate_white_noise(frequency, duration, sample_rate, volume)
-        else:
-            # 默認使用正弦波
-            return self.generate_sine_wave(frequency, duration, sample_rate, volume)
-
-    def generate_sine_wave(self, frequency, duration, sample_rate, volume):
-        """正弦波生成器"""
-        samples = int(sample_rate * duration)
-        audio_array = array.array('h')
-        
-        two_pi_f = 2.0 * math.pi * frequency
-        sample_rate_inv = 1.0 / sample_rate
-        max_amplitude = 30000
-        
-        for i in range(samples):
-            t = i * sample_rate_inv
-            sample = math.sin(two_pi_f * t)
-            sample = self.apply_fade_effect(sample, i, samples)
-            
-            audio_sample = int(sample * max_amplitude * volume)
-            audio_sample = max(-32768, min(32767, audio_sample))
-            audio_array.append(audio_sample)
-        
-        return audio_array
-
-    def generate_square_wave(self, frequency, duration, sample_rate, volume):
-        """方波生成器"""
-        samples = int(sample_rate * duration)
-        audio_array = array.array('h')
-        
-        two_pi_f = 2.0 * math.pi * frequency
-        sample_rate_inv = 1.0 / sample_rate
-        max_amplitude = 30000
-        
-        for i in range(samples):
-            t = i * sample_rate_inv
-            # 方波：基於正弦波的符號函數
-            sine_val = math.sin(two_pi_f * t)
-            sample = 1.0 if sine_val >= 0 else -1.0
-            sample = self.apply_fade_effect(sample, i, samples)
-            
-            audio_sample = int(sample * max_amplitude * volume)
-            audio_sample = max(-32768, min(32767, audio_sample))
-            audio_array.append(audio_sample)
-        
-        return audio_array
-
-    def generate_triangle_wave(self, frequency, duration, sample_rate, volume):
-        """三角波生成器"""
-        samples = int(sample_rate * duration)
-        audio_array = array.array('h')
-        
-        period_samples = int(sample_rate / frequency)
-        max_amplitude = 30000
-        
-        for i in range(samples):
-            # 三角波：線性上升下降
-            position_in_period = i % period_samples
-            half_period = period_samples / 2.0
-            
-            if position_in_period <= half_period:
-                # 上升階段：從-1到+1
-                sample = (position_in_period / half_period) * 2.0 - 1.0
-            else:
-                # 下降階段：從+1到-1
-                sample = 1.0 - ((position_in_period - half_period) / half_period) * 2.0
-            
-            sample = self.apply_fade_effect(sample, i, samples)
-            
-            audio_sample = int(sample * max_amplitude * volume)
-            audio_sample = max(-32768, min(32767, audio_sample))
-            audio_array.append(audio_sample)
-        
-        return audio_array
-
-    def generate_sawtooth_wave(self, frequency, duration, sample_rate, volume):
-        """鋸齒波生成器"""
-        samples = int(sample_rate * duration)
-        audio_array = array.array('h')
-        
-        period_samples = int(sample_rate / frequency)
-        max_amplitude = 30000
-        
-        for i in range(samples):
-            # 鋸齒波：線性上升然後瞬間下降
-            position_in_period = i % period_samples
-            sample = (position_in_period / period_samples) * 2.0 - 1.0
-            sample = self.apply_fade_effect(sample, i, samples)
-            
-            audio_sample = int(sample * max_amplitude * volume)
-            audio_sample = max(-32768, min(32767, audio_sample))
-            audio_array.append(audio_sample)
-        
-        return audio_array
-
-    def generate_pulse_wave(self, frequency, duration, sample_rate, volume, duty_cycle=0.25):
-        """脈衝波生成器（可調佔空比的方波）"""
-        samples = int(sample_rate * duration)
-        audio_array = array.array('h')
-        
-        period_samples = int(sample_rate / frequency)
-        max_amplitude = 30000
-        
-        for i in range(samples):
-            position_in_period = i % period_samples
-            # 脈衝波：佔空比控制高電平時間
-            sample = 1.0 if (position_in_period / period_samples) < duty_cycle else -1.0
-            sample = self.apply_fade_effect(sample, i, samples)
-            
-            audio_sample = int(sample * max_amplitude * volume)
-            audio_sample = max(-32768, min(32767, audio_sample))
-            audio_array.append(audio_sample)
-        
-        return audio_array
-
-    def generate_white_noise(self, frequency, duration, sample_rate, volume):
-        """白噪音生成器（頻率參數用於調制強度）"""
-        import random
-        samples = int(sample_rate * duration)
-        audio_array = array.array('h')
-        
-        max_amplitude = 30000
-        # 使用頻率來調制噪音的強度變化
-        modulation_factor = frequency / 1000.0  # 將頻率轉換為調制因子
-        
-        for i in range(samples):
-            # 生成隨機噪音
-            noise = random.uniform(-1.0, 1.0)
-            # 根據頻率進行輕微調制
-            modulation = 1.0 + 0.3 * math.sin(2.0 * math.pi * modulation_factor * i / sample_rate)
-            sample = noise * modulation
-            sample = self.apply_fade_effect(sample, i, samples)
-            
-            audio_sample = int(sample * max_amplitude * volume)
-            audio_sample = max(-32768, min(32767, audio_sample))
-            audio_array.append(audio_sample)
-        
-        return audio_array
-
-    def apply_fade_effect(self, sample, current_index, total_samples):
-        """應用淡入淡出效果"""
-        fade_samples = int(total_samples * self.fade_ratio)
-        
-        if self.fade_algorithm == 'gaussian':
-            # 高斯淡入淡出
-            sigma = total_samples * 0.25
-            center = total_samples / 2.0
-            gaussian_factor = math.exp(-0.5 * ((current_index - center) / sigma) ** 2)
-            return sample * gaussian_factor
-        else:
-            # 余弦淡入淡出
-            if current_index < fade_samples:
-                fade_factor = (1.0 - math.cos(math.pi * current_index / fade_samples)) / 2.0
-                return sample * fade_factor
-            elif current_index >= total_samples - fade_samples:
-                fade_index = total_samples - current_index - 1
-                fade_factor = (1.0 - math.cos(math.pi * fade_index / fade_samples)) / 2.0
-                return sample * fade_factor
-            else:
-                return sample
+    def generate_waveform_32bit(self, frequency, duration=0.08, sample_rate=44100, volume=0.6, waveform_type='sine',
+                                fade_algorithm=None, fade_ratio=None):
+        """通用波形生成器 - 按當前（或指定的）淡入淡出配置生成浮點樣本"""
+        return generate_waveform(
+            frequency=frequency,
+            duration=duration,
+            sample_rate=sample_rate,
+            volume=volume,
+            waveform_type=waveform_type,
+            fade_algorithm=fade_algorithm if fade_algorithm is not None else self.fade_algorithm,
+            fade_ratio=fade_ratio if fade_ratio is not None else self.fade_ratio
+        )
 
     def is_progress_beep(self, hz, length, left, right):
         """檢查是否為進度條音效"""
         return (
-            110 <= hz <= 1800 and
-            38 <= length <= 42 and
-            left == 50 and right == 50
+            ORIGINAL_MIN_FREQ <= hz <= ORIGINAL_MAX_FREQ and
+            PROGRESS_MIN_LENGTH <= length <= PROGRESS_MAX_LENGTH and
+            left == PROGRESS_CHANNEL_VOLUME and right == PROGRESS_CHANNEL_VOLUME
         )
 
     def clear_audio_cache(self):
         """清理音頻緩存"""
-        cache_size = len(self.audio_cache)
-        self.audio_cache.clear()
-        self.cache_hits = 0
-        self.cache_misses = 0
+        cache_size = self.audio_cache.clear()
         print(f"悅耳進度條：音頻緩存已清理（清理了 {cache_size} 個條目）")
     
     def stop_audio_daemon(self):
@@ -1385,6 +2140,8 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
         if self.audio_thread and self.thread_running:
             print("悅耳進度條：正在停止守護線程...")
             self.thread_running = False
+            # 喚醒等待中的守護線程，使其立即退出
+            self.wake_event.set()
             
             # 等待線程退出（最多1秒）
             self.audio_thread.join(timeout=1.0)
@@ -1397,6 +2154,12 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
     def cleanup_audio_resources(self):
         """清理音頻資源"""
         try:
+            if self.stream_pool:
+                # 池中的流（包括當前輸出流）統一關閉
+                self.stream_pool.close_all()
+                self.stream_pool = None
+                self.audio_stream = None
+            
             if self.audio_stream:
                 self.audio_stream.stop_stream()
                 self.audio_stream.close()
@@ -1418,6 +2181,14 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
         # 停用播放
         self.enabled = False
         
+        # 等待背景初始化結束，之後才能安全地釋放音頻資源
+        if not self.wait_until_initialized(INITIALIZATION_TIMEOUT):
+            print("悅耳進度條：警告：背景初始化尚未完成")
+        
+        # 停止設備監聽和預覽預先渲染
+        self.stop_device_monitor()
+        self.previewer.stop()
+        
         # 停止守護線程
         self.stop_audio_daemon()
         
@@ -1427,11 +2198,17 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
         # 清理音頻緩存
         self.clear_audio_cache()
         
-        # 恢復原始beep函數
+        # 恢復原始beep函數和提示音檔案播放函數
         self.unhook_beep_function()
+        self.unhook_wave_file_function()
+        
+        # 寫入尚未保存的配置
+        if CONFIG_AVAILABLE:
+            sine_progress_config.flush()
         
         # 清理記錄
-        self.beep_log.clear()
+        self.beep_trace.clear()
+        self.latency_tracer.clear()
         
         # 移除設定面板註冊
         if CONFIG_AVAILABLE:
@@ -1446,7 +2223,7 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
         print("悅耳進度條：已完全停用")
         super().terminate()
     
-    # 快捷鍵：切換插件（唯一保留的快捷鍵）
+    # 快捷鍵：切換插件（唯一有預設按鍵的快捷鍵）
     @script(
         description=addonGettext("切換悅耳進度條開關"),
         gesture="kb:NVDA+shift+p",  # 預設快捷鍵
@@ -1462,8 +2239,91 @@ class GlobalPlugin(globalPluginHandler.GlobalPlugin):
         
         # 詳細日誌
         state_text = "啟用" if self.enabled else "停用"
-        if PYAUDIO_AVAILABLE and self.thread_running:
+        if self.audio_available and self.thread_running:
             status = "（32位優化 + 用戶配置可用）"
         else:
             status = "（降級到原始音效）"
-        print(f"悅耳進度條：用戶切換音效狀態: {state_text}{status}")
\ No newline at end of file
+        print(f"悅耳進度條：用戶切換音效狀態: {state_text}{status}")
+
+    # 快捷鍵：將最近的提示音記錄寫入日誌（沒有預設按鍵，可在輸入手勢對話框中指定）
+    @script(
+        description=addonGettext("將最近的提示音記錄寫入NVDA日誌"),
+        category=addonGettext("悅耳進度條")
+    )
+    def script_dumpBeepTrace(self, gesture):
+        count = self.beep_trace.dump(log)
+        ui.message(addonGettext("已將 {count} 個提示音記錄寫入日誌").format(count=count))
+
+    # 快捷鍵：報告提示音延遲的百分位數（沒有預設按鍵，可在輸入手勢對話框中指定）
+    @script(
+        description=addonGettext("報告提示音延遲（p50/p95/p99）"),
+        category=addonGettext("悅耳進度條")
+    )
+    def script_reportLatency(self, gesture):
+        summary = self.latency_tracer.summary()
+        count, total = summary[STAGE_TOTAL]
+        print("悅耳進度條：提示音延遲（最近的樣本）：")
+        for line in self.latency_tracer.format_lines():
+            print(line)
+        if not count:
+            ui.message(addonGettext("尚無提示音延遲記錄"))
+            return
+        ui.message(addonGettext("提示音延遲：p50 {p50:.1f}毫秒，p95 {p95:.1f}毫秒，p99 {p99:.1f}毫秒").format(
+            p50=total[50], p95=total[95], p99=total[99]))
+
+    # 快捷鍵：開始或提前結束效能分析（沒有預設按鍵，可在輸入手勢對話框中指定）
+    @script(
+        description=addonGettext("開始或結束悅耳進度條的效能分析"),
+        category=addonGettext("悅耳進度條")
+    )
+    def script_toggleProfiling(self, gesture):
+        if self.profiler.active:
+            self.profiler.stop()
+            self.wake_event.set()
+            ui.message(addonGettext("正在結束效能分析"))
+            return
+        if not self.thread_running:
+            ui.message(addonGettext("音頻系統尚未就緒，無法進行效能分析"))
+            return
+        
+        self.profiler.start(on_complete=self.on_profiling_complete)
+        # 喚醒守護線程，立即開始分析
+        self.wake_event.set()
+        ui.message(addonGettext("開始效能分析：{seconds}秒或{beeps}個提示音").format(
+            seconds=int(DEFAULT_PROFILE_SECONDS), beeps=DEFAULT_PROFILE_BEEPS))
+        print(f"悅耳進度條：開始效能分析（{DEFAULT_PROFILE_SECONDS:.0f}秒或{DEFAULT_PROFILE_BEEPS}個提示音）")
+    
+    def on_profiling_complete(self, stats_path, beep_count):
+        """效能分析結果寫入後在主線程播報"""
+        if stats_path:
+            message = addonGettext("效能分析完成（{count} 個提示音），結果已寫入NVDA配置目錄").format(count=beep_count)
+        else:
+            message = addonGettext("效能分析失敗，請查看NVDA日誌")
+        wx.CallAfter(ui.message, message)
+
+    # 快捷鍵：開始或結束提示音錄製（沒有預設按鍵，可在輸入手勢對話框中指定）
+    @script(
+        description=addonGettext("開始或結束錄製提示音記錄檔"),
+        category=addonGettext("悅耳進度條")
+    )
+    def script_toggleBeepRecording(self, gesture):
+        if self.beep_recorder.start():
+            ui.message(addonGettext("開始錄製提示音"))
+            print("悅耳進度條：開始錄製提示音")
+            return
+        
+        started_at, records = self.beep_recorder.stop()
+        # 在背景寫入記錄檔，不阻塞輸入手勢的處理
+        threading.Thread(target=self.save_beep_recording, args=(started_at, records), daemon=True).start()
+    
+    def save_beep_recording(self, started_at, records):
+        """將錄製的提示音寫入NVDA配置目錄，完成後在主線程播報"""
+        try:
+            path = get_trace_path(started_at)
+            count = write_trace(path, started_at, records)
+            print(f"悅耳進度條：提示音記錄檔已寫入 {path}（{count} 個提示音）")
+            message = addonGettext("已錄製 {count} 個提示音，記錄檔已寫入NVDA配置目錄").format(count=count)
+        except Exception as e:
+            print(f"悅耳進度條：寫入提示音記錄檔錯誤: {e}")
+            message = addonGettext("寫入提示音記錄檔失敗，請查看NVDA日誌")
+        wx.CallAfter(ui.message, message)